@@ -1,15 +1,83 @@
-from fastapi import APIRouter, Depends, Query
+from functools import lru_cache
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 from ..core.config import settings
+from ..core.metrics import CONTENT_TYPE, get_metrics
+from ..repositories.connection_pool import get_pool
 from ..repositories.duckdb_repository import DuckDBRepository
 from ..services.analytics_service import AnalyticsService
+from ..services.cache import BuildVersion, ResultCache
+from ..services.executor import QueryExecutor, get_executor
+from ..services.hs_index import HSIndex
+from ..services.search import HSSearch
+from ..services.export_service import PARQUET, DataExportService, UnsupportedMediaType, negotiate_format
+from ..services.pagination import InvalidCursorError
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
 
 router = APIRouter()
 
 
-def get_service() -> AnalyticsService:
-    repo = DuckDBRepository(settings.duckdb_path)
-    return AnalyticsService(repo)
+@lru_cache(maxsize=1)
+def get_repository() -> DuckDBRepository:
+    pool = get_pool(
+        settings.duckdb_path,
+        size=settings.duckdb_pool_size,
+        timeout=settings.duckdb_pool_timeout,
+        resolve_path=get_build_version().database,
+        resolve_version=get_build_version().current,
+    )
+    return DuckDBRepository(
+        settings.duckdb_path,
+        pool=pool,
+        metrics=get_metrics(),
+        slow_query_seconds=settings.slow_query_seconds,
+        count_rows_scanned=settings.metrics_rows_scanned,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_cache() -> ResultCache:
+    return ResultCache(maxsize=settings.cache_maxsize, ttl=settings.cache_ttl_seconds)
+
+
+@lru_cache(maxsize=1)
+def get_build_version() -> BuildVersion:
+    return BuildVersion(settings.duckdb_path)
+
+
+@lru_cache(maxsize=1)
+def get_hs_index() -> HSIndex:
+    return HSIndex(get_repository(), build_version=get_build_version())
+
+
+@lru_cache(maxsize=1)
+def get_hs_search() -> HSSearch:
+    return HSSearch(settings.search_index_dir, build_version=get_build_version())
+
+
+def get_service(
+    repo: DuckDBRepository = Depends(get_repository),
+    cache: ResultCache = Depends(get_cache),
+    build_version: BuildVersion = Depends(get_build_version),
+) -> AnalyticsService:
+    return AnalyticsService(repo, cache=cache, build_version=build_version)
+
+
+def get_query_executor() -> QueryExecutor:
+    return get_executor(
+        max_workers=settings.query_workers,
+        max_queue=settings.query_queue_size,
+        timeout=settings.query_timeout_seconds,
+    )
+
+
+def get_export_service(repo: DuckDBRepository = Depends(get_repository)) -> DataExportService:
+    return DataExportService(repo, batch_rows=settings.export_batch_rows)
 
 
 @router.get('/health')
@@ -17,11 +85,169 @@ async def health() -> dict:
     return {"status": "ok"}
 
 
+@router.get('/health/db')
+def health_db(
+    repo: DuckDBRepository = Depends(get_repository),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> dict:
+    pool = repo.health()
+    return {"status": "ok" if pool["ok"] else "degraded", "pool": pool, "queries": executor.stats()}
+
+
+@router.get('/cache/stats')
+async def cache_stats(
+    cache: ResultCache = Depends(get_cache),
+    build_version: BuildVersion = Depends(get_build_version),
+) -> dict:
+    return {"build_id": build_version.current(), **cache.stats()}
+
+
+@router.get('/metrics', response_class=PlainTextResponse)
+async def metrics(
+    cache: ResultCache = Depends(get_cache),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> PlainTextResponse:
+    registry = get_metrics()
+    registry.observe_cache(cache.stats())
+    registry.observe_executor(executor.stats())
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+@router.get('/quality')
+async def data_quality(
+    service: AnalyticsService = Depends(get_service),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> dict:
+    return await executor.run(service.data_quality)
+
+
 @router.get('/kpis/overview')
-async def overview(year: int | None = Query(default=None), service: AnalyticsService = Depends(get_service)) -> dict:
-    return service.overview(year)
+async def overview(
+    year: int | None = Query(default=None),
+    service: AnalyticsService = Depends(get_service),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> dict:
+    return await executor.run(service.overview, year)
+
+
+@router.get('/hs/search')
+async def hs_search(
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=100),
+    search: HSSearch = Depends(get_hs_search),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> dict:
+    try:
+        results = await executor.run(search.search, q, limit)
+    except FileNotFoundError as exc:
+        raise HTTPException(status_code=503, detail="Índice de búsqueda HS no disponible; ejecute el ETL") from exc
+    return {"query": q, "results": results}
+
+
+@router.get('/hs/{code}/children')
+async def hs_children(
+    code: str,
+    year: int | None = Query(default=None),
+    index: HSIndex = Depends(get_hs_index),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> dict:
+    tree = await executor.run(index.current)
+    try:
+        node = None if code == "root" else tree.node(code, year)
+        return {"node": node, "year": year, "children": tree.children(None if code == "root" else code, year)}
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Código HS desconocido: {code}") from exc
+
+
+@router.get('/kpis/timeseries')
+async def timeseries(
+    granularity: Literal["year", "month"] = Query(default="year"),
+    hs_prefix: str | None = Query(default=None, pattern=r"^\d{1,10}$"),
+    country: list[str] | None = Query(default=None, description="Códigos de país (repetible)"),
+    year_from: int | None = Query(default=None),
+    year_to: int | None = Query(default=None),
+    service: AnalyticsService = Depends(get_service),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> dict:
+    return await executor.run(service.timeseries, granularity, hs_prefix, country, year_from, year_to)
+
+
+@router.get('/kpis/sector')
+async def sector(
+    group_by: Literal["sector_industria", "seccion"] = Query(default="sector_industria"),
+    year_from: int | None = Query(default=None),
+    year_to: int | None = Query(default=None),
+    partner: str = Query(default="156", min_length=1, description="Código de país socio"),
+    flow: Literal["exports", "imports"] = Query(default="exports"),
+    service: AnalyticsService = Depends(get_service),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> dict:
+    try:
+        return await executor.run(service.sector, group_by, year_from, year_to, partner, flow)
+    except LookupError as exc:
+        raise HTTPException(status_code=503, detail=str(exc)) from exc
 
 
 @router.get('/kpis/dependency')
-async def dependency(service: AnalyticsService = Depends(get_service)) -> list[dict]:
-    return service.dependency()
+async def dependency(
+    hs_level: Literal[2, 4, 6, 8, 10] = Query(default=10),
+    year_from: int | None = Query(default=None),
+    year_to: int | None = Query(default=None),
+    partner: str = Query(default="156", min_length=1, description="Código de país socio"),
+    threshold: float = Query(default=0.5, ge=0, le=1),
+    flow: Literal["exports", "imports"] = Query(default="exports"),
+    limit: int | None = Query(default=None, ge=1, description="Tamaño de página; en NDJSON limita el total de filas"),
+    cursor: str | None = Query(default=None, description="Cursor opaco devuelto como next_cursor"),
+    format: Literal["json", "ndjson"] = Query(default="json"),
+    service: AnalyticsService = Depends(get_service),
+    executor: QueryExecutor = Depends(get_query_executor),
+):
+    filters = dict(
+        hs_level=hs_level, year_from=year_from, year_to=year_to, partner=partner, threshold=threshold, flow=flow
+    )
+    try:
+        if format == "ndjson":
+            lines = await executor.stream(service.stream_dependency, **filters, limit=limit, cursor=cursor)
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+        page_size = min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        return await executor.run(service.dependency, **filters, limit=page_size, cursor=cursor)
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.get('/data/{table}')
+async def export_data(
+    table: Literal["fact_exports", "fact_imports"],
+    columns: str | None = Query(default=None, description="Columnas separadas por coma"),
+    year_from: int | None = Query(default=None),
+    year_to: int | None = Query(default=None),
+    hs_prefix: str | None = Query(default=None, pattern=r"^\d{1,10}$"),
+    country: list[str] | None = Query(default=None, description="Códigos de país (repetible)"),
+    limit: int | None = Query(default=None, ge=1),
+    format: Literal["arrow", "parquet"] | None = Query(default=None, description="Ignora el header Accept"),
+    accept: str | None = Header(default=None),
+    exporter: DataExportService = Depends(get_export_service),
+    executor: QueryExecutor = Depends(get_query_executor),
+) -> StreamingResponse:
+    try:
+        media_type = negotiate_format(accept, format)
+    except UnsupportedMediaType as exc:
+        raise HTTPException(status_code=406, detail=str(exc)) from exc
+    try:
+        sql, params = await executor.run(
+            exporter.query,
+            table,
+            columns=[c.strip() for c in columns.split(",") if c.strip()] if columns else None,
+            year_from=year_from,
+            year_to=year_to,
+            hs_prefix=hs_prefix,
+            countries=country,
+            limit=limit,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+    extension = "parquet" if media_type == PARQUET else "arrows"
+    headers = {"Content-Disposition": f'attachment; filename="{table}.{extension}"'}
+    chunks = await executor.stream(exporter.stream, sql, params, media_type)
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -3,6 +3,18 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     duckdb_path: str = "./data/processed/observatorio.duckdb"
+    duckdb_pool_size: int = 4
+    duckdb_pool_timeout: float = 30.0
+    search_index_dir: str = "./data/processed/_search"
+    cache_maxsize: int = 256
+    cache_ttl_seconds: float = 300.0
+    build_poll_seconds: float = 5.0
+    export_batch_rows: int = 65_536
+    query_workers: int = 4
+    query_queue_size: int = 16
+    query_timeout_seconds: float = 30.0
+    slow_query_seconds: float = 1.0
+    metrics_rows_scanned: bool = False
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
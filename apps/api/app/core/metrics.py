@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+import threading
+import time
+from typing import Callable
+
+from packages.etl.src.etl.profiling import current_rss
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Rutas sin match (404, escaneos) se agrupan para no crear una serie por URL.
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name}: etiquetas esperadas {self.labels}, recibidas {tuple(labels)}")
+        return tuple(labels[name] for name in self.labels)
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        # Sin etiquetas la serie existe desde el inicio (p.ej. requests en curso = 0).
+        self._values: dict[tuple, float] = {} if labels else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: tuple[str, ...] = (),
+        function: Callable[[], float] | None = None,
+    ):
+        super().__init__(name, help_text, labels)
+        self.function = function
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> list[str]:
+        if self.function is not None:
+            return [f"{self.name} {_number(self.function())}"]
+        return super()._samples()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Por serie: conteos por bucket (no acumulados; el último es +Inf), suma y cantidad.
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[slot] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class ApiMetrics:
+    def __init__(self):
+        self.requests = Counter("http_requests_total", "Requests HTTP atendidos", ("method", "route", "status"))
+        self.request_latency = Histogram(
+            "http_request_duration_seconds", "Latencia de requests HTTP", ("method", "route", "status")
+        )
+        self.in_flight = Gauge("http_requests_in_flight", "Requests HTTP en curso")
+        self.query_latency = Histogram(
+            "duckdb_query_duration_seconds", "Tiempo con una conexión DuckDB tomada por operación", ("operation",)
+        )
+        self.rows_scanned = Counter(
+            "duckdb_rows_scanned_total", "Filas leídas por DuckDB (requiere METRICS_ROWS_SCANNED)", ("operation",)
+        )
+        self.slow_queries = Counter(
+            "duckdb_slow_queries_total", "Operaciones DuckDB sobre el umbral lento", ("operation",)
+        )
+        self.cache_hit_ratio = Gauge("api_cache_hit_ratio", "Proporción de aciertos de la caché de resultados")
+        self.cache_entries = Gauge("api_cache_entries", "Entradas en la caché de resultados")
+        self.queries_pending = Gauge("api_queries_pending", "Consultas en ejecución o en cola del executor")
+        self.process_rss = Gauge("process_resident_memory_bytes", "RSS del proceso de la API", function=current_rss)
+        self._all = [
+            self.requests,
+            self.request_latency,
+            self.in_flight,
+            self.query_latency,
+            self.rows_scanned,
+            self.slow_queries,
+            self.cache_hit_ratio,
+            self.cache_entries,
+            self.queries_pending,
+            self.process_rss,
+        ]
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        self.requests.inc(method=method, route=route, status=status)
+        self.request_latency.observe(seconds, method=method, route=route, status=status)
+
+    def observe_query(
+        self, operation: str, seconds: float, rows_scanned: int | None = None, slow: bool = False
+    ) -> None:
+        self.query_latency.observe(seconds, operation=operation)
+        if rows_scanned is not None:
+            self.rows_scanned.inc(rows_scanned, operation=operation)
+        if slow:
+            self.slow_queries.inc(operation=operation)
+
+    def observe_cache(self, stats: dict) -> None:
+        self.cache_hit_ratio.set(stats["hit_ratio"])
+        self.cache_entries.set(stats["size"])
+
+    def observe_executor(self, stats: dict) -> None:
+        self.queries_pending.set(stats["pending"])
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._all for line in metric.render()) + "\n"
+
+
+class MetricsMiddleware:
+    def __init__(self, app, metrics: ApiMetrics | None = None):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics or get_metrics()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.in_flight.dec()
+            # FastAPI deja la ruta resuelta en el scope; se usa la plantilla (/api/hs/{code}/children), no la URL.
+            route = getattr(scope.get("route"), "path_format", None) or UNMATCHED_ROUTE
+            metrics.observe_request(scope["method"], route, status, elapsed)
+
+
+_metrics: ApiMetrics | None = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> ApiMetrics:
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = ApiMetrics()
+        return _metrics
@@ -1,9 +1,34 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import logging
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+from .api.routes import get_build_version, get_hs_index, router
+from .core.config import settings
+from .core.metrics import MetricsMiddleware
+from .repositories.connection_pool import PoolTimeoutError, QueryInterruptedError, close_pools
+from .services.executor import QueryRejectedError, QueryTimeoutError, shutdown_executor
+
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    try:
+        get_hs_index().current()
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("No se pudo precargar el índice HS: %s", exc)
+    get_build_version().watch(settings.build_poll_seconds)
+    yield
+    get_build_version().stop()
+    shutdown_executor()
+    close_pools()
 
-from .api.routes import router
 
-app = FastAPI(title='Observatorio Ecuador-China API', version='0.1.0')
+app = FastAPI(title='Observatorio Ecuador-China API', version='0.1.0', lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,4 +38,18 @@ app.add_middleware(
     allow_headers=['*'],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(router, prefix='/api')
+
+
+@app.exception_handler(QueryRejectedError)
+@app.exception_handler(PoolTimeoutError)
+async def overloaded(_: Request, exc: Exception) -> JSONResponse:
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(QueryTimeoutError)
+@app.exception_handler(QueryInterruptedError)
+async def query_timeout(_: Request, exc: Exception) -> JSONResponse:
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterator
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(RuntimeError):
+    pass
+
+
+class QueryInterruptedError(RuntimeError):
+    pass
+
+
+class InterruptToken:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active: set[duckdb.DuckDBPyConnection] = set()
+        self.interrupted = False
+
+    def register(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            self._active.add(cursor)
+            interrupted = self.interrupted
+        if interrupted:
+            raise QueryInterruptedError("Consulta cancelada")
+
+    def unregister(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            self._active.discard(cursor)
+
+    def interrupt(self) -> int:
+        # Bajo el lock: una conexión no puede volver al pool mientras se interrumpe.
+        with self._lock:
+            self.interrupted = True
+            for cursor in self._active:
+                cursor.interrupt()
+            return len(self._active)
+
+
+# Las conexiones entregadas dentro de una tarea con token quedan registradas para poder interrumpirlas.
+current_interrupt_token: ContextVar[InterruptToken | None] = ContextVar("current_interrupt_token", default=None)
+
+
+class DuckDBConnectionPool:
+    def __init__(
+        self,
+        db_path: str,
+        size: int = 4,
+        timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        resolve_path: Callable[[], str] | None = None,
+        resolve_version: Callable[[], str] | None = None,
+    ):
+        if size < 1:
+            raise ValueError("El tamaño del pool debe ser >= 1")
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        # Devuelve la versión publicada de la base; al cambiar, el pool se reabre sobre el archivo nuevo.
+        self.resolve_path = resolve_path
+        # Build id publicado: si cambia con la misma ruta (base reescrita en sitio), la conexión raíz también se
+        # reabre, así el proceso de la API no retiene el archivo anterior más allá de las consultas en curso.
+        self.resolve_version = resolve_version
+        self._lock = threading.Lock()
+        self._idle: queue.LifoQueue[tuple[duckdb.DuckDBPyConnection, float, int]] = queue.LifoQueue()
+        self._root: duckdb.DuckDBPyConnection | None = None
+        self._root_path: str | None = None
+        self._root_version: str | None = None
+        self._created = 0
+        # Cada reapertura es una generación; la conexión raíz anterior se cierra al devolverse su último cursor.
+        self._generation = 0
+        self._open: dict[int, int] = {}
+        self._retired: dict[int, duckdb.DuckDBPyConnection] = {}
+
+    def _target_path(self) -> str:
+        return str(self.resolve_path()) if self.resolve_path is not None else self.db_path
+
+    def _target_version(self) -> str | None:
+        return self.resolve_version() if self.resolve_version is not None else None
+
+    def _root_connection(self) -> duckdb.DuckDBPyConnection:
+        if self._root is None:
+            path, version = self._target_path(), self._target_version()
+            self._root = duckdb.connect(path, read_only=True)
+            self._root_path, self._root_version = path, version
+            logger.info("Conexión DuckDB abierta: %s", path)
+        return self._root
+
+    def _new_cursor(self) -> tuple[duckdb.DuckDBPyConnection, int]:
+        with self._lock:
+            cursor = self._root_connection().cursor()
+            self._open[self._generation] = self._open.get(self._generation, 0) + 1
+            return cursor, self._generation
+
+    def _refresh(self) -> None:
+        if self.resolve_path is None and self.resolve_version is None:
+            return
+        path, version = self._target_path(), self._target_version()
+        with self._lock:
+            if self._root is None or (path, version) == (self._root_path, self._root_version):
+                return
+            retired = self._generation
+            self._retired[retired] = self._root
+            self._root, self._root_path = None, None
+            self._generation += 1
+            self._close_retired(retired)
+        logger.info("Nueva versión de la base DuckDB: %s (build %s)", path, version)
+        # Los cursores ociosos de la versión anterior se cierran ya; los que están en uso, al devolverse.
+        while True:
+            try:
+                cursor, _, generation = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(cursor, generation)
+
+    def _close_retired(self, generation: int) -> None:
+        if generation in self._retired and not self._open.get(generation):
+            self._retired.pop(generation).close()
+            self._open.pop(generation, None)
+
+    def _discard(self, cursor: duckdb.DuckDBPyConnection, generation: int) -> None:
+        try:
+            cursor.close()
+        except duckdb.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+            self._open[generation] -= 1
+            self._close_retired(generation)
+
+    @staticmethod
+    def _is_healthy(cursor: duckdb.DuckDBPyConnection) -> bool:
+        try:
+            return cursor.execute("SELECT 1").fetchone() == (1,)
+        except duckdb.Error:
+            return False
+
+    def _acquire(self) -> tuple[duckdb.DuckDBPyConnection, int]:
+        self._refresh()
+        while True:
+            try:
+                cursor, released_at, generation = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._new_cursor()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                try:
+                    cursor, released_at, generation = self._idle.get(timeout=self.timeout)
+                except queue.Empty as exc:
+                    raise PoolTimeoutError(f"Sin conexiones DuckDB libres tras {self.timeout}s") from exc
+
+            if generation != self._generation:
+                self._discard(cursor, generation)
+                continue
+            if time.monotonic() - released_at < self.health_check_interval or self._is_healthy(cursor):
+                return cursor, generation
+            logger.warning("Conexión DuckDB no saludable descartada")
+            self._discard(cursor, generation)
+
+    def _release(self, cursor: duckdb.DuckDBPyConnection, generation: int) -> None:
+        if generation != self._generation:
+            self._discard(cursor, generation)
+        else:
+            self._idle.put((cursor, time.monotonic(), generation))
+
+    @contextmanager
+    def connection(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        token = current_interrupt_token.get()
+        cursor, generation = self._acquire()
+        broken = False
+        try:
+            if token is not None:
+                token.register(cursor)
+            yield cursor
+        except (duckdb.ConnectionException, duckdb.FatalException):
+            broken = True
+            raise
+        finally:
+            if token is not None:
+                token.unregister(cursor)
+            if broken:
+                self._discard(cursor, generation)
+            else:
+                self._release(cursor, generation)
+
+    def health(self) -> dict:
+        try:
+            with self.connection() as conn:
+                ok = self._is_healthy(conn)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Health check DuckDB falló: %s", exc)
+            ok = False
+        with self._lock:
+            created = self._created
+            database = self._root_path
+        idle = self._idle.qsize()
+        return {
+            "ok": ok,
+            "size": self.size,
+            "open": created,
+            "idle": idle,
+            "in_use": created - idle,
+            "database": database,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    cursor, _, generation = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                cursor.close()
+                self._created -= 1
+                self._open[generation] -= 1
+            for root in self._retired.values():
+                root.close()
+            self._retired.clear()
+            if self._root is not None:
+                self._root.close()
+                self._root = None
+                self._root_path = None
+
+
+_pools: dict[str, DuckDBConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+    db_path: str,
+    size: int = 4,
+    timeout: float = 30.0,
+    resolve_path: Callable[[], str] | None = None,
+    resolve_version: Callable[[], str] | None = None,
+) -> DuckDBConnectionPool:
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = DuckDBConnectionPool(
+                db_path, size=size, timeout=timeout, resolve_path=resolve_path, resolve_version=resolve_version
+            )
+            _pools[db_path] = pool
+        return pool
+
+
+def close_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -1,16 +1,151 @@
 from __future__ import annotations
 
+from contextlib import contextmanager
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Iterator
+
 import duckdb
 import pandas as pd
+import pyarrow as pa
+
+from ..core.metrics import ApiMetrics
+from .connection_pool import DuckDBConnectionPool, get_pool
+
+logger = logging.getLogger(__name__)
+
+
+class _ScanCounter:
+    # Envuelve el cursor con el profiler JSON de DuckDB activo y suma cumulative_rows_scanned de cada consulta.
+    def __init__(self, cursor: duckdb.DuckDBPyConnection):
+        self._cursor = cursor
+        self._prefix = f"duckdb-profile-{os.getpid()}-{id(cursor)}"
+        self._seq = 0
+        self.rows_scanned = 0
+        self._output = self._next_output()
+        cursor.execute(f"SET profiling_output = '{self._output.as_posix()}'")
+        cursor.execute("SET enable_profiling = 'json'")
+
+    def _next_output(self) -> Path:
+        self._seq += 1
+        return Path(tempfile.gettempdir()) / f"{self._prefix}-{self._seq}.json"
+
+    def _harvest(self, path: Path) -> None:
+        try:
+            profile = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            profile = {}
+        path.unlink(missing_ok=True)
+        self.rows_scanned += int(profile.get("cumulative_rows_scanned") or 0)
+
+    def _rotate(self) -> None:
+        # DuckDB escribe el perfil al cerrar el resultado; cambiar el destino cierra el anterior en el archivo previo.
+        previous, self._output = self._output, self._next_output()
+        self._cursor.execute(f"SET profiling_output = '{self._output.as_posix()}'")
+        self._harvest(previous)
+
+    def execute(self, *args, **kwargs):
+        self._rotate()
+        return self._cursor.execute(*args, **kwargs)
+
+    # Las relaciones (conn.table(), conn.sql()) también ejecutan consultas: cada una recibe su propio archivo de
+    # perfil para que la siguiente no lo sobrescriba antes de sumarlo.
+    def table(self, *args, **kwargs):
+        self._rotate()
+        return self._cursor.table(*args, **kwargs)
+
+    def sql(self, *args, **kwargs):
+        self._rotate()
+        return self._cursor.sql(*args, **kwargs)
+
+    query = sql
+
+    def close(self) -> int:
+        try:
+            self._cursor.execute("RESET enable_profiling")
+        except duckdb.Error:
+            pass
+        self._harvest(self._output)
+        return self.rows_scanned
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
 
 
 class DuckDBRepository:
-    def __init__(self, db_path: str):
+    def __init__(
+        self,
+        db_path: str,
+        pool: DuckDBConnectionPool | None = None,
+        metrics: ApiMetrics | None = None,
+        slow_query_seconds: float | None = None,
+        count_rows_scanned: bool = False,
+    ):
         self.db_path = db_path
+        self.pool = pool or get_pool(db_path)
+        self.metrics = metrics
+        self.slow_query_seconds = slow_query_seconds
+        self.count_rows_scanned = count_rows_scanned
+
+    @contextmanager
+    def connection(self, operation: str = "connection", detail: str = "") -> Iterator[duckdb.DuckDBPyConnection]:
+        with self.pool.connection() as conn:
+            counter = _ScanCounter(conn) if self.count_rows_scanned else None
+            started = time.perf_counter()
+            try:
+                yield conn if counter is None else counter
+            finally:
+                elapsed = time.perf_counter() - started
+                rows = counter.close() if counter is not None else None
+                self._observe(operation, detail, elapsed, rows)
+
+    def _observe(self, operation: str, detail: str, elapsed: float, rows_scanned: int | None) -> None:
+        slow = self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds
+        if slow:
+            logger.warning(
+                "Consulta DuckDB lenta: %s %.3fs%s%s",
+                operation,
+                elapsed,
+                f" ({rows_scanned} filas leídas)" if rows_scanned is not None else "",
+                f" | {' '.join(detail.split())[:500]}" if detail else "",
+            )
+        if self.metrics is not None:
+            self.metrics.observe_query(operation, elapsed, rows_scanned, slow)
+
+    def query(self, sql: str, params: list | None = None) -> pd.DataFrame:
+        with self.connection("query", sql) as conn:
+            return conn.execute(sql, params or []).df()
 
     def read(self, table_name: str) -> pd.DataFrame:
-        conn = duckdb.connect(self.db_path, read_only=True)
-        try:
-            return conn.execute(f"SELECT * FROM {table_name}").df()
-        finally:
-            conn.close()
+        with self.connection("read", table_name) as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM information_schema.tables WHERE table_name = ?",
+                [table_name],
+            ).fetchone()
+            if exists is None:
+                raise ValueError(f"Tabla desconocida en DuckDB: {table_name}")
+            return conn.table(table_name).df()
+
+    def columns(self, table_name: str) -> list[str]:
+        with self.connection("columns", table_name) as conn:
+            rows = conn.execute(
+                "SELECT column_name FROM information_schema.columns WHERE table_name = ? ORDER BY ordinal_position",
+                [table_name],
+            ).fetchall()
+        if not rows:
+            raise ValueError(f"Tabla desconocida en DuckDB: {table_name}")
+        return [row[0] for row in rows]
+
+    @contextmanager
+    def arrow_reader(
+        self, sql: str, params: list | None = None, batch_size: int = 65_536, operation: str = "arrow_reader"
+    ) -> Iterator[pa.RecordBatchReader]:
+        with self.connection(operation, sql) as conn:
+            yield conn.execute(sql, params or []).fetch_record_batch(batch_size)
+
+    def health(self) -> dict:
+        return self.pool.health()
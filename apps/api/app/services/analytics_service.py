@@ -1,24 +1,167 @@
 from __future__ import annotations
 
-from functools import lru_cache
-from packages.analytics.src.analytics import overview_kpis, dependency_by_product, validate_kpi_inputs
+import json
+from typing import Any, Callable, Hashable, Iterator
+
+from packages.analytics.src.analytics import (
+    dependency_sql,
+    is_dependency_key,
+    iter_dependency_sql,
+    normalize_country_code,
+    overview_kpis_sql,
+    sector_sql,
+    timeseries_sql,
+)
+from packages.etl.src.etl.quality import read_quality_results
 from ..repositories.duckdb_repository import DuckDBRepository
+from .cache import BuildVersion, ResultCache
+from .pagination import decode_cursor, encode_cursor
 
 
 class AnalyticsService:
-    def __init__(self, repository: DuckDBRepository):
+    def __init__(
+        self,
+        repository: DuckDBRepository,
+        cache: ResultCache | None = None,
+        build_version: BuildVersion | None = None,
+    ):
         self.repository = repository
+        self.cache = cache
+        self.build_version = build_version
+
+    def _cached(self, endpoint: str, params: tuple[Hashable, ...], compute: Callable[[], Any]) -> Any:
+        if self.cache is None:
+            return compute()
+        build_id = self.build_version.current() if self.build_version else "unversioned"
+        return self.cache.get_or_compute((endpoint, params, build_id), compute)
 
-    @lru_cache(maxsize=64)
     def overview(self, year: int | None = None) -> dict:
-        exports = self.repository.read("fact_exports")
-        imports = self.repository.read("fact_imports")
-        exports, imports = validate_kpi_inputs(exports, imports)
-        return overview_kpis(exports, imports, year)
-
-    @lru_cache(maxsize=64)
-    def dependency(self) -> list[dict]:
-        exports = self.repository.read("fact_exports")
-        dep = dependency_by_product(exports)
-        high = dep[dep["share_china"] >= 0.5].sort_values("share_china", ascending=False)
-        return high.to_dict(orient="records")
+        return self._cached("overview", (year,), lambda: self._overview(year))
+
+    def data_quality(self) -> dict:
+        return self._cached("data_quality", (), self._data_quality)
+
+    def dependency(
+        self,
+        hs_level: int = 10,
+        year_from: int | None = None,
+        year_to: int | None = None,
+        partner: str = "156",
+        threshold: float = 0.5,
+        flow: str = "exports",
+        limit: int = 100,
+        cursor: str | None = None,
+    ) -> dict:
+        filters = (hs_level, year_from, year_to, normalize_country_code(partner), threshold, flow)
+        after = decode_cursor(cursor, filters, is_dependency_key) if cursor else None
+        page = self._cached(
+            "dependency", (*filters, limit, after), lambda: self._dependency(filters, limit, after)
+        )
+        next_key = page["next"]
+        return {
+            **{k: v for k, v in page.items() if k != "next"},
+            "next_cursor": encode_cursor(next_key, filters) if next_key else None,
+        }
+
+    def timeseries(
+        self,
+        granularity: str = "year",
+        hs_prefix: str | None = None,
+        countries: list[str] | None = None,
+        year_from: int | None = None,
+        year_to: int | None = None,
+    ) -> dict:
+        keys = tuple(sorted({normalize_country_code(c) for c in countries or []}))
+        params = (granularity, hs_prefix, keys, year_from, year_to)
+        return self._cached("timeseries", params, lambda: self._timeseries(*params))
+
+    def sector(
+        self,
+        group_by: str = "sector_industria",
+        year_from: int | None = None,
+        year_to: int | None = None,
+        partner: str = "156",
+        flow: str = "exports",
+    ) -> dict:
+        params = (group_by, year_from, year_to, normalize_country_code(partner), flow)
+        return self._cached("sector", params, lambda: self._sector(*params))
+
+    def stream_dependency(
+        self,
+        hs_level: int = 10,
+        year_from: int | None = None,
+        year_to: int | None = None,
+        partner: str = "156",
+        threshold: float = 0.5,
+        flow: str = "exports",
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> Iterator[str]:
+        filters = (hs_level, year_from, year_to, normalize_country_code(partner), threshold, flow)
+        after = decode_cursor(cursor, filters, is_dependency_key) if cursor else None
+        return self._stream_dependency(filters, limit, after)
+
+    def _data_quality(self) -> dict:
+        with self.repository.connection("data_quality") as conn:
+            rules = read_quality_results(conn)
+        return {
+            "build_id": rules[0]["run_id"] if rules else None,
+            "passed": all(rule["passed"] for rule in rules if rule["severity"] == "error"),
+            "failed": sum(not rule["passed"] for rule in rules),
+            "rules": [{k: v for k, v in rule.items() if k != "run_id"} for rule in rules],
+        }
+
+    def _overview(self, year: int | None) -> dict:
+        with self.repository.connection("overview", f"year={year}") as conn:
+            return overview_kpis_sql(conn, year)
+
+    def _dependency(self, filters: tuple, limit: int, after: tuple | None) -> dict:
+        hs_level, year_from, year_to, partner, threshold, flow = filters
+        with self.repository.connection("dependency", f"filters={filters} limit={limit}") as conn:
+            return dependency_sql(
+                conn,
+                hs_level=hs_level,
+                year_from=year_from,
+                year_to=year_to,
+                partner=partner,
+                threshold=threshold,
+                flow=flow,
+                limit=limit,
+                after=after,
+            )
+
+    def _timeseries(
+        self,
+        granularity: str,
+        hs_prefix: str | None,
+        countries: tuple[str, ...],
+        year_from: int | None,
+        year_to: int | None,
+    ) -> dict:
+        detail = f"granularity={granularity} hs_prefix={hs_prefix} countries={countries} years={year_from}-{year_to}"
+        with self.repository.connection("timeseries", detail) as conn:
+            return timeseries_sql(conn, granularity, hs_prefix, list(countries), year_from, year_to)
+
+    def _sector(
+        self, group_by: str, year_from: int | None, year_to: int | None, partner: str, flow: str
+    ) -> dict:
+        detail = f"group_by={group_by} flow={flow} partner={partner} years={year_from}-{year_to}"
+        with self.repository.connection("sector", detail) as conn:
+            return sector_sql(conn, group_by, year_from, year_to, partner, flow)
+
+    def _stream_dependency(self, filters: tuple, limit: int | None, after: tuple | None) -> Iterator[str]:
+        hs_level, year_from, year_to, partner, threshold, flow = filters
+        with self.repository.connection("dependency_stream", f"filters={filters} limit={limit}") as conn:
+            rows = iter_dependency_sql(
+                conn,
+                hs_level=hs_level,
+                year_from=year_from,
+                year_to=year_to,
+                partner=partner,
+                threshold=threshold,
+                flow=flow,
+                limit=limit,
+                after=after,
+            )
+            for item in rows:
+                yield json.dumps(item, separators=(",", ":")) + "\n"
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from packages.etl.src.etl.build import build_marker_path, read_build_marker, resolve_database, resolve_outputs
+
+logger = logging.getLogger(__name__)
+
+
+class BuildVersion:
+    def __init__(self, duckdb_path: str):
+        self.duckdb_path = duckdb_path
+        self.marker = build_marker_path(duckdb_path)
+        self._lock = threading.Lock()
+        self._stamp: tuple[int, int] | None = None
+        self._build_id = "unversioned"
+        self._database = str(duckdb_path)
+        self._outputs: str | None = None
+        self._listeners: list[Callable[[str], None]] = []
+        self._stop = threading.Event()
+        self._watcher: threading.Thread | None = None
+
+    def subscribe(self, listener: Callable[[str], None]) -> None:
+        # Se invoca con el nuevo build_id apenas se detecta el cambio de marker; no debe bloquear.
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _refresh(self) -> tuple[str, str, str | None]:
+        try:
+            stat = os.stat(self.marker)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        changed = False
+        with self._lock:
+            if stamp != self._stamp:
+                self._stamp = stamp
+                data = read_build_marker(self.duckdb_path) if stamp else {}
+                previous, self._build_id = self._build_id, data.get("build_id", "unversioned")
+                self._database = str(resolve_database(self.duckdb_path, data))
+                outputs = resolve_outputs(self.duckdb_path, data)
+                self._outputs = str(outputs) if outputs is not None else None
+                changed = self._build_id != previous
+            build_id, database, outputs = self._build_id, self._database, self._outputs
+            listeners = list(self._listeners)
+        if changed:
+            for listener in listeners:
+                try:
+                    listener(build_id)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Error notificando el build %s: %s", build_id, exc)
+        return build_id, database, outputs
+
+    def watch(self, interval: float) -> None:
+        # Sondea el marker en segundo plano para que los índices en memoria se reconstruyan tras el ETL sin
+        # esperar a la primera request que lo note.
+        if self._watcher is not None or interval <= 0:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), name="build-watcher", daemon=True)
+        self._watcher.start()
+
+    def _watch(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self._refresh()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def current(self) -> str:
+        return self._refresh()[0]
+
+    def database(self) -> str:
+        return self._refresh()[1]
+
+    def outputs(self) -> str | None:
+        return self._refresh()[2]
+
+
+class ResultCache:
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import threading
+import time
+from typing import Any, Callable, Iterator, TypeVar
+
+from ..repositories.connection_pool import InterruptToken, current_interrupt_token
+from .streaming import primed
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class QueryRejectedError(RuntimeError):
+    pass
+
+
+class QueryTimeoutError(TimeoutError):
+    pass
+
+
+class QueryExecutor:
+    def __init__(self, max_workers: int = 4, max_queue: int = 16, timeout: float = 30.0):
+        if max_workers < 1:
+            raise ValueError("max_workers debe ser >= 1")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="duckdb-query")
+        # Cupos = consultas en ejecución + en cola; se liberan cuando el hilo termina, no al vencer el timeout.
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @staticmethod
+    def _call(token: InterruptToken, fn: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        reset = current_interrupt_token.set(token)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            current_interrupt_token.reset(reset)
+
+    def _done(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def _admit(self) -> None:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise QueryRejectedError("Cola de consultas llena")
+        with self._lock:
+            self._pending += 1
+
+    def _timed_out(self, name: str, limit: float, interrupted: int) -> QueryTimeoutError:
+        with self._lock:
+            self.timed_out += 1
+        logger.warning("Consulta %s superó %ss; %s conexiones DuckDB interrumpidas", name, limit, interrupted)
+        return QueryTimeoutError(f"La consulta superó el límite de {limit}s")
+
+    async def run(self, fn: Callable[..., T], *args: Any, timeout: float | None = None, **kwargs: Any) -> T:
+        self._admit()
+        token = InterruptToken()
+        try:
+            future = self._pool.submit(self._call, token, fn, args, kwargs)
+        except BaseException:
+            self._done(None)
+            raise
+        future.add_done_callback(self._done)
+
+        limit = self.timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), limit)
+        except asyncio.TimeoutError as exc:
+            future.cancel()
+            interrupted = token.interrupt()
+            raise self._timed_out(getattr(fn, "__name__", repr(fn)), limit, interrupted) from exc
+
+    async def stream(
+        self, fn: Callable[..., Iterator[T]], *args: Any, timeout: float | None = None, **kwargs: Any
+    ) -> QueryStream:
+        # Una descarga retiene cupo y conexión mientras dura la respuesta; el primer lote se trae aquí, antes de
+        # enviar headers, para que el rechazo, el timeout o un error de DuckDB lleguen a los handlers.
+        self._admit()
+        limit = self.timeout if timeout is None else timeout
+        stream = QueryStream(self, InterruptToken(), limit, getattr(fn, "__name__", repr(fn)))
+        try:
+            await stream.open(lambda: primed(fn(*args, **kwargs)))
+        except BaseException:
+            stream.close()
+            raise
+        return stream
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = self._pending
+            rejected, timed_out = self.rejected, self.timed_out
+        return {
+            "workers": self.max_workers,
+            "queue_size": self.max_queue,
+            "pending": pending,
+            "rejected": rejected,
+            "timed_out": timed_out,
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_END = object()
+
+
+class QueryStream:
+    def __init__(self, executor: QueryExecutor, token: InterruptToken, limit: float, name: str):
+        self.executor = executor
+        self.token = token
+        self.limit = limit
+        self.name = name
+        self._chunks: Iterator | None = None
+        self._running: Future | None = None
+        self._sent_at: float | None = None
+        self._closed = False
+
+    async def _step(self, fn: Callable[[], T]) -> T:
+        # Cada lote corre en un hilo del executor y libera el hilo al terminar: un cliente lento retiene el cupo
+        # y la conexión, pero no un worker.
+        future = self.executor._pool.submit(self.executor._call, self.token, fn, (), {})
+        self._running = future
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.limit)
+        except asyncio.TimeoutError as exc:
+            raise self.executor._timed_out(self.name, self.limit, self.token.interrupt()) from exc
+
+    async def open(self, factory: Callable[[], Iterator]) -> None:
+        self._chunks = await self._step(factory)
+
+    def __aiter__(self) -> QueryStream:
+        return self
+
+    async def __anext__(self):
+        try:
+            if self._sent_at is not None and time.monotonic() - self._sent_at > self.limit:
+                # El cliente tardó más que el límite en recibir el lote anterior: se corta la descarga.
+                raise self.executor._timed_out(self.name, self.limit, self.token.interrupt())
+            chunk = await self._step(lambda: next(self._chunks, _END))
+        except BaseException:
+            self.close()
+            raise
+        if chunk is _END:
+            self.close()
+            raise StopAsyncIteration
+        self._sent_at = time.monotonic()
+        return chunk
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        chunks, running = self._chunks, self._running
+
+        def finish(_future=None) -> None:
+            # Cerrar el generador devuelve la conexión al pool; el cupo se libera recién después.
+            try:
+                if chunks is not None:
+                    self.executor._call(self.token, chunks.close, (), {})
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Error cerrando la descarga %s: %s", self.name, exc)
+            finally:
+                self.executor._done(None)
+
+        # Un lote todavía en curso (p.ej. interrumpido por timeout) cierra el generador al terminar su hilo.
+        if running is not None and not running.done():
+            running.add_done_callback(finish)
+        else:
+            finish()
+
+    def __del__(self) -> None:
+        # Respuesta abandonada antes de iterar (cliente desconectado): no debe quedar el cupo tomado.
+        self.close()
+
+
+_executor: QueryExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers: int = 4, max_queue: int = 16, timeout: float = 30.0) -> QueryExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = QueryExecutor(max_workers=max_workers, max_queue=max_queue, timeout=timeout)
+        return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
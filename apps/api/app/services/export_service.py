@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import io
+import re
+from typing import Callable, Iterator
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from packages.analytics.src.analytics import normalize_country_code
+from packages.analytics.src.analytics.sql_kpis import COUNTRY_KEY_SQL, hs_prefix_range
+from ..repositories.duckdb_repository import DuckDBRepository
+
+EXPORT_TABLES = ("fact_exports", "fact_imports")
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+PARQUET = "application/vnd.apache.parquet"
+MEDIA_TYPES = {
+    ARROW_STREAM: ARROW_STREAM,
+    "application/vnd.apache.arrow": ARROW_STREAM,
+    PARQUET: PARQUET,
+    "application/x-parquet": PARQUET,
+}
+FORMAT_ALIASES = {"arrow": ARROW_STREAM, "parquet": PARQUET}
+
+
+class UnsupportedMediaType(ValueError):
+    pass
+
+
+def negotiate_format(accept: str | None, fmt: str | None = None) -> str:
+    if fmt:
+        if fmt not in FORMAT_ALIASES:
+            raise UnsupportedMediaType(f"Formato no soportado: {fmt}")
+        return FORMAT_ALIASES[fmt]
+
+    ranges = []
+    for position, part in enumerate((accept or "*/*").split(",")):
+        media, _, params = part.strip().partition(";")
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            quality = float(match.group(1))
+        ranges.append((-quality, position, media.strip().lower()))
+    for neg_quality, _, media in sorted(ranges):
+        if neg_quality == 0:
+            continue
+        if media in MEDIA_TYPES:
+            return MEDIA_TYPES[media]
+        if media in ("*/*", "application/*", ""):
+            return ARROW_STREAM
+    raise UnsupportedMediaType(f"Ningún formato aceptable en Accept: {accept}")
+
+
+class _Chunks(io.RawIOBase):
+    def __init__(self):
+        self._parts: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+
+def _arrow_writer(sink: _Chunks, schema: pa.Schema):
+    return ipc.new_stream(sink, schema)
+
+
+def _parquet_writer(sink: _Chunks, schema: pa.Schema):
+    return pq.ParquetWriter(sink, schema, compression="zstd")
+
+
+WRITERS: dict[str, Callable[[_Chunks, pa.Schema], object]] = {
+    ARROW_STREAM: _arrow_writer,
+    PARQUET: _parquet_writer,
+}
+
+
+class DataExportService:
+    def __init__(self, repository: DuckDBRepository, batch_rows: int = 65_536):
+        self.repository = repository
+        self.batch_rows = batch_rows
+
+    def query(
+        self,
+        table: str,
+        columns: list[str] | None = None,
+        year_from: int | None = None,
+        year_to: int | None = None,
+        hs_prefix: str | None = None,
+        countries: list[str] | None = None,
+        limit: int | None = None,
+    ) -> tuple[str, list]:
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Tabla no exportable: {table}")
+        available = self.repository.columns(table)
+        selected = columns or available
+        unknown = [c for c in selected if c not in available]
+        if unknown:
+            raise ValueError(f"Columnas desconocidas en {table}: {unknown}")
+
+        clauses, params = [], []
+        if year_from is not None:
+            clauses.append("year >= ?")
+            params.append(year_from)
+        if year_to is not None:
+            clauses.append("year <= ?")
+            params.append(year_to)
+        if hs_prefix:
+            clauses.append("hs10 BETWEEN ? AND ?")
+            params.extend(hs_prefix_range(hs_prefix))
+        if countries:
+            keys = [normalize_country_code(c) for c in countries]
+            clauses.append(f"{COUNTRY_KEY_SQL} IN ({', '.join('?' for _ in keys)})")
+            params.extend(keys)
+
+        projection = ", ".join(f'"{c}"' for c in selected)
+        sql = f"SELECT {projection} FROM {table}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
+
+    def stream(self, sql: str, params: list, media_type: str) -> Iterator[bytes]:
+        sink = _Chunks()
+        with self.repository.arrow_reader(sql, params, self.batch_rows, operation="data_export") as reader:
+            writer = WRITERS[media_type](sink, reader.schema)
+            for batch in reader:
+                writer.write_batch(batch)
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            writer.close()
+        yield sink.drain()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+import duckdb
+import pandas as pd
+
+from packages.analytics.src.analytics.sql_kpis import value_filter
+from packages.core.src.core.hs_tree import HSTree
+from ..repositories.duckdb_repository import DuckDBRepository
+from .cache import BuildVersion
+
+logger = logging.getLogger(__name__)
+
+
+def hs_totals_sql(conn: duckdb.DuckDBPyConnection) -> str:
+    # Los cubos llegan hasta hs6 y el árbol sirve totales de hs8/hs10, así que suma los hechos; con los mismos
+    # filtros de validez que los KPIs (value_filter) para que la raíz coincida con /kpis/overview.
+    return f"""
+        SELECT hs10, year,
+               COALESCE(SUM(fob) FILTER (WHERE flow = 'exports'), 0) AS exports_fob,
+               COALESCE(SUM(fob) FILTER (WHERE flow = 'imports'), 0) AS imports_fob,
+               COALESCE(SUM(cif) FILTER (WHERE flow = 'imports'), 0) AS imports_cif
+        FROM (
+            SELECT hs10, year, 'exports' AS flow, fob, CAST(NULL AS DOUBLE) AS cif
+            FROM fact_exports WHERE {value_filter(conn, "fact_exports")}
+            UNION ALL
+            SELECT hs10, year, 'imports' AS flow, fob, cif
+            FROM fact_imports WHERE {value_filter(conn, "fact_imports")}
+        )
+        GROUP BY hs10, year
+    """
+
+
+class HSIndex:
+    def __init__(self, repository: DuckDBRepository, build_version: BuildVersion | None = None):
+        self.repository = repository
+        self.build_version = build_version
+        self._lock = threading.Lock()
+        self._tree: HSTree | None = None
+        self._build_id: str | None = None
+        self._loading: str | None = None
+        if build_version is not None:
+            build_version.subscribe(self.refresh)
+
+    def current(self) -> HSTree:
+        build_id = self.build_version.current() if self.build_version else "unversioned"
+        if self._tree is None:
+            with self._lock:
+                if self._tree is None:
+                    self._tree, self._build_id = self._load(), build_id
+            return self._tree
+        if build_id != self._build_id:
+            self.refresh(build_id)
+        return self._tree
+
+    def refresh(self, build_id: str) -> None:
+        # Tras un build el árbol se reconstruye en segundo plano (escanea los hechos); mientras tanto se sigue
+        # sirviendo el anterior. Sin árbol previo, current() lo construye en línea.
+        with self._lock:
+            if self._tree is None or build_id in (self._build_id, self._loading):
+                return
+            self._loading = build_id
+        threading.Thread(target=self._warm, args=(build_id,), name="hs-index-refresh", daemon=True).start()
+
+    def _warm(self, build_id: str) -> None:
+        try:
+            tree = self._load()
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("No se pudo reconstruir el índice HS para el build %s: %s", build_id, exc)
+            tree = None
+        with self._lock:
+            # Un build más nuevo pedido durante la carga la deja obsoleta: solo se publica la última solicitada.
+            if self._loading != build_id:
+                return
+            self._loading = None
+            if tree is not None:
+                self._tree, self._build_id = tree, build_id
+
+    def _load(self) -> HSTree:
+        started = time.perf_counter()
+        with self.repository.connection("hs_index_load") as conn:
+            tables = {row[0] for row in conn.execute("SELECT table_name FROM information_schema.tables").fetchall()}
+            dim_hs = (
+                conn.execute("SELECT hs10, descripcion_final, tipo_elemento FROM dim_hs").df()
+                if "dim_hs" in tables
+                else pd.DataFrame(columns=["hs10", "descripcion_final", "tipo_elemento"])
+            )
+            totals = conn.execute(hs_totals_sql(conn)).df()
+        tree = HSTree.build(dim_hs, totals)
+        logger.info("Índice HS construido: %s nodos en %.2fs", len(tree), time.perf_counter() - started)
+        return tree
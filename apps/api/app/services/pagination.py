@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from typing import Callable, Hashable
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _scope(params: tuple[Hashable, ...]) -> str:
+    return hashlib.sha1(repr(params).encode("utf-8")).hexdigest()[:12]
+
+
+def encode_cursor(key: tuple, params: tuple[Hashable, ...]) -> str:
+    payload = json.dumps({"k": list(key), "s": _scope(params)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(
+    cursor: str, params: tuple[Hashable, ...], validate: Callable[[tuple], bool] | None = None
+) -> tuple:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        key, scope = payload["k"], payload["s"]
+    except (ValueError, TypeError, KeyError) as exc:
+        raise InvalidCursorError("Cursor inválido") from exc
+    if scope != _scope(params) or not isinstance(key, list):
+        raise InvalidCursorError("El cursor no corresponde a los filtros de la consulta")
+    key = tuple(key)
+    if validate is not None and not validate(key):
+        raise InvalidCursorError("Cursor inválido")
+    return key
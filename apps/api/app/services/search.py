@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+import threading
+
+from packages.etl.src.etl.search_index import HSSearchIndex, search_index_dir
+from .cache import BuildVersion
+
+logger = logging.getLogger(__name__)
+
+
+class HSSearch:
+    def __init__(self, directory: str | Path, build_version: BuildVersion | None = None):
+        # directory solo se usa si el marker no indica las salidas del build (builds anteriores o sin marker).
+        self.directory = Path(directory)
+        self.build_version = build_version
+        self._lock = threading.Lock()
+        self._index: HSSearchIndex | None = None
+        self._build_id: str | None = None
+
+    def _directory(self) -> Path:
+        outputs = self.build_version.outputs() if self.build_version else None
+        return search_index_dir(outputs) if outputs else self.directory
+
+    def current(self) -> HSSearchIndex:
+        build_id = self.build_version.current() if self.build_version else "unversioned"
+        if self._index is not None and build_id == self._build_id:
+            return self._index
+        with self._lock:
+            if self._index is None or build_id != self._build_id:
+                self._index = HSSearchIndex.load(self._directory())
+                self._build_id = build_id
+                logger.info("Índice de búsqueda HS cargado: %s documentos", len(self._index))
+            return self._index
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        return self.current().search(query, limit)
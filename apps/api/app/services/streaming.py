@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from typing import Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+def primed(chunks: Iterator[T]) -> Iterator[T]:
+    # Toma la conexión, ejecuta la consulta y trae el primer lote antes de armar la respuesta: un error del pool o
+    # de DuckDB llega a los handlers (503/504) en lugar de cortar un 200 cuyos headers ya se enviaron.
+    try:
+        first = next(chunks)
+    except StopIteration:
+        return iter(())
+    return _resume(first, chunks)
+
+
+def _resume(first: T, chunks: Iterator[T]) -> Iterator[T]:
+    yield first
+    yield from chunks
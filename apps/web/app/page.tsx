@@ -4,7 +4,7 @@ import { CountryChart } from '../components/CountryChart'
 import { DependencyTable } from '../components/DependencyTable'
 
 export default async function Home() {
-  const [overview, dependency] = await Promise.all([fetchOverview(), fetchDependency()])
+  const [overview, dependency] = await Promise.all([fetchOverview(), fetchDependency({ limit: 10 })])
 
   return (
     <main className="p-8 space-y-6">
@@ -12,7 +12,7 @@ export default async function Home() {
       <KpiCards overview={overview} />
       <section className="grid md:grid-cols-2 gap-4">
         <CountryChart data={overview.country_ranking} />
-        <DependencyTable rows={dependency} />
+        <DependencyTable rows={dependency.items} />
       </section>
     </main>
   )
@@ -3,12 +3,12 @@ export function DependencyTable({ rows }: { rows: any[] }) {
     <div className="bg-white p-4 rounded-xl shadow">
       <h3 className="font-semibold mb-2">Dependencia China >50%</h3>
       <table className="w-full text-sm">
-        <thead><tr><th className="text-left">HS10</th><th className="text-left">Share China</th></tr></thead>
+        <thead><tr><th className="text-left">HS</th><th className="text-left">Share China</th></tr></thead>
         <tbody>
           {rows.slice(0, 10).map((r) => (
-            <tr key={r.hs10} className="border-t">
-              <td>{r.hs10}</td>
-              <td>{(r.share_china * 100).toFixed(1)}%</td>
+            <tr key={r.hs_code} className="border-t">
+              <td>{r.hs_code}</td>
+              <td>{(r.share_partner * 100).toFixed(1)}%</td>
             </tr>
           ))}
         </tbody>
@@ -5,8 +5,39 @@ export async function fetchOverview(year?: number) {
   return res.json();
 }
 
-export async function fetchDependency() {
-  const res = await fetch('http://localhost:8000/api/kpis/dependency', { cache: 'no-store' });
+export async function fetchDependency(params: Record<string, string | number> = {}) {
+  const qs = new URLSearchParams(Object.entries(params).map(([k, v]) => [k, String(v)])).toString();
+  const res = await fetch(`http://localhost:8000/api/kpis/dependency${qs ? `?${qs}` : ''}`, { cache: 'no-store' });
   if (!res.ok) throw new Error('Error dependency');
   return res.json();
 }
+
+export function dataExportUrl(
+  table: 'fact_exports' | 'fact_imports',
+  params: Record<string, string | number> = {},
+  format: 'arrow' | 'parquet' = 'parquet',
+) {
+  const qs = new URLSearchParams({ ...Object.fromEntries(Object.entries(params).map(([k, v]) => [k, String(v)])), format });
+  return `http://localhost:8000/api/data/${table}?${qs.toString()}`;
+}
+
+export async function fetchTimeseries(granularity: 'year' | 'month' = 'year', params: Record<string, string | number> = {}) {
+  const qs = new URLSearchParams({ ...Object.fromEntries(Object.entries(params).map(([k, v]) => [k, String(v)])), granularity });
+  const res = await fetch(`http://localhost:8000/api/kpis/timeseries?${qs.toString()}`, { cache: 'no-store' });
+  if (!res.ok) throw new Error('Error timeseries');
+  return res.json();
+}
+
+export async function fetchHsChildren(code: string = 'root', year?: number) {
+  const qs = year ? `?year=${year}` : '';
+  const res = await fetch(`http://localhost:8000/api/hs/${code}/children${qs}`, { cache: 'no-store' });
+  if (!res.ok) throw new Error('Error hs children');
+  return res.json();
+}
+
+export async function searchHs(q: string, limit = 20) {
+  const qs = new URLSearchParams({ q, limit: String(limit) });
+  const res = await fetch(`http://localhost:8000/api/hs/search?${qs.toString()}`, { cache: 'no-store' });
+  if (!res.ok) throw new Error('Error hs search');
+  return res.json();
+}
@@ -1,4 +1,24 @@
 from .kpis import overview_kpis, dependency_by_product
+from .sql_kpis import (
+    dependency_sql,
+    is_dependency_key,
+    iter_dependency_sql,
+    normalize_country_code,
+    overview_kpis_sql,
+    sector_sql,
+    timeseries_sql,
+)
 from .validators import validate_kpi_inputs
 
-__all__ = ["overview_kpis", "dependency_by_product", "validate_kpi_inputs"]
+__all__ = [
+    "overview_kpis",
+    "dependency_by_product",
+    "overview_kpis_sql",
+    "dependency_sql",
+    "is_dependency_key",
+    "iter_dependency_sql",
+    "normalize_country_code",
+    "sector_sql",
+    "timeseries_sql",
+    "validate_kpi_inputs",
+]
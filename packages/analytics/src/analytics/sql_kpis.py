@@ -0,0 +1,593 @@
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+import logging
+import re
+from typing import Iterator
+
+import duckdb
+
+from packages.etl.src.etl.quality import QUALITY_TABLE
+from packages.etl.src.etl.rollups import ROLLUP_LEVELS, SECTOR_LOOKUP, rollup_table
+
+logger = logging.getLogger(__name__)
+
+RANKING_LIMIT = 10
+
+
+def _year_clause(year: int | None) -> tuple[str, list]:
+    if year:
+        return "AND year = ?", [year]
+    return "", []
+
+
+def _year_range_clause(year_from: int | None, year_to: int | None) -> tuple[str, list]:
+    clauses, params = [], []
+    if year_from is not None:
+        clauses.append("AND year >= ?")
+        params.append(year_from)
+    if year_to is not None:
+        clauses.append("AND year <= ?")
+        params.append(year_to)
+    return " ".join(clauses), params
+
+
+def resolve_cube(conn: duckdb.DuckDBPyConnection, hs_level: int | None = None) -> str | None:
+    # Nombres y niveles de los cubos vienen del ETL (rollups): el cubo más agregado que cubre el nivel pedido.
+    cubes = [rollup_table(level) for level in sorted(ROLLUP_LEVELS)]
+    placeholders = ", ".join("?" for _ in cubes)
+    tables = {
+        row[0]
+        for row in conn.execute(
+            f"SELECT table_name FROM information_schema.tables WHERE table_name IN ({placeholders})", cubes
+        ).fetchall()
+    }
+    for level in sorted(ROLLUP_LEVELS):
+        if level >= (hs_level or 0) and rollup_table(level) in tables:
+            return rollup_table(level)
+    return None
+
+
+def cube_level(cube: str) -> int:
+    return next(level for level in ROLLUP_LEVELS if rollup_table(level) == cube)
+
+
+# Columnas de valor por tabla de hechos. El ETL registra en data_quality si cumplieron la regla no_negativo;
+# en ese caso las consultas confían en el build y no vuelven a filtrar negativos fila por fila.
+VALUE_COLUMNS = {"fact_exports": ("fob",), "fact_imports": ("fob", "cif")}
+
+
+def value_filter(conn: duckdb.DuckDBPyConnection, table: str) -> str:
+    columns = VALUE_COLUMNS[table]
+    has_quality = conn.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_name = ?", [QUALITY_TABLE]
+    ).fetchone()
+    if has_quality is not None:
+        placeholders = ", ".join("?" for _ in columns)
+        validated = conn.execute(
+            f"""
+            SELECT count(*) FROM {QUALITY_TABLE}
+            WHERE table_name = ? AND rule = 'no_negativo' AND passed AND column_name IN ({placeholders})
+            """,
+            [table, *columns],
+        ).fetchone()[0]
+        if validated == len(columns):
+            return "TRUE"
+    return " AND ".join(f"{column} >= 0" for column in columns)
+
+
+def overview_kpis_sql(conn: duckdb.DuckDBPyConnection, year: int | None = None) -> dict:
+    cube = resolve_cube(conn)
+    if cube is not None:
+        return _overview_from_cube(conn, cube, year)
+    return _overview_from_facts(conn, year)
+
+
+def _overview_payload(total_exports: float, total_imports: float, total_cif: float, ranking: list[tuple]) -> dict:
+    return {
+        "total_exports_fob": total_exports,
+        "total_imports_fob": total_imports,
+        "trade_balance": total_exports - total_imports,
+        "logistics_cost": total_cif - total_imports,
+        "country_ranking": [{"country_name": name, "fob": float(fob)} for name, fob in ranking],
+    }
+
+
+def _overview_from_cube(conn: duckdb.DuckDBPyConnection, cube: str, year: int | None) -> dict:
+    year_sql, year_params = _year_clause(year)
+    totals = conn.execute(
+        f"""
+        SELECT
+            COALESCE(SUM(fob) FILTER (WHERE flow = 'exports'), 0),
+            COALESCE(SUM(fob) FILTER (WHERE flow = 'imports'), 0),
+            COALESCE(SUM(cif) FILTER (WHERE flow = 'imports'), 0)
+        FROM {cube}
+        WHERE TRUE {year_sql}
+        """,
+        year_params,
+    ).fetchone()
+    ranking = conn.execute(
+        f"""
+        SELECT country_name, SUM(fob) AS fob
+        FROM {cube}
+        WHERE flow = 'exports' AND country_name IS NOT NULL {year_sql}
+        GROUP BY country_name
+        ORDER BY fob DESC, country_name
+        LIMIT ?
+        """,
+        [*year_params, RANKING_LIMIT],
+    ).fetchall()
+    return _overview_payload(float(totals[0]), float(totals[1]), float(totals[2]), ranking)
+
+
+def _overview_from_facts(conn: duckdb.DuckDBPyConnection, year: int | None) -> dict:
+    year_sql, year_params = _year_clause(year)
+
+    exports_row = conn.execute(
+        f"""
+        SELECT
+            COALESCE(SUM(fob) FILTER (WHERE fob >= 0), 0) AS total_fob,
+            COUNT(*) FILTER (WHERE fob < 0) AS negative_fob
+        FROM fact_exports
+        WHERE TRUE {year_sql}
+        """,
+        year_params,
+    ).fetchone()
+    total_exports, negative_exports = float(exports_row[0]), int(exports_row[1])
+    if negative_exports:
+        logger.warning("Se removieron %s filas de exportaciones por FOB negativo", negative_exports)
+
+    imports_row = conn.execute(
+        f"""
+        SELECT
+            COALESCE(SUM(fob) FILTER (WHERE fob >= 0 AND cif >= 0), 0) AS total_fob,
+            COALESCE(SUM(cif) FILTER (WHERE fob >= 0 AND cif >= 0), 0) AS total_cif,
+            COUNT(*) FILTER (WHERE fob < 0) AS negative_fob,
+            COUNT(*) FILTER (WHERE fob >= 0 AND cif < 0) AS negative_cif
+        FROM fact_imports
+        WHERE TRUE {year_sql}
+        """,
+        year_params,
+    ).fetchone()
+    total_imports, total_cif = float(imports_row[0]), float(imports_row[1])
+    if imports_row[2]:
+        logger.warning("Se removieron %s filas de importaciones por FOB negativo", int(imports_row[2]))
+    if imports_row[3]:
+        logger.warning("Se removieron %s filas de importaciones por CIF negativo", int(imports_row[3]))
+
+    ranking = conn.execute(
+        f"""
+        SELECT country_name, SUM(fob) AS fob
+        FROM fact_exports
+        WHERE {value_filter(conn, "fact_exports")} AND country_name IS NOT NULL {year_sql}
+        GROUP BY country_name
+        ORDER BY fob DESC, country_name
+        LIMIT ?
+        """,
+        [*year_params, RANKING_LIMIT],
+    ).fetchall()
+
+    return _overview_payload(total_exports, total_imports, total_cif, ranking)
+
+
+HS_LEVELS = (2, 4, 6, 8, 10)
+FLOWS = ("exports", "imports")
+DEFAULT_PARTNER_CODE = "156"
+DEPENDENCY_THRESHOLD = 0.5
+DEPENDENCY_LIMIT = 100
+
+# Los códigos de país llegan como texto desde Excel ("156", "156.0", "0156"); se comparan sin ceros ni decimales.
+COUNTRY_KEY_SQL = r"ltrim(regexp_replace(trim(CAST(country_code AS VARCHAR)), '\.0+$', ''), '0')"
+
+
+def normalize_country_code(code: str | int) -> str:
+    return re.sub(r"\.0+$", "", str(code).strip()).lstrip("0")
+
+
+def _dependency_source(conn: duckdb.DuckDBPyConnection, hs_level: int, flow: str) -> tuple[str, str, str, list]:
+    cube = resolve_cube(conn, hs_level)
+    if cube is not None:
+        level = cube_level(cube)
+        return cube, f"hs{level} // {10 ** (level - hs_level)}", "flow = ?", [flow]
+    table = "fact_exports" if flow == "exports" else "fact_imports"
+    return table, f"hs10 // {10 ** (10 - hs_level)}", value_filter(conn, table), []
+
+
+# El cursor compara valores exactos: SUM de DOUBLE en paralelo no es determinista en el último bit y un total
+# recalculado en la página siguiente podría saltear o repetir filas. Los montos se suman como DECIMAL y la
+# participación se redondea; el total viaja en el cursor como texto.
+KEY_AMOUNT = "DECIMAL(38, 4)"
+SHARE_DIGITS = 12
+DependencyKey = tuple[float, str, int]
+
+
+def _dependency_query(
+    conn: duckdb.DuckDBPyConnection,
+    hs_level: int,
+    year_from: int | None,
+    year_to: int | None,
+    partner: str | int,
+    threshold: float,
+    flow: str,
+    after: DependencyKey | None,
+    limit: int | None,
+    with_total: bool,
+) -> tuple[str, list]:
+    if hs_level not in HS_LEVELS:
+        raise ValueError(f"hs_level debe ser uno de {HS_LEVELS}")
+    if flow not in FLOWS:
+        raise ValueError(f"flow debe ser uno de {FLOWS}")
+
+    source, product_sql, where_sql, where_params = _dependency_source(conn, hs_level, flow)
+    year_sql, year_params = _year_range_clause(year_from, year_to)
+    params = [normalize_country_code(partner), *where_params, *year_params, threshold]
+
+    # Keyset sobre el orden estable (share DESC, fob_total DESC, product ASC).
+    keyset_sql = ""
+    if after is not None:
+        keyset_sql = f"""
+        WHERE share_partner < ?
+           OR (share_partner = ? AND fob_total < CAST(? AS {KEY_AMOUNT}))
+           OR (share_partner = ? AND fob_total = CAST(? AS {KEY_AMOUNT}) AND product > ?)
+        """
+        share, total, product = after
+        params += [share, share, total, share, total, product]
+    limit_sql = ""
+    if limit is not None:
+        limit_sql = "LIMIT ?"
+        params.append(limit)
+
+    sql = f"""
+        WITH shares AS (
+            SELECT {product_sql} AS product,
+                   SUM(CAST(fob AS {KEY_AMOUNT})) AS fob_total,
+                   COALESCE(SUM(CAST(fob AS {KEY_AMOUNT})) FILTER (WHERE {COUNTRY_KEY_SQL} = ?), 0) AS fob_partner
+            FROM {source}
+            WHERE {where_sql} {year_sql}
+            GROUP BY ALL
+        ),
+        matches AS (
+            SELECT product, fob_total, fob_partner, round(fob_partner / fob_total, {SHARE_DIGITS}) AS share_partner
+                   {", COUNT(*) OVER () AS total" if with_total else ""}
+            FROM shares
+            WHERE fob_total > 0 AND round(fob_partner / fob_total, {SHARE_DIGITS}) >= ?
+        )
+        SELECT * FROM matches
+        {keyset_sql}
+        ORDER BY share_partner DESC, fob_total DESC, product
+        {limit_sql}
+    """
+    return sql, params
+
+
+def _dependency_item(row: tuple, hs_level: int) -> dict:
+    product, fob_total, fob_partner, share = row[:4]
+    return {
+        "hs_code": str(int(product)).zfill(hs_level),
+        "fob_total": float(fob_total),
+        "fob_partner": float(fob_partner),
+        "share_partner": float(share),
+    }
+
+
+def dependency_key(row: tuple) -> DependencyKey:
+    product, fob_total, _, share = row[:4]
+    return float(share), str(fob_total), int(product)
+
+
+def is_dependency_key(key: tuple) -> bool:
+    # Valida un cursor recibido del cliente antes de que llegue al SQL o a la clave de caché.
+    if len(key) != 3:
+        return False
+    share, total, product = key
+    if isinstance(share, bool) or not isinstance(share, (int, float)):
+        return False
+    if isinstance(product, bool) or not isinstance(product, int) or not isinstance(total, str):
+        return False
+    try:
+        return Decimal(total).is_finite()
+    except InvalidOperation:
+        return False
+
+
+def dependency_sql(
+    conn: duckdb.DuckDBPyConnection,
+    hs_level: int = 10,
+    year_from: int | None = None,
+    year_to: int | None = None,
+    partner: str | int = DEFAULT_PARTNER_CODE,
+    threshold: float = DEPENDENCY_THRESHOLD,
+    flow: str = "exports",
+    limit: int = DEPENDENCY_LIMIT,
+    after: DependencyKey | None = None,
+) -> dict:
+    sql, params = _dependency_query(
+        conn, hs_level, year_from, year_to, partner, threshold, flow, after, limit + 1, with_total=True
+    )
+    rows = conn.execute(sql, params).fetchall()
+    items = [_dependency_item(row, hs_level) for row in rows[:limit]]
+    return {
+        "hs_level": hs_level,
+        "flow": flow,
+        "partner": normalize_country_code(partner),
+        "threshold": threshold,
+        "total": int(rows[0][4]) if rows else 0,
+        "items": items,
+        "next": dependency_key(rows[limit - 1]) if len(rows) > limit else None,
+    }
+
+
+def iter_dependency_sql(
+    conn: duckdb.DuckDBPyConnection,
+    hs_level: int = 10,
+    year_from: int | None = None,
+    year_to: int | None = None,
+    partner: str | int = DEFAULT_PARTNER_CODE,
+    threshold: float = DEPENDENCY_THRESHOLD,
+    flow: str = "exports",
+    limit: int | None = None,
+    after: DependencyKey | None = None,
+    batch_size: int = 2048,
+) -> Iterator[dict]:
+    sql, params = _dependency_query(
+        conn, hs_level, year_from, year_to, partner, threshold, flow, after, limit, with_total=False
+    )
+    result = conn.execute(sql, params)
+    while rows := result.fetchmany(batch_size):
+        for row in rows:
+            yield _dependency_item(row, hs_level)
+
+
+GRANULARITIES = ("year", "month")
+
+
+def hs_prefix_range(prefix: str, width: int = 10) -> tuple[int, int]:
+    if not re.fullmatch(rf"\d{{1,{width}}}", prefix):
+        raise ValueError(f"hs_prefix debe tener entre 1 y {width} dígitos")
+    scale = 10 ** (width - len(prefix))
+    return int(prefix) * scale, (int(prefix) + 1) * scale - 1
+
+
+def _timeseries_source(
+    conn: duckdb.DuckDBPyConnection,
+    hs_prefix: str | None,
+    countries: list[str] | None,
+    year_from: int | None,
+    year_to: int | None,
+) -> tuple[str, list]:
+    year_sql, year_params = _year_range_clause(year_from, year_to)
+    filters, params = [f"year > 0 {year_sql}"], list(year_params)
+    if countries:
+        keys = [normalize_country_code(c) for c in countries]
+        filters.append(f"{COUNTRY_KEY_SQL} IN ({', '.join('?' for _ in keys)})")
+        params += keys
+
+    cube = resolve_cube(conn, len(hs_prefix) if hs_prefix else None)
+    if cube is not None:
+        level = cube_level(cube)
+        if hs_prefix:
+            filters.append(f"hs{level} BETWEEN ? AND ?")
+            params += hs_prefix_range(hs_prefix, level)
+        return f"SELECT year, period_idx, flow, fob, cif FROM {cube} WHERE {' AND '.join(filters)}", params
+
+    if hs_prefix:
+        filters.append("hs10 BETWEEN ? AND ?")
+        params += hs_prefix_range(hs_prefix)
+    where = " AND ".join(filters)
+    sql = f"""
+        SELECT year, period_idx, 'exports' AS flow, fob, CAST(NULL AS DOUBLE) AS cif
+        FROM fact_exports WHERE {value_filter(conn, "fact_exports")} AND {where}
+        UNION ALL
+        SELECT year, period_idx, 'imports' AS flow, fob, cif
+        FROM fact_imports WHERE {value_filter(conn, "fact_imports")} AND {where}
+    """
+    return sql, params + params
+
+
+def _coverage_source(conn: duckdb.DuckDBPyConnection) -> str:
+    # Periodos cubiertos por la base completa, sin filtros de producto o país: un año es completo si la base tiene
+    # datos de enero a diciembre, aunque un producto puntual no haya tenido movimiento en algún mes.
+    cube = resolve_cube(conn)
+    if cube is not None:
+        return f"SELECT MIN(period_idx) AS first_period, MAX(period_idx) AS last_period FROM {cube} WHERE year > 0"
+    return """
+        SELECT MIN(first_period) AS first_period, MAX(last_period) AS last_period
+        FROM (
+            SELECT MIN(period_idx) AS first_period, MAX(period_idx) AS last_period FROM fact_exports WHERE year > 0
+            UNION ALL
+            SELECT MIN(period_idx) AS first_period, MAX(period_idx) AS last_period FROM fact_imports WHERE year > 0
+        )
+    """
+
+
+def timeseries_sql(
+    conn: duckdb.DuckDBPyConnection,
+    granularity: str = "year",
+    hs_prefix: str | None = None,
+    countries: list[str] | None = None,
+    year_from: int | None = None,
+    year_to: int | None = None,
+) -> dict:
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity debe ser uno de {GRANULARITIES}")
+    source, params = _timeseries_source(conn, hs_prefix, countries, year_from, year_to)
+    monthly = granularity == "month"
+    # Índice de periodo: year*12+month en mensual, year en anual; la serie se densifica para que LAG/ventanas
+    # cuenten periodos y no filas.
+    period_sql = "period_idx" if monthly else "year"
+    lag = 12 if monthly else 1
+    rows = conn.execute(
+        f"""
+        WITH source AS ({source}),
+        grouped AS (
+            SELECT {period_sql} AS period,
+                   COALESCE(SUM(fob) FILTER (WHERE flow = 'exports'), 0)::DOUBLE AS exports_fob,
+                   COALESCE(SUM(fob) FILTER (WHERE flow = 'imports'), 0)::DOUBLE AS imports_fob,
+                   COALESCE(SUM(cif) FILTER (WHERE flow = 'imports'), 0)::DOUBLE AS imports_cif
+            FROM source
+            GROUP BY ALL
+        ),
+        bounds AS (SELECT MIN(period) AS first_period, MAX(period) AS last_period FROM grouped),
+        coverage AS ({_coverage_source(conn)}),
+        dense AS (
+            SELECT p.period,
+                   {"(p.period - 1) // 12" if monthly else "p.period"} AS year,
+                   COALESCE(g.exports_fob, 0) AS exports_fob,
+                   COALESCE(g.imports_fob, 0) AS imports_fob,
+                   COALESCE(g.imports_cif, 0) AS imports_cif
+            FROM bounds, range(bounds.first_period, bounds.last_period + 1) p(period)
+            LEFT JOIN grouped g USING (period)
+        ),
+        flagged AS (
+            SELECT dense.*,
+                   year * 12 + 1 >= coverage.first_period AND year * 12 + 12 <= coverage.last_period AS complete
+            FROM dense, coverage
+        ),
+        windowed AS (
+            SELECT *,
+                   exports_fob / NULLIF(LAG(exports_fob, {lag}) OVER w, 0) - 1 AS exports_yoy,
+                   imports_fob / NULLIF(LAG(imports_fob, {lag}) OVER w, 0) - 1 AS imports_yoy,
+                   SUM(exports_fob) OVER (w ROWS BETWEEN 11 PRECEDING AND CURRENT ROW) AS exports_rolling_12m,
+                   SUM(imports_fob) OVER (w ROWS BETWEEN 11 PRECEDING AND CURRENT ROW) AS imports_rolling_12m,
+                   SUM(exports_fob) OVER (PARTITION BY year) AS exports_year,
+                   SUM(imports_fob) OVER (PARTITION BY year) AS imports_year
+            FROM flagged
+            WINDOW w AS (ORDER BY period)
+        )
+        SELECT period, year, exports_fob, imports_fob, imports_cif, exports_yoy, imports_yoy,
+               exports_rolling_12m, imports_rolling_12m, complete,
+               -- El CAGR se mide entre el primer y el último año completos: un año parcial no se anualiza.
+               arg_min(exports_year, period) FILTER (WHERE complete) OVER () AS exports_first_year,
+               arg_max(exports_year, period) FILTER (WHERE complete) OVER () AS exports_last_year,
+               arg_min(imports_year, period) FILTER (WHERE complete) OVER () AS imports_first_year,
+               arg_max(imports_year, period) FILTER (WHERE complete) OVER () AS imports_last_year,
+               MIN(year) FILTER (WHERE complete) OVER () AS first_complete_year,
+               MAX(year) FILTER (WHERE complete) OVER () AS last_complete_year
+        FROM windowed
+        ORDER BY period
+        """,
+        params,
+    ).fetchall()
+
+    points = []
+    for row in rows:
+        period, year, exports, imports, cif, exports_yoy, imports_yoy, exports_12m, imports_12m = row[:9]
+        month = period - year * 12 if monthly else None
+        points.append(
+            {
+                "period": f"{year}-{month:02d}" if monthly else str(year),
+                "year": int(year),
+                "month": month,
+                "exports_fob": float(exports),
+                "imports_fob": float(imports),
+                "trade_balance": float(exports - imports),
+                "logistics_cost": float(cif - imports),
+                "exports_yoy": _optional_float(exports_yoy),
+                "imports_yoy": _optional_float(imports_yoy),
+                "exports_rolling_12m": float(exports_12m) if monthly else None,
+                "imports_rolling_12m": float(imports_12m) if monthly else None,
+                "complete": bool(row[9]),
+            }
+        )
+    cagr = {"exports_fob": None, "imports_fob": None}
+    cagr_years = None
+    if rows and rows[0][14] is not None:
+        exports_first, exports_last, imports_first, imports_last, first_year, last_year = rows[0][10:]
+        span = last_year - first_year
+        cagr = {
+            "exports_fob": _cagr(exports_first, exports_last, span),
+            "imports_fob": _cagr(imports_first, imports_last, span),
+        }
+        cagr_years = {"from": int(first_year), "to": int(last_year)} if span else None
+    return {"granularity": granularity, "cagr": cagr, "cagr_years": cagr_years, "points": points}
+
+
+SECTOR_GROUPS = ("sector_industria", "seccion")
+
+
+def _sector_source(conn: duckdb.DuckDBPyConnection, year_sql: str) -> tuple[str, int]:
+    cube = resolve_cube(conn, 2)
+    if cube is not None:
+        level = cube_level(cube)
+        sql = f"""
+            SELECT hs{level} // {10 ** (level - 2)} AS hs2, flow, country_code, fob
+            FROM {cube} WHERE TRUE {year_sql}
+        """
+        return sql, 1
+    sql = f"""
+        SELECT hs10 // 100000000 AS hs2, 'exports' AS flow, country_code, fob
+        FROM fact_exports WHERE {value_filter(conn, "fact_exports")} {year_sql}
+        UNION ALL
+        SELECT hs10 // 100000000 AS hs2, 'imports' AS flow, country_code, fob
+        FROM fact_imports WHERE {value_filter(conn, "fact_imports")} {year_sql}
+    """
+    return sql, 2
+
+
+def sector_sql(
+    conn: duckdb.DuckDBPyConnection,
+    group_by: str = "sector_industria",
+    year_from: int | None = None,
+    year_to: int | None = None,
+    partner: str | int = DEFAULT_PARTNER_CODE,
+    flow: str = "exports",
+) -> dict:
+    if group_by not in SECTOR_GROUPS:
+        raise ValueError(f"group_by debe ser uno de {SECTOR_GROUPS}")
+    if flow not in FLOWS:
+        raise ValueError(f"flow debe ser uno de {FLOWS}")
+    has_lookup = conn.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_name = ?", [SECTOR_LOOKUP]
+    ).fetchone()
+    if has_lookup is None:
+        raise LookupError(f"No existe la tabla {SECTOR_LOOKUP}; ejecute el ETL")
+
+    year_sql, year_params = _year_range_clause(year_from, year_to)
+    source, repeat = _sector_source(conn, year_sql)
+    # Se agrega por capítulo (entero) antes de cruzar con la tabla de 100 filas: nunca se une texto contra hechos.
+    rows = conn.execute(
+        f"""
+        WITH chapters AS (
+            SELECT hs2,
+                   COALESCE(SUM(fob) FILTER (WHERE flow = 'exports'), 0) AS exports_fob,
+                   COALESCE(SUM(fob) FILTER (WHERE flow = 'imports'), 0) AS imports_fob,
+                   COALESCE(SUM(fob) FILTER (WHERE flow = ? AND {COUNTRY_KEY_SQL} = ?), 0) AS fob_partner
+            FROM ({source})
+            GROUP BY hs2
+        )
+        SELECT l.{group_by} AS name,
+               SUM(c.exports_fob)::DOUBLE AS exports_fob,
+               SUM(c.imports_fob)::DOUBLE AS imports_fob,
+               SUM(c.fob_partner)::DOUBLE AS fob_partner
+        FROM chapters c
+        LEFT JOIN {SECTOR_LOOKUP} l ON l.hs2 = c.hs2
+        GROUP BY ALL
+        ORDER BY {"exports_fob" if flow == "exports" else "imports_fob"} DESC, name NULLS LAST
+        """,
+        [flow, normalize_country_code(partner), *(year_params * repeat)],
+    ).fetchall()
+
+    items = []
+    for name, exports, imports, fob_partner in rows:
+        total = exports if flow == "exports" else imports
+        items.append(
+            {
+                "name": name,
+                "exports_fob": exports,
+                "imports_fob": imports,
+                "trade_balance": exports - imports,
+                "fob_partner": fob_partner,
+                "share_partner": fob_partner / total if total > 0 else None,
+            }
+        )
+    return {"group_by": group_by, "flow": flow, "partner": normalize_country_code(partner), "items": items}
+
+
+def _optional_float(value) -> float | None:
+    return None if value is None else float(value)
+
+
+def _cagr(first: float, last: float, years: int) -> float | None:
+    if not years or not first or first <= 0 or last is None or last < 0:
+        return None
+    return float((last / first) ** (1 / years) - 1)
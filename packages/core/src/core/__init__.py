@@ -1,4 +1,5 @@
 from .entities import HSNode, TradeRecord
+from .hs_tree import HSTree
 from .interfaces import TableRepository, KPIService
 
-__all__ = ["HSNode", "TradeRecord", "TableRepository", "KPIService"]
+__all__ = ["HSNode", "HSTree", "TradeRecord", "TableRepository", "KPIService"]
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .entities import HSNode
+
+HS_TREE_LEVELS = (2, 4, 6, 8, 10)
+HS_TREE_MEASURES = ("exports_fob", "imports_fob", "imports_cif")
+
+
+@dataclass
+class HSTreeLevel:
+    level: int
+    codes: np.ndarray
+    # Hijos del nodo i en el nivel siguiente: child_offsets[i]:child_offsets[i + 1].
+    child_offsets: np.ndarray
+    # (nodos, años + 1, medidas); la última columna de años es el total acumulado.
+    totals: np.ndarray
+
+
+class HSTree:
+    def __init__(
+        self,
+        levels: list[HSTreeLevel],
+        years: np.ndarray,
+        descriptions: np.ndarray,
+        element_types: np.ndarray,
+    ):
+        self.levels = levels
+        self.years = years
+        self.descriptions = descriptions
+        self.element_types = element_types
+
+    @classmethod
+    def build(cls, dim_hs: pd.DataFrame, totals: pd.DataFrame) -> HSTree:
+        dim_codes = pd.to_numeric(dim_hs.get("hs10", pd.Series(dtype=object)), errors="coerce").dropna()
+        fact_codes = pd.to_numeric(totals.get("hs10", pd.Series(dtype=object)), errors="coerce").dropna()
+        leaves = np.unique(np.concatenate([dim_codes.to_numpy(np.int64), fact_codes.to_numpy(np.int64)]))
+        years = np.unique(totals["year"].to_numpy(np.int64)) if len(totals) else np.array([], dtype=np.int64)
+
+        leaf_totals = np.zeros((len(leaves), len(years) + 1, len(HS_TREE_MEASURES)))
+        if len(totals):
+            rows = np.searchsorted(leaves, totals["hs10"].to_numpy(np.int64))
+            cols = np.searchsorted(years, totals["year"].to_numpy(np.int64))
+            values = totals[list(HS_TREE_MEASURES)].fillna(0).to_numpy(np.float64)
+            np.add.at(leaf_totals, (rows, cols), values)
+            leaf_totals[:, -1] = leaf_totals[:, :-1].sum(axis=1)
+
+        # Los niveles se construyen de hs10 hacia hs2; al estar ordenados, los hijos de cada nodo son contiguos.
+        levels: list[HSTreeLevel] = []
+        codes, level_totals = leaves, leaf_totals
+        child_offsets = np.zeros(len(leaves) + 1, dtype=np.int64)
+        for level in reversed(HS_TREE_LEVELS):
+            levels.append(HSTreeLevel(level, codes, child_offsets, level_totals))
+            if level == HS_TREE_LEVELS[0]:
+                break
+            parents = codes // 100
+            parent_codes, starts = np.unique(parents, return_index=True)
+            child_offsets = np.append(starts, len(codes)).astype(np.int64)
+            level_totals = (
+                np.add.reduceat(level_totals, starts, axis=0) if len(codes) else level_totals[: len(parent_codes)]
+            )
+            codes = parent_codes
+        levels.reverse()
+
+        descriptions = np.full(len(leaves), None, dtype=object)
+        element_types = np.full(len(leaves), None, dtype=object)
+        if len(dim_codes):
+            dim = dim_hs.loc[dim_codes.index]
+            positions = np.searchsorted(leaves, dim_codes.to_numpy(np.int64))
+            if "descripcion_final" in dim:
+                descriptions[positions] = dim["descripcion_final"].to_numpy(dtype=object)
+            if "tipo_elemento" in dim:
+                element_types[positions] = dim["tipo_elemento"].to_numpy(dtype=object)
+        return cls(levels, years, descriptions, element_types)
+
+    def __len__(self) -> int:
+        return sum(len(level.codes) for level in self.levels)
+
+    def _locate(self, code: str) -> tuple[int, int]:
+        if not code.isdigit() or len(code) not in HS_TREE_LEVELS:
+            raise KeyError(code)
+        depth = HS_TREE_LEVELS.index(len(code))
+        codes = self.levels[depth].codes
+        pos = int(np.searchsorted(codes, int(code)))
+        if pos >= len(codes) or codes[pos] != int(code):
+            raise KeyError(code)
+        return depth, pos
+
+    def _year_column(self, year: int | None) -> int | None:
+        if year is None:
+            return -1
+        pos = int(np.searchsorted(self.years, year))
+        if pos < len(self.years) and self.years[pos] == year:
+            return pos
+        return None
+
+    def _entry(self, depth: int, pos: int, column: int | None) -> dict:
+        level = self.levels[depth]
+        values = level.totals[pos, column] if column is not None else np.zeros(len(HS_TREE_MEASURES))
+        leaf = depth == len(self.levels) - 1
+        return {
+            "code": str(int(level.codes[pos])).zfill(level.level),
+            "level": level.level,
+            "description": self.descriptions[pos] if leaf else None,
+            "has_children": bool(not leaf and level.child_offsets[pos + 1] > level.child_offsets[pos]),
+            **{measure: float(v) for measure, v in zip(HS_TREE_MEASURES, values)},
+        }
+
+    def node(self, code: str, year: int | None = None) -> dict:
+        depth, pos = self._locate(code)
+        return self._entry(depth, pos, self._year_column(year))
+
+    def children(self, code: str | None = None, year: int | None = None) -> list[dict]:
+        column = self._year_column(year)
+        if not code:
+            return [self._entry(0, pos, column) for pos in range(len(self.levels[0].codes))]
+        depth, pos = self._locate(code)
+        if depth == len(self.levels) - 1:
+            return []
+        offsets = self.levels[depth].child_offsets
+        return [self._entry(depth + 1, child, column) for child in range(offsets[pos], offsets[pos + 1])]
+
+    def hs_node(self, hs10: str) -> HSNode:
+        depth, pos = self._locate(hs10)
+        if depth != len(self.levels) - 1:
+            raise KeyError(hs10)
+        return HSNode(
+            hs2=hs10[:2],
+            hs4=hs10[:4],
+            hs6=hs10[:6],
+            hs8=hs10[:8],
+            hs10=hs10,
+            descripcion_final=self.descriptions[pos] or "",
+            tipo_elemento=self.element_types[pos] or "",
+        )
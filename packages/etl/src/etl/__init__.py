@@ -1 +1,19 @@
-__all__ = []
+from .build import (
+    build_marker_path,
+    prune_database_versions,
+    publish_database,
+    read_build_marker,
+    resolve_database,
+    versioned_database_path,
+    write_build_marker,
+)
+
+__all__ = [
+    "build_marker_path",
+    "prune_database_versions",
+    "publish_database",
+    "read_build_marker",
+    "resolve_database",
+    "versioned_database_path",
+    "write_build_marker",
+]
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+import json
+import logging
+import os
+from pathlib import Path
+import shutil
+import uuid
+
+logger = logging.getLogger(__name__)
+
+BUILDS_DIR = "_builds"
+CURRENT_LINK = "current"
+
+
+def build_marker_path(duckdb_path: str | Path) -> Path:
+    return Path(f"{duckdb_path}.build.json")
+
+
+def new_build_id() -> str:
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def versioned_database_path(duckdb_path: str | Path, build_id: str) -> Path:
+    path = Path(duckdb_path)
+    return path.with_name(f"{path.stem}.{build_id}{path.suffix}")
+
+
+def build_outputs_dir(processed_dir: str | Path, build_id: str) -> Path:
+    return Path(processed_dir) / BUILDS_DIR / build_id
+
+
+def write_build_marker(
+    duckdb_path: str | Path,
+    build_id: str,
+    database: str | Path | None = None,
+    outputs: str | Path | None = None,
+) -> Path:
+    marker = build_marker_path(duckdb_path)
+    payload = {"build_id": build_id, "built_at": datetime.now(timezone.utc).isoformat()}
+    if database is not None:
+        payload["database"] = Path(database).name
+    if outputs is not None:
+        # Relativo al marker: el directorio de datos puede moverse completo sin reescribirlo.
+        payload["outputs"] = os.path.relpath(outputs, marker.parent)
+    tmp = marker.with_name(marker.name + ".tmp")
+    tmp.write_text(json.dumps(payload), encoding="utf-8")
+    os.replace(tmp, marker)
+    return marker
+
+
+def read_build_marker(duckdb_path: str | Path) -> dict:
+    marker = build_marker_path(duckdb_path)
+    if not marker.exists():
+        return {}
+    return json.loads(marker.read_text(encoding="utf-8"))
+
+
+def resolve_database(duckdb_path: str | Path, marker: dict | None = None) -> Path:
+    # Sin marker versionado (builds anteriores o bases copiadas a mano) se usa la ruta configurada tal cual.
+    marker = read_build_marker(duckdb_path) if marker is None else marker
+    if marker.get("database"):
+        versioned = Path(duckdb_path).with_name(marker["database"])
+        if versioned.exists():
+            return versioned
+    return Path(duckdb_path)
+
+
+def resolve_outputs(duckdb_path: str | Path, marker: dict | None = None) -> Path | None:
+    # Índice de búsqueda y parquet del build publicado; None si el marker es anterior a los directorios por build.
+    marker = read_build_marker(duckdb_path) if marker is None else marker
+    if marker.get("outputs"):
+        return build_marker_path(duckdb_path).parent / marker["outputs"]
+    return None
+
+
+def _replace_link(path: Path, target: str) -> None:
+    link = path.with_name(path.name + ".tmp-link")
+    try:
+        link.unlink(missing_ok=True)
+        os.symlink(target, link)
+        os.replace(link, path)
+    except OSError as exc:
+        logger.warning("No se pudo actualizar el enlace %s -> %s: %s", path, target, exc)
+
+
+def publish_database(
+    duckdb_path: str | Path, build_id: str, database: str | Path, outputs: str | Path | None = None
+) -> Path:
+    path, database = Path(duckdb_path), Path(database)
+    # Los enlaces son para herramientas externas; la API sigue el marker, que se reemplaza al final (el "commit").
+    _replace_link(path, database.name)
+    if outputs is not None:
+        _replace_link(Path(outputs).parent / CURRENT_LINK, Path(outputs).name)
+    return write_build_marker(path, build_id, database, outputs)
+
+
+def database_versions(duckdb_path: str | Path) -> list[Path]:
+    path = Path(duckdb_path)
+    versions = [p for p in path.parent.glob(f"{path.stem}.*{path.suffix}") if p != path and not p.is_symlink()]
+    # Dos builds en el mismo segundo no se ordenan por id (sufijo aleatorio): se usa la fecha de escritura.
+    return sorted(versions, key=lambda p: (p.stat().st_mtime_ns, p.name))
+
+
+def prune_database_versions(
+    duckdb_path: str | Path, keep: int = 2, outputs_root: str | Path | None = None
+) -> list[Path]:
+    # Se conserva la versión publicada y las anteriores más recientes: lectores en curso y rollback manual.
+    # Con outputs_root, el directorio de salidas de cada versión eliminada se borra junto con su base.
+    path = Path(duckdb_path)
+    current = resolve_database(duckdb_path)
+    previous = [p for p in database_versions(duckdb_path) if p != current]
+    removed = previous[: max(len(previous) - max(keep - 1, 0), 0)]
+    for version in removed:
+        for file in (version, version.with_name(version.name + ".wal")):
+            try:
+                file.unlink(missing_ok=True)
+            except OSError as exc:
+                logger.warning("No se pudo eliminar la versión DuckDB %s: %s", file, exc)
+        build_id = version.name[len(path.stem) + 1 : len(version.name) - len(path.suffix)]
+        if outputs_root is not None and build_id:
+            shutil.rmtree(Path(outputs_root) / build_id, ignore_errors=True)
+    if removed:
+        logger.info("Versiones DuckDB eliminadas: %s", ", ".join(p.name for p in removed))
+    return removed
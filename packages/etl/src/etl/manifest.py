@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+PARTS_FORMAT_VERSION = 4
+
+
+@dataclass
+class SourceEntry:
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SourceManifest:
+    def __init__(self, cache_dir: Path, raw_dir: Path):
+        self.cache_dir = cache_dir
+        self.raw_dir = raw_dir
+        self.path = cache_dir / "manifest.json"
+        self.parts_dir = cache_dir / "parts"
+        self.entries: dict[str, SourceEntry] = {}
+
+    def load(self, full_refresh: bool = False) -> SourceManifest:
+        self.entries = {}
+        if full_refresh or not self.path.exists():
+            return self
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            logger.warning("Manifest ilegible %s (%s); se reconstruye completo", self.path, exc)
+            return self
+        if payload.get("format_version") != PARTS_FORMAT_VERSION:
+            logger.info("Manifest %s con formato distinto; se reconstruye completo", self.path)
+            return self
+        self.entries = {e["path"]: SourceEntry(**e) for e in payload.get("entries", [])}
+        return self
+
+    def save(self) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "format_version": PARTS_FORMAT_VERSION,
+            "entries": [asdict(e) for e in sorted(self.entries.values(), key=lambda e: e.path)],
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def key(self, path: Path) -> str:
+        return path.relative_to(self.raw_dir).as_posix()
+
+    def part_path(self, entry: SourceEntry) -> Path:
+        # Dos fuentes con el mismo contenido no comparten part: cada una escribe el suyo, aun en procesos paralelos.
+        source = hashlib.sha256(entry.path.encode("utf-8")).hexdigest()[:16]
+        return self.parts_dir / f"{source}-{entry.sha256}.parquet"
+
+    def fingerprint(self, path: Path) -> SourceEntry:
+        stat = path.stat()
+        key = self.key(path)
+        previous = self.entries.get(key)
+        if previous and previous.size == stat.st_size and previous.mtime_ns == stat.st_mtime_ns:
+            return previous
+        return SourceEntry(key, stat.st_size, stat.st_mtime_ns, file_sha256(path))
+
+    def is_current(self, entry: SourceEntry) -> bool:
+        previous = self.entries.get(entry.path)
+        return previous is not None and previous.sha256 == entry.sha256 and self.part_path(entry).exists()
+
+    def record(self, entry: SourceEntry) -> None:
+        self.entries[entry.path] = entry
+
+    def prune(self, current_keys: set[str]) -> list[str]:
+        removed = sorted(set(self.entries) - current_keys)
+        for key in removed:
+            del self.entries[key]
+        referenced = {self.part_path(e).name for e in self.entries.values()}
+        if self.parts_dir.exists():
+            for part in self.parts_dir.glob("*.parquet"):
+                if part.name not in referenced:
+                    part.unlink()
+        return removed
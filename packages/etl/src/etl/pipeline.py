@@ -1,72 +1,237 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass
+import json
 import logging
 from pathlib import Path
+import shutil
+import time
 
 import duckdb
 import pandas as pd
-
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .build import (
+    build_outputs_dir,
+    new_build_id,
+    prune_database_versions,
+    publish_database,
+    resolve_database,
+    versioned_database_path,
+)
+from .manifest import SourceManifest
+from .quality import evaluate_rules, write_quality_results
+from .profiling import (
+    RUNS_DIR,
+    RunProfiler,
+    StageMetrics,
+    append_run_metrics,
+    create_run_tables,
+    measure,
+    path_size,
+    write_run_report,
+)
+from .rollups import ROLLUP_LEVELS, SECTOR_LOOKUP, materialize_rollups, materialize_sector_lookup, rollup_table
+from .search_index import search_index_dir, write_search_index
+from .workbook import iter_workbook_batches, read_workbook
 from .utils import (
-    as_hs,
-    clean_text,
+    as_hs_series,
     expand_chapter_token,
-    first_sheet_with_headers,
     normalize_column_name,
-    normalize_text_value,
-    parse_periodo,
+    normalize_text_series,
+    parse_periodo_series,
+    period_index,
     resolve_column,
 )
 
 logger = logging.getLogger(__name__)
 
+LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+
 
 @dataclass
 class ETLConfig:
     raw_dir: Path
     processed_dir: Path
     duckdb_path: Path
+    workers: int = 1
+    full_refresh: bool = False
+    streaming: bool = False
+    batch_size: int = 50_000
+    row_group_size: int = 122_880
+    # Guarda un volcado cProfile (.prof) de la etapa de primer nivel más lenta junto al reporte del run.
+    profile: bool = False
+    # Versiones de la base DuckDB que se conservan en disco, incluida la publicada.
+    keep_versions: int = 2
+    # Hilos y memoria de DuckDB al materializar (None: valores por defecto de DuckDB).
+    duckdb_threads: int | None = None
+    duckdb_memory_limit: str | None = None
+
+
+@dataclass
+class StagedTable:
+    path: Path
+    rows: int
+
+    def __len__(self) -> int:
+        return self.rows
+
+
+DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+FACT_TABLES = ("fact_exports", "fact_imports")
+FACT_SORT_KEYS = ("year", "hs10", "country_code")
+PARQUET_COMPRESSION = "zstd"
+STAGING_DIR = "_staging"
+
+
+def to_arrow(df: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    missing = [name for name in schema.names if name not in df.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas para el esquema: {missing}")
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+
+def conform_to_schema(df: pd.DataFrame, schema: pa.Schema) -> pd.DataFrame:
+    if df.empty and not len(df.columns):
+        return schema.empty_table().to_pandas()
+    return to_arrow(df, schema).to_pandas()
+
+
+def sql_path(path: Path) -> str:
+    # COPY y ATTACH no aceptan parámetros: la ruta va como literal con las comillas escapadas.
+    return "'" + Path(path).as_posix().replace("'", "''") + "'"
+
+
+def _count_frame(metrics: StageMetrics, df: pd.DataFrame) -> None:
+    metrics.add_rows(df.attrs.get("rows_in", len(df)), len(df), df.attrs.get("dropped"))
+    metrics.add_timing("normalize", df.attrs.get("normalize_seconds", 0.0))
+
+
+def _init_worker_logging() -> None:
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 
 
 class ObservatorioETL:
     def __init__(self, config: ETLConfig):
         self.config = config
         self.config.processed_dir.mkdir(parents=True, exist_ok=True)
+        self._start_build()
+
+    def _start_build(self) -> None:
+        self.profiler = RunProfiler(new_build_id(), profile=self.config.profile)
+        # Cada build escribe su propia base, índice y parquet; la API sigue leyendo los publicados hasta que se
+        # reemplaza el marker.
+        self.database_path = versioned_database_path(self.config.duckdb_path, self.profiler.run_id)
+        self.outputs_dir = build_outputs_dir(self.config.processed_dir, self.profiler.run_id)
+
+    def __getstate__(self) -> dict:
+        # Los procesos de lectura reciben una copia del ETL; el perfilador (locks, cProfile) queda en el padre.
+        state = self.__dict__.copy()
+        state.pop("profiler", None)
+        return state
 
     def run(self) -> None:
-        logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+        if self.profiler.stages:
+            # La instancia ya registró etapas (otro run): el nuevo build no mezcla sus métricas ni su base.
+            self._start_build()
+        build_id = self.profiler.run_id
+        try:
+            self._run_stages()
+        except Exception:
+            self._discard_database()
+            self._publish_run_report("error")
+            raise
+        self._publish_run_report("ok")
+
+        publish_database(self.config.duckdb_path, build_id, self.database_path, self.outputs_dir)
+        logger.info("Build ETL publicado: %s (%s)", build_id, self.database_path.name)
+        prune_database_versions(
+            self.config.duckdb_path, keep=self.config.keep_versions, outputs_root=self.outputs_dir.parent
+        )
 
+    def _run_stages(self) -> None:
         dim_hs = self._safe_build("dim_hs", self._build_dim_hs, self._empty_dim_hs)
         dim_sector = self._safe_build("dim_sector", self._build_dim_sector, self._empty_dim_sector)
-        fact_exports = self._safe_build(
-            "fact_exports",
-            lambda: self._build_fact_trade(is_import=False, dim_hs=dim_hs),
-            self._empty_fact_exports,
-        )
-        fact_imports = self._safe_build(
-            "fact_imports",
-            lambda: self._build_fact_trade(is_import=True, dim_hs=dim_hs),
-            self._empty_fact_imports,
-        )
+        with self.profiler.stage("build_fact_tables"):
+            fact_exports, fact_imports = self._build_fact_tables()
         fact_trademap = self._safe_build("fact_trademap", self._build_fact_trademap, self._empty_fact_trademap)
 
-        self._validate_before_kpis(dim_hs, dim_sector, fact_exports, fact_imports)
-
-        self._save_parquet("dim_hs", dim_hs)
-        self._save_parquet("dim_sector", dim_sector)
-        self._save_parquet("fact_exports", fact_exports)
-        self._save_parquet("fact_imports", fact_imports)
-        self._save_parquet("fact_trademap", fact_trademap)
-        self._materialize_duckdb()
+        tables = {
+            "dim_hs": dim_hs,
+            "dim_sector": dim_sector,
+            "fact_trademap": fact_trademap,
+            "fact_exports": fact_exports,
+            "fact_imports": fact_imports,
+        }
+        self._materialize_duckdb(tables)
+        # Las reglas de calidad corren sobre la base nueva antes de escribir cualquier salida fuera de ella.
+        self._check_data_quality()
+
+        with self.profiler.stage("search_index") as metrics:
+            dest = search_index_dir(self.outputs_dir)
+            write_search_index(dim_hs, dest)
+            metrics.rows_in = len(dim_hs)
+            metrics.bytes_written = path_size(dest)
+
+        self._export_parquet(list(tables))
+        self._materialize_rollups()
+        self._validate_database({name: len(data) for name, data in tables.items()})
+
+    def _publish_run_report(self, status: str) -> None:
+        config = {key: str(value) for key, value in asdict(self.config).items()}
+        report = self.profiler.report(status, config=config)
+        runs_dir = self.config.processed_dir / RUNS_DIR
+        if self.config.profile:
+            self.profiler.dump_slowest_profile(runs_dir)
+        path = write_run_report(report, runs_dir)
+        # Un build fallido no publica base: su reporte se incorpora a etl_runs en el próximo build exitoso.
+        if status == "ok":
+            try:
+                conn = self._connect_database()
+                try:
+                    append_run_metrics(conn, report)
+                finally:
+                    conn.close()
+            except duckdb.Error as exc:
+                logger.warning("No se pudieron registrar las métricas del ETL en DuckDB: %s", exc)
+        logger.info("Reporte del ETL (%s, %.1fs): %s", status, report["wall_seconds"], path)
+
+    def _trade_executor(self):
+        if self.config.workers <= 1:
+            return nullcontext(None)
+        logger.info("Lectura paralela de archivos de comercio con %s procesos", self.config.workers)
+        return ProcessPoolExecutor(max_workers=self.config.workers, initializer=_init_worker_logging)
+
+    def _build_fact_tables(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        with self._trade_executor() as executor:
+            def build(is_import: bool) -> pd.DataFrame:
+                return self._safe_build(
+                    "fact_imports" if is_import else "fact_exports",
+                    lambda: self._build_fact_trade(is_import=is_import, executor=executor),
+                    self._empty_fact_imports if is_import else self._empty_fact_exports,
+                )
+
+            if executor is None:
+                return build(False), build(True)
+            with ThreadPoolExecutor(max_workers=2) as flows:
+                exports, imports = flows.submit(build, False), flows.submit(build, True)
+                return exports.result(), imports.result()
 
     def _safe_build(self, name: str, builder, fallback):
-        try:
-            df = builder()
-            logger.info("Tabla %s construida: %s filas", name, len(df))
+        with self.profiler.stage("build", name) as metrics:
+            try:
+                df = builder()
+                logger.info("Tabla %s construida: %s filas", name, len(df))
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Fallo construyendo %s: %s", name, exc)
+                metrics.status, metrics.error = "error", str(exc)
+                df = fallback()
+            metrics.rows_out = len(df)
             return df
-        except Exception as exc:  # noqa: BLE001
-            logger.warning("Fallo construyendo %s: %s", name, exc)
-            return fallback()
 
     def _find_excel_by_keyword(self, keyword: str) -> Path:
         matches = sorted(
@@ -83,8 +248,7 @@ class ObservatorioETL:
 
     def _build_dim_hs(self) -> pd.DataFrame:
         path = self._find_excel_by_keyword("diccionario")
-        sheet, header_idx = first_sheet_with_headers(str(path), ["hs10", "descripcion_final"])
-        df = pd.read_excel(path, sheet_name=sheet, header=header_idx)
+        df = read_workbook(path, ["hs10", "descripcion_final"]).frame
         hs_col = resolve_column(df.columns, ["hs10", "codigo_subpartida_10"])
         desc_col = resolve_column(df.columns, ["descripcion_final", "descripcion"])
         type_col = resolve_column(df.columns, ["tipo_elemento", "tipo"])
@@ -94,19 +258,26 @@ class ObservatorioETL:
             return self._empty_dim_hs()
 
         out = pd.DataFrame()
-        out["hs10"] = df[hs_col].map(lambda v: as_hs(v, 10))
+        out["hs10"] = as_hs_series(df[hs_col], 10)
         out["hs8"] = out["hs10"].str[:8]
         out["hs6"] = out["hs10"].str[:6]
         out["hs4"] = out["hs10"].str[:4]
         out["hs2"] = out["hs10"].str[:2]
-        out["descripcion_final"] = df[desc_col].map(normalize_text_value) if desc_col else ""
-        out["tipo_elemento"] = df[type_col].map(normalize_text_value) if type_col else ""
+        out["descripcion_final"] = normalize_text_series(df[desc_col]) if desc_col else ""
+        out["tipo_elemento"] = normalize_text_series(df[type_col]) if type_col else ""
 
         invalid = out[~out["hs10"].str.match(r"^\d{10}$", na=False)]
         if not invalid.empty:
             logger.warning("dim_hs contiene %s HS10 inválidos; serán descartados", len(invalid))
         out = out[out["hs10"].str.match(r"^\d{10}$", na=False)]
-        return out.drop_duplicates(subset=["hs10"])
+        deduped = out.drop_duplicates(subset=["hs10"])
+
+        stage = self.profiler.current()
+        if stage is not None:
+            stage.rows_in = len(df)
+            stage.drop("hs10_invalido", len(invalid))
+            stage.drop("hs10_duplicado", len(out) - len(deduped))
+        return deduped
 
     def _build_dim_sector(self) -> pd.DataFrame:
         path = self._find_excel_by_keyword("sector")
@@ -120,49 +291,154 @@ class ObservatorioETL:
             logger.warning("dim_sector sin columna capítulos/capitulos")
             return self._empty_dim_sector()
 
-        rows: list[tuple[str, str, str]] = []
-        for _, row in df.iterrows():
-            raw_caps = normalize_text_value(row.get(cap_col, ""))
-            sec = normalize_text_value(row.get(sec_col, "")) if sec_col else ""
-            sector = normalize_text_value(row.get(sector_col, "")) if sector_col else ""
-
-            for token in [t for t in raw_caps.split(",") if clean_text(t)]:
-                expanded = expand_chapter_token(token)
-                if not expanded:
-                    logger.warning("Capítulo no parseable en dim_sector: '%s'", token)
-                    continue
-                for hs2 in expanded:
-                    rows.append((hs2, sec, sector))
-
-        out = pd.DataFrame(rows, columns=["hs2", "seccion", "sector_industria"]).drop_duplicates()
+        out = pd.DataFrame(
+            {
+                "token": normalize_text_series(df[cap_col]).str.split(","),
+                "seccion": normalize_text_series(df[sec_col]) if sec_col else "",
+                "sector_industria": normalize_text_series(df[sector_col]) if sector_col else "",
+            }
+        ).explode("token")
+        out = out[out["token"].fillna("").str.strip() != ""]
+        # Cada token distinto ("01-05", "84") se expande una sola vez y luego se repite por fila.
+        chapters = {token: expand_chapter_token(token) for token in out["token"].unique()}
+        for token, expanded in chapters.items():
+            if not expanded:
+                logger.warning("Capítulo no parseable en dim_sector: '%s'", token)
+        out = out.assign(hs2=out["token"].map(chapters)).explode("hs2").dropna(subset=["hs2"])
+        out = out[["hs2", "seccion", "sector_industria"]].drop_duplicates().reset_index(drop=True)
         if out.empty:
             logger.warning("dim_sector quedó vacío tras parseo")
         return out
 
-    def _build_fact_trade(self, is_import: bool, dim_hs: pd.DataFrame) -> pd.DataFrame:
+    def _build_fact_trade(self, is_import: bool, executor: Executor | None = None) -> pd.DataFrame | StagedTable:
         keyword = "import" if is_import else "export"
+        flow = "imports" if is_import else "exports"
+        empty = self._empty_fact_imports() if is_import else self._empty_fact_exports()
         paths = self._find_trade_files(keyword)
         if not paths:
             logger.warning("No se encontraron archivos %s*.xlsx en %s", keyword, self.config.raw_dir)
-            return self._empty_fact_imports() if is_import else self._empty_fact_exports()
+
+        manifest = SourceManifest(self.config.processed_dir / "_cache" / flow, self.config.raw_dir)
+        manifest.load(full_refresh=self.config.full_refresh)
+        entries = [manifest.fingerprint(path) for path in paths]
+        stale = [(path, entry) for path, entry in zip(paths, entries) if not manifest.is_current(entry)]
+        logger.info("%s: %s archivos fuente, %s nuevos o modificados", flow, len(paths), len(stale))
+
+        manifest.parts_dir.mkdir(parents=True, exist_ok=True)
+        jobs = [(path, manifest.part_path(entry)) for path, entry in stale]
+        stage = self.profiler.current()
+        for (_, entry), metrics in zip(stale, self._ingest_trade_files(jobs, is_import, executor)):
+            self.profiler.record(metrics)
+            if metrics.status == "error":
+                manifest.entries.pop(entry.path, None)
+                continue
+            if stage is not None:
+                for reason, count in metrics.dropped.items():
+                    stage.drop(reason, count)
+            manifest.record(entry)
+
+        removed = manifest.prune({entry.path for entry in entries})
+        if removed:
+            logger.info("%s: se descartan %s archivos eliminados: %s", flow, len(removed), removed)
+        manifest.save()
+
+        parts = [(path, manifest.part_path(entry)) for path, entry in zip(paths, entries) if entry.path in manifest.entries]
+        if self.config.streaming:
+            return self._assemble_staged_fact(flow, parts, is_import)
 
         chunks: list[pd.DataFrame] = []
-        for path in paths:
+        for path, part in parts:
+            chunk = pd.read_parquet(part)
+            if not chunk.empty:
+                chunk["source_file"] = path.name
+                chunks.append(chunk)
+
+        if not chunks:
+            return empty
+        return conform_to_schema(pd.concat(chunks, ignore_index=True), self._fact_schema(is_import))
+
+    def _assemble_staged_fact(self, flow: str, parts: list[tuple[Path, Path]], is_import: bool) -> StagedTable:
+        name = f"fact_{flow}"
+        dest = self.config.processed_dir / STAGING_DIR / f"{name}.parquet"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        schema = self._fact_schema(is_import)
+        rows = 0
+        with pq.ParquetWriter(dest, schema) as writer:
+            for path, part in parts:
+                for batch in pq.ParquetFile(part).iter_batches(batch_size=self.config.batch_size):
+                    chunk = batch.to_pandas()
+                    chunk["source_file"] = path.name
+                    writer.write_table(to_arrow(chunk, schema))
+                    rows += len(chunk)
+        return StagedTable(dest, rows)
+
+    def _ingest_trade_files(self, jobs: list[tuple[Path, Path]], is_import: bool, executor: Executor | None):
+        if executor is None:
+            for path, part in jobs:
+                yield self._ingest_trade_file_safe(path, is_import, part)
+            return
+
+        futures = [executor.submit(self._ingest_trade_file, path, is_import, part) for path, part in jobs]
+        for (path, _), future in zip(jobs, futures):
             try:
-                chunk = self._read_trade_file(path, is_import=is_import, dim_hs=dim_hs)
-                if not chunk.empty:
-                    chunks.append(chunk)
+                yield future.result()
             except Exception as exc:  # noqa: BLE001
                 logger.warning("Error leyendo %s: %s", path, exc)
+                yield self._failed_ingest(path, is_import, exc)
 
-        if not chunks:
-            return self._empty_fact_imports() if is_import else self._empty_fact_exports()
-        return pd.concat(chunks, ignore_index=True)
+    def _ingest_trade_file_safe(self, path: Path, is_import: bool, part: Path) -> StageMetrics:
+        try:
+            return self._ingest_trade_file(path, is_import, part)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Error leyendo %s: %s", path, exc)
+            return self._failed_ingest(path, is_import, exc)
 
-    def _read_trade_file(self, path: Path, is_import: bool, dim_hs: pd.DataFrame) -> pd.DataFrame:
-        sheet, header_idx = first_sheet_with_headers(str(path), ["Periodo", "Codigo_Subpartida_10"])
-        df = pd.read_excel(path, sheet_name=sheet, header=header_idx)
+    @staticmethod
+    def _ingest_stage(is_import: bool) -> str:
+        return "ingest_imports" if is_import else "ingest_exports"
+
+    def _failed_ingest(self, path: Path, is_import: bool, exc: Exception) -> StageMetrics:
+        return StageMetrics(self._ingest_stage(is_import), path.name, status="error", error=str(exc))
+
+    def _ingest_trade_file(self, path: Path, is_import: bool, part: Path) -> StageMetrics:
+        with measure(self._ingest_stage(is_import), path.name) as metrics:
+            if self.config.streaming:
+                self._stream_trade_file(path, is_import, part, metrics)
+            else:
+                df = self._read_trade_file(path, is_import=is_import)
+                start = time.perf_counter()
+                pq.write_table(to_arrow(df, self._part_schema(is_import)), part)
+                metrics.add_timing("parquet_write", time.perf_counter() - start)
+                _count_frame(metrics, df)
+            metrics.bytes_written = path_size(part)
+        # Lo que no es normalización ni escritura es lectura del Excel (openpyxl + detección de encabezado).
+        metrics.timings["excel_read"] = max(metrics.wall_seconds - sum(metrics.timings.values()), 0.0)
+        return metrics
+
+    def _stream_trade_file(self, path: Path, is_import: bool, part: Path, metrics: StageMetrics) -> None:
+        schema = self._part_schema(is_import)
+        with pq.ParquetWriter(part, schema) as writer:
+            for batch in iter_workbook_batches(path, ["Periodo", "Codigo_Subpartida_10"], self.config.batch_size):
+                out = self._normalize_trade_frame(batch, path, is_import)
+                if out is None:
+                    metrics.add_rows(len(batch), 0, {"columnas_faltantes": len(batch)})
+                    break
+                start = time.perf_counter()
+                writer.write_table(to_arrow(out, schema))
+                metrics.add_timing("parquet_write", time.perf_counter() - start)
+                _count_frame(metrics, out)
+
+    def _read_trade_file(self, path: Path, is_import: bool) -> pd.DataFrame:
+        df = read_workbook(path, ["Periodo", "Codigo_Subpartida_10"]).frame
+        out = self._normalize_trade_frame(df, path, is_import)
+        if out is None:
+            empty = conform_to_schema(pd.DataFrame(), self._part_schema(is_import))
+            empty.attrs.update(rows_in=len(df), dropped={"columnas_faltantes": len(df)})
+            return empty
+        return out
 
+    def _normalize_trade_frame(self, df: pd.DataFrame, path: Path, is_import: bool) -> pd.DataFrame | None:
+        start = time.perf_counter()
         periodo_col = resolve_column(df.columns, ["periodo"])
         hs_col = resolve_column(df.columns, ["codigo_subpartida_10", "hs10"])
         fob_col = resolve_column(df.columns, ["fob", "valor_fob"])
@@ -184,22 +460,19 @@ class ObservatorioETL:
         ]
         if missing:
             logger.warning("Archivo %s sin columnas requeridas %s. Se omite.", path.name, missing)
-            return self._empty_fact_imports() if is_import else self._empty_fact_exports()
+            return None
 
-        hs = df[hs_col].map(lambda v: as_hs(v, 10))
-        year_month = df[periodo_col].map(lambda v: parse_periodo(clean_text(v)))
+        hs = as_hs_series(df[hs_col], 10)
+        year, month = parse_periodo_series(df[periodo_col], column=f"{path.name}:{periodo_col}")
 
         out = pd.DataFrame()
-        out["year"] = year_month.map(lambda x: x[0])
-        out["month"] = year_month.map(lambda x: x[1])
-        out["periodo_raw"] = df[periodo_col].map(normalize_text_value)
+        out["year"] = year
+        out["month"] = month
+        out["period_idx"] = period_index(year, month)
+        out["periodo_raw"] = normalize_text_series(df[periodo_col])
         out["hs10"] = hs
-        out["hs8"] = hs.str[:8]
-        out["hs6"] = hs.str[:6]
-        out["hs4"] = hs.str[:4]
-        out["hs2"] = hs.str[:2]
-        out["country_code"] = df[code_col].map(normalize_text_value) if code_col else ""
-        out["country_name"] = df[name_col].map(normalize_text_value)
+        out["country_code"] = normalize_text_series(df[code_col]) if code_col else ""
+        out["country_name"] = normalize_text_series(df[name_col])
         out["tm_peso_neto"] = pd.to_numeric(df[tm_col], errors="coerce").fillna(0) if tm_col else 0
         out["fob"] = pd.to_numeric(df[fob_col], errors="coerce").fillna(0)
         if is_import:
@@ -209,14 +482,21 @@ class ObservatorioETL:
         if invalid_hs.any():
             logger.warning("%s: %s filas con HS10 inválido", path.name, int(invalid_hs.sum()))
         out = out[~invalid_hs]
+        out["hs10"] = out["hs10"].astype("int64")
 
+        valid_hs = len(out)
         out = out[(out["fob"] >= 0) & (out["tm_peso_neto"] >= 0)]
         if is_import and "cif" in out.columns:
             out = out[out["cif"] >= 0]
 
-        enriched = out.merge(dim_hs[["hs10", "descripcion_final"]], on="hs10", how="left")
-        enriched["source_file"] = path.name
-        return enriched
+        out = conform_to_schema(out, self._part_schema(is_import))
+        # Conteos para el perfil por archivo (se leen en _ingest_trade_file, también desde procesos hijos).
+        out.attrs.update(
+            rows_in=len(df),
+            dropped={"hs10_invalido": int(invalid_hs.sum()), "valor_negativo": valid_hs - len(out)},
+            normalize_seconds=time.perf_counter() - start,
+        )
+        return out
 
     def _build_fact_trademap(self) -> pd.DataFrame:
         path = self._find_excel_by_keyword("trademap")
@@ -231,55 +511,182 @@ class ObservatorioETL:
             return self._empty_fact_trademap()
 
         out = pd.DataFrame()
-        out["producto"] = df[product_col].map(normalize_text_value)
-        out["pais"] = df[country_col].map(normalize_text_value)
+        out["producto"] = normalize_text_series(df[product_col])
+        out["pais"] = normalize_text_series(df[country_col])
         out["year"] = pd.to_numeric(df[year_col], errors="coerce").fillna(0).astype(int)
         out["value"] = pd.to_numeric(df[value_col], errors="coerce").fillna(0)
         return out
 
-    def _validate_before_kpis(
-        self,
-        dim_hs: pd.DataFrame,
-        dim_sector: pd.DataFrame,
-        fact_exports: pd.DataFrame,
-        fact_imports: pd.DataFrame,
-    ) -> None:
-        duplicated_hs = dim_hs["hs10"].duplicated().sum() if "hs10" in dim_hs.columns else 0
-        if duplicated_hs:
-            logger.warning("dim_hs tiene %s HS10 duplicados", duplicated_hs)
-
-        hs2_count = dim_sector["hs2"].nunique() if "hs2" in dim_sector.columns else 0
-        if hs2_count != 98:
-            logger.warning("dim_sector tiene %s capítulos únicos (esperado ~98)", hs2_count)
-
-        if not fact_exports.empty and not dim_sector.empty and "hs2" in fact_exports.columns:
-            join_share = fact_exports.merge(dim_sector[["hs2"]].drop_duplicates(), on="hs2", how="left")["hs2"].notna().mean()
-            if join_share < 0.8:
-                logger.warning("Join HS->sector bajo: %.2f%%", join_share * 100)
-
-        if "fob" in fact_exports.columns and (fact_exports["fob"] < 0).any():
-            logger.warning("FOB negativo detectado en exportaciones")
-        if "fob" in fact_imports.columns and (fact_imports["fob"] < 0).any():
-            logger.warning("FOB negativo detectado en importaciones")
-        if "cif" in fact_imports.columns and (fact_imports["cif"] < 0).any():
-            logger.warning("CIF negativo detectado en importaciones")
-
-        if "country_name" in fact_exports.columns:
-            has_china = fact_exports["country_name"].str.upper().str.contains("CHINA", na=False).any()
-            if not has_china:
-                logger.warning("No se detectaron registros para China en exportaciones")
-
-    def _save_parquet(self, name: str, df: pd.DataFrame) -> None:
-        df.to_parquet(self.config.processed_dir / f"{name}.parquet", index=False)
-
-    def _materialize_duckdb(self) -> None:
-        conn = duckdb.connect(str(self.config.duckdb_path))
+    def _connect_database(self, read_only: bool = False) -> duckdb.DuckDBPyConnection:
+        config = {}
+        if self.config.duckdb_threads:
+            config["threads"] = self.config.duckdb_threads
+        if self.config.duckdb_memory_limit:
+            config["memory_limit"] = self.config.duckdb_memory_limit
+        return duckdb.connect(str(self.database_path), read_only=read_only, config=config)
+
+    def _materialize_duckdb(self, tables: dict[str, pd.DataFrame | StagedTable]) -> None:
+        with self.profiler.stage("materialize_duckdb") as metrics:
+            self._discard_database()
+            conn = self._connect_database()
+            try:
+                self._carry_over_history(conn)
+                # Un cursor por tabla: DuckDB admite CREATE TABLE concurrentes sobre tablas distintas.
+                with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+                    rows = executor.map(
+                        lambda item: self._materialize_table(conn.cursor(), *item), tables.items()
+                    )
+                    metrics.rows_out = sum(rows)
+                conn.execute("CHECKPOINT")
+            finally:
+                conn.close()
+            metrics.bytes_written = path_size(self.database_path)
+
+    def _materialize_table(
+        self, cursor: duckdb.DuckDBPyConnection, name: str, data: pd.DataFrame | StagedTable
+    ) -> int:
+        with self.profiler.stage("materialize_table", name) as metrics:
+            try:
+                params = []
+                if name in FACT_TABLES:
+                    schema = self._fact_schema(name == "fact_imports")
+                    if isinstance(data, StagedTable):
+                        source, params = "read_parquet(?)", [data.path.as_posix()]
+                    else:
+                        cursor.register("source", to_arrow(data, schema))
+                        source = "source"
+                    # Insertar ordenado por año/HS deja zonemaps min/max útiles para filtrar por año o capítulo.
+                    select = f"SELECT {', '.join(schema.names)} FROM {source} ORDER BY {', '.join(FACT_SORT_KEYS)}"
+                else:
+                    cursor.register("source", pa.Table.from_pandas(data, preserve_index=False))
+                    select = "SELECT * FROM source"
+                cursor.execute(f"CREATE TABLE {name} AS {select}", params)
+                metrics.rows_in = len(data)
+                metrics.rows_out = cursor.execute(f"SELECT count(*) FROM {name}").fetchone()[0]
+                return metrics.rows_out
+            finally:
+                cursor.close()
+
+    def _export_parquet(self, tables: list[str]) -> None:
+        self.outputs_dir.mkdir(parents=True, exist_ok=True)
+        conn = self._connect_database(read_only=True)
         try:
-            for table in ["dim_hs", "dim_sector", "fact_exports", "fact_imports", "fact_trademap"]:
-                parquet_path = self.config.processed_dir / f"{table}.parquet"
-                conn.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM read_parquet('{parquet_path}')")
+            with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+                list(executor.map(lambda name: self._export_table(conn.cursor(), name), tables))
         finally:
             conn.close()
+            # Los hechos ya quedaron en DuckDB y los datasets publicados: el staging no se reutiliza.
+            shutil.rmtree(self.config.processed_dir / STAGING_DIR, ignore_errors=True)
+
+    def _export_table(self, cursor: duckdb.DuckDBPyConnection, name: str) -> None:
+        options = f"FORMAT parquet, COMPRESSION {PARQUET_COMPRESSION}, ROW_GROUP_SIZE {self.config.row_group_size}"
+        with self.profiler.stage("save_parquet", name) as metrics:
+            try:
+                metrics.rows_in = metrics.rows_out = cursor.execute(f"SELECT count(*) FROM {name}").fetchone()[0]
+                # El directorio es exclusivo de este build: nadie lo lee hasta que el marker lo publica.
+                if name not in FACT_TABLES:
+                    dest = self.outputs_dir / f"{name}.parquet"
+                    cursor.execute(f"COPY {name} TO {sql_path(dest)} ({options})")
+                    metrics.bytes_written = path_size(dest)
+                    return
+
+                # COPY con PARTITION_BY no conserva el orden de la tabla; un COPY por año sí.
+                dest = self.outputs_dir / name
+                years = [row[0] for row in cursor.execute(f"SELECT DISTINCT year FROM {name} ORDER BY year").fetchall()]
+                for year in years:
+                    part = dest / f"year={year}" / "part-0.parquet"
+                    part.parent.mkdir(parents=True)
+                    cursor.execute(
+                        f"COPY (SELECT * EXCLUDE (year) FROM {name} WHERE year = {int(year)}) "
+                        f"TO {sql_path(part)} ({options})"
+                    )
+                metrics.bytes_written = path_size(dest)
+            finally:
+                cursor.close()
+
+    def _carry_over_history(self, conn: duckdb.DuckDBPyConnection) -> None:
+        create_run_tables(conn)
+        published = resolve_database(self.config.duckdb_path)
+        if published.exists():
+            try:
+                conn.execute(f"ATTACH {sql_path(published)} AS published (READ_ONLY)")
+                try:
+                    tables = {
+                        row[0]
+                        for row in conn.execute(
+                            "SELECT table_name FROM duckdb_tables() WHERE database_name = 'published'"
+                        ).fetchall()
+                    }
+                    for table in ("etl_runs", "etl_stage_metrics"):
+                        if table in tables:
+                            conn.execute(f"INSERT INTO {table} SELECT * FROM published.{table}")
+                finally:
+                    conn.execute("DETACH published")
+            except duckdb.Error as exc:
+                logger.warning("No se pudo copiar el historial del ETL desde %s: %s", published, exc)
+
+        known = {row[0] for row in conn.execute("SELECT run_id FROM etl_runs").fetchall()}
+        for path in sorted((self.config.processed_dir / RUNS_DIR).glob("etl_run_*.json")):
+            if path.stem.removeprefix("etl_run_") not in known:
+                append_run_metrics(conn, json.loads(path.read_text(encoding="utf-8")))
+
+    def _check_data_quality(self) -> None:
+        with self.profiler.stage("data_quality") as metrics:
+            conn = self._connect_database()
+            try:
+                results = evaluate_rules(conn)
+                write_quality_results(conn, self.profiler.run_id, results)
+            finally:
+                conn.close()
+            metrics.rows_in = sum({r.table_name: r.rows_checked for r in results}.values())
+            metrics.rows_out = len(results)
+
+            failed = [r for r in results if not r.passed]
+            for r in failed:
+                logger.warning(
+                    "Regla de calidad incumplida (%s): %s.%s %s, observado %s, esperado %s %s",
+                    r.severity,
+                    r.table_name,
+                    r.column_name,
+                    r.rule,
+                    r.observed,
+                    r.comparison,
+                    r.threshold,
+                )
+            # Una regla de severidad error deja el build sin publicar: la API sigue con la versión anterior.
+            errors = [f"{r.table_name}.{r.column_name}:{r.rule}" for r in failed if r.severity == "error"]
+            if errors:
+                raise ValueError(f"Reglas de calidad con severidad error incumplidas: {errors}")
+
+    def _materialize_rollups(self) -> None:
+        with self.profiler.stage("materialize_rollups") as metrics:
+            conn = self._connect_database()
+            try:
+                metrics.rows_out = sum(materialize_rollups(conn).values()) + materialize_sector_lookup(conn)
+            finally:
+                conn.close()
+
+    def _validate_database(self, expected: dict[str, int]) -> None:
+        with self.profiler.stage("validate_database") as metrics:
+            conn = self._connect_database(read_only=True)
+            try:
+                tables = {row[0] for row in conn.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+                required = {*expected, SECTOR_LOOKUP, *(rollup_table(level) for level in ROLLUP_LEVELS)}
+                missing = sorted(required - tables)
+                if missing:
+                    raise ValueError(f"La nueva base DuckDB no tiene las tablas: {missing}")
+                for table, rows in expected.items():
+                    actual = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                    if actual != rows:
+                        raise ValueError(f"{table} tiene {actual} filas en DuckDB, se esperaban {rows}")
+                metrics.rows_in = sum(expected.values())
+            finally:
+                conn.close()
+
+    def _discard_database(self) -> None:
+        for path in (self.database_path, self.database_path.with_name(self.database_path.name + ".wal")):
+            path.unlink(missing_ok=True)
+        shutil.rmtree(self.outputs_dir, ignore_errors=True)
 
     @staticmethod
     def _empty_dim_hs() -> pd.DataFrame:
@@ -290,47 +697,33 @@ class ObservatorioETL:
         return pd.DataFrame(columns=["hs2", "seccion", "sector_industria"])
 
     @staticmethod
-    def _empty_fact_exports() -> pd.DataFrame:
-        return pd.DataFrame(
-            columns=[
-                "year",
-                "month",
-                "periodo_raw",
-                "hs10",
-                "hs8",
-                "hs6",
-                "hs4",
-                "hs2",
-                "country_code",
-                "country_name",
-                "tm_peso_neto",
-                "fob",
-                "descripcion_final",
-                "source_file",
-            ]
-        )
+    def _part_schema(is_import: bool) -> pa.Schema:
+        fields = [
+            ("year", pa.int16()),
+            ("month", pa.int8()),
+            ("period_idx", pa.int32()),
+            ("periodo_raw", DICT_STRING),
+            ("hs10", pa.int64()),
+            ("country_code", DICT_STRING),
+            ("country_name", DICT_STRING),
+            ("tm_peso_neto", pa.float64()),
+            ("fob", pa.float64()),
+        ]
+        if is_import:
+            fields.append(("cif", pa.float64()))
+        return pa.schema(fields)
 
-    @staticmethod
-    def _empty_fact_imports() -> pd.DataFrame:
-        return pd.DataFrame(
-            columns=[
-                "year",
-                "month",
-                "periodo_raw",
-                "hs10",
-                "hs8",
-                "hs6",
-                "hs4",
-                "hs2",
-                "country_code",
-                "country_name",
-                "tm_peso_neto",
-                "fob",
-                "cif",
-                "descripcion_final",
-                "source_file",
-            ]
-        )
+    @classmethod
+    def _fact_schema(cls, is_import: bool) -> pa.Schema:
+        return cls._part_schema(is_import).append(pa.field("source_file", DICT_STRING))
+
+    @classmethod
+    def _empty_fact_exports(cls) -> pd.DataFrame:
+        return conform_to_schema(pd.DataFrame(), cls._fact_schema(is_import=False))
+
+    @classmethod
+    def _empty_fact_imports(cls) -> pd.DataFrame:
+        return conform_to_schema(pd.DataFrame(), cls._fact_schema(is_import=True))
 
     @staticmethod
     def _empty_fact_trademap() -> pd.DataFrame:
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import cProfile
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+import json
+import logging
+import os
+from pathlib import Path
+import resource
+import threading
+import time
+from typing import Iterator
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+RUNS_DIR = "_runs"
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class PeakRSS:
+    def __init__(self, interval: float = 0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self) -> PeakRSS:
+        self.peak = current_rss()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+@dataclass
+class StageMetrics:
+    stage: str
+    target: str = ""
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    dropped: dict[str, int] = field(default_factory=dict)
+    # Desglose opcional del tiempo de pared (p.ej. excel_parse / normalize / parquet_write).
+    timings: dict[str, float] = field(default_factory=dict)
+    peak_rss_bytes: int = 0
+    bytes_written: int = 0
+    status: str = "ok"
+    error: str | None = None
+
+    @property
+    def rows_dropped(self) -> int:
+        return sum(self.dropped.values())
+
+    def drop(self, reason: str, count: int) -> None:
+        if count:
+            self.dropped[reason] = self.dropped.get(reason, 0) + int(count)
+
+    def add_rows(self, rows_in: int = 0, rows_out: int = 0, dropped: dict[str, int] | None = None) -> None:
+        self.rows_in = (self.rows_in or 0) + int(rows_in)
+        self.rows_out = (self.rows_out or 0) + int(rows_out)
+        for reason, count in (dropped or {}).items():
+            self.drop(reason, count)
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "rows_dropped": self.rows_dropped}
+
+
+def path_size(path: Path) -> int:
+    path = Path(path)
+    if path.is_file():
+        return path.stat().st_size
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return 0
+
+
+@contextmanager
+def measure(stage: str, target: str = "") -> Iterator[StageMetrics]:
+    metrics = StageMetrics(stage, target)
+    # process_time suma la CPU de todos los hilos: las etapas que corren en hilos de trabajo miden solo la suya.
+    clock = time.process_time if threading.current_thread() is threading.main_thread() else time.thread_time
+    wall, cpu = time.perf_counter(), clock()
+    with PeakRSS() as rss:
+        try:
+            yield metrics
+        except BaseException as exc:
+            metrics.status = "error"
+            metrics.error = str(exc)
+            raise
+        finally:
+            metrics.wall_seconds = time.perf_counter() - wall
+            metrics.cpu_seconds = clock() - cpu
+            metrics.peak_rss_bytes = max(rss.peak, current_rss())
+
+
+class RunProfiler:
+    def __init__(self, run_id: str, profile: bool = False):
+        self.run_id = run_id
+        self.profile = profile
+        self.started_at = datetime.now(timezone.utc)
+        self.stages: list[StageMetrics] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._owner = threading.get_ident()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._children_cpu = self._children_cpu_seconds()
+        self._slowest: tuple[StageMetrics, cProfile.Profile] | None = None
+
+    @staticmethod
+    def _children_cpu_seconds() -> float:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    def _stack(self) -> list[StageMetrics]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self) -> StageMetrics | None:
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def record(self, metrics: StageMetrics) -> None:
+        with self._lock:
+            self.stages.append(metrics)
+
+    @contextmanager
+    def stage(self, name: str, target: str = "") -> Iterator[StageMetrics]:
+        stack = self._stack()
+        # cProfile admite un solo perfilador activo: solo se perfilan etapas de primer nivel del hilo principal.
+        profiler = (
+            cProfile.Profile() if self.profile and not stack and threading.get_ident() == self._owner else None
+        )
+        with measure(name, target) as metrics:
+            stack.append(metrics)
+            try:
+                if profiler is not None:
+                    profiler.enable()
+                yield metrics
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                stack.pop()
+                self.record(metrics)
+        if profiler is not None and (self._slowest is None or metrics.wall_seconds > self._slowest[0].wall_seconds):
+            self._slowest = (metrics, profiler)
+
+    def dump_slowest_profile(self, directory: Path) -> Path | None:
+        if self._slowest is None:
+            return None
+        metrics, profiler = self._slowest
+        label = "_".join(p for p in (metrics.stage, metrics.target) if p)
+        path = Path(directory) / f"{self.run_id}_{label}.prof"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        logger.info("Perfil cProfile de la etapa más lenta (%s, %.2fs): %s", label, metrics.wall_seconds, path)
+        return path
+
+    def report(self, status: str = "ok", config: dict | None = None) -> dict:
+        with self._lock:
+            stages = [m.as_dict() for m in self.stages]
+        peak = max([s["peak_rss_bytes"] for s in stages] + [current_rss()])
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "status": status,
+            "wall_seconds": time.perf_counter() - self._wall,
+            # Incluye la CPU de los procesos de lectura paralela ya finalizados.
+            "cpu_seconds": time.process_time() - self._cpu + self._children_cpu_seconds() - self._children_cpu,
+            "peak_rss_bytes": peak,
+            "config": config or {},
+            "stages": stages,
+        }
+
+
+def write_run_report(report: dict, directory: Path) -> Path:
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"etl_run_{report['run_id']}.json"
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def create_run_tables(conn: duckdb.DuckDBPyConnection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS etl_runs (
+            run_id VARCHAR PRIMARY KEY,
+            started_at TIMESTAMPTZ,
+            finished_at TIMESTAMPTZ,
+            status VARCHAR,
+            wall_seconds DOUBLE,
+            cpu_seconds DOUBLE,
+            peak_rss_bytes BIGINT,
+            config JSON
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS etl_stage_metrics (
+            run_id VARCHAR,
+            stage VARCHAR,
+            target VARCHAR,
+            wall_seconds DOUBLE,
+            cpu_seconds DOUBLE,
+            rows_in BIGINT,
+            rows_out BIGINT,
+            rows_dropped BIGINT,
+            dropped JSON,
+            timings JSON,
+            peak_rss_bytes BIGINT,
+            bytes_written BIGINT,
+            status VARCHAR,
+            error VARCHAR
+        )
+        """
+    )
+
+
+def append_run_metrics(conn: duckdb.DuckDBPyConnection, report: dict) -> None:
+    create_run_tables(conn)
+    conn.execute(
+        "INSERT INTO etl_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            report["run_id"],
+            report["started_at"],
+            report["finished_at"],
+            report["status"],
+            report["wall_seconds"],
+            report["cpu_seconds"],
+            report["peak_rss_bytes"],
+            json.dumps(report["config"], default=str),
+        ],
+    )
+    rows = [
+        [
+            report["run_id"],
+            s["stage"],
+            s["target"],
+            s["wall_seconds"],
+            s["cpu_seconds"],
+            s["rows_in"],
+            s["rows_out"],
+            s["rows_dropped"],
+            json.dumps(s["dropped"]),
+            json.dumps(s["timings"]),
+            s["peak_rss_bytes"],
+            s["bytes_written"],
+            s["status"],
+            s["error"],
+        ]
+        for s in report["stages"]
+    ]
+    if rows:
+        conn.executemany("INSERT INTO etl_stage_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
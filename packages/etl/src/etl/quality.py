@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+import logging
+import operator
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+QUALITY_TABLE = "data_quality"
+COMPARISONS = {"<=": operator.le, ">=": operator.ge, "==": operator.eq}
+
+
+@dataclass(frozen=True)
+class Rule:
+    table: str
+    name: str
+    column: str
+    # Expresión agregada sobre la tabla; todas las reglas de una tabla se evalúan en un solo SELECT.
+    metric: str
+    comparison: str
+    threshold: float
+    severity: str = "error"
+    description: str = ""
+
+    def passes(self, observed: float | None) -> bool:
+        # Sin filas (cobertura NULL) no hay nada que incumplir.
+        return observed is None or COMPARISONS[self.comparison](observed, self.threshold)
+
+
+@dataclass
+class RuleResult:
+    table_name: str
+    rule: str
+    column_name: str
+    severity: str
+    description: str
+    comparison: str
+    threshold: float
+    observed: float | None
+    rows_checked: int
+    passed: bool
+
+
+def unique(table: str, column: str, severity: str = "error") -> Rule:
+    metric = f"count({column}) - count(DISTINCT {column})"
+    return Rule(table, "unico", column, metric, "<=", 0, severity, f"{column} sin duplicados")
+
+
+def pattern(table: str, column: str, regex: str, expr: str | None = None, severity: str = "error") -> Rule:
+    value = expr or f"CAST({column} AS VARCHAR)"
+    metric = f"count(*) FILTER (WHERE {column} IS NULL OR NOT regexp_full_match({value}, '{regex}'))"
+    return Rule(table, "patron", column, metric, "<=", 0, severity, f"{column} con formato {regex}")
+
+
+def non_negative(table: str, column: str, severity: str = "error") -> Rule:
+    metric = f"count(*) FILTER (WHERE {column} < 0)"
+    return Rule(table, "no_negativo", column, metric, "<=", 0, severity, f"{column} >= 0")
+
+
+def coverage(
+    table: str, column: str, expr: str, ref_table: str, ref_expr: str, min_share: float, severity: str = "warning"
+) -> Rule:
+    metric = f"avg(CASE WHEN {expr} IN (SELECT {ref_expr} FROM {ref_table}) THEN 1.0 ELSE 0.0 END)"
+    return Rule(table, "cobertura", column, metric, ">=", min_share, severity, f"{expr} presente en {ref_table}")
+
+
+def distinct_count(table: str, column: str, expected: int, severity: str = "warning") -> Rule:
+    metric = f"count(DISTINCT {column})"
+    return Rule(table, "cantidad_distinta", column, metric, "==", expected, severity, f"{expected} valores de {column}")
+
+
+def presence(table: str, column: str, condition: str, name: str, severity: str = "warning") -> Rule:
+    return Rule(table, name, column, f"count(*) FILTER (WHERE {condition})", ">=", 1, severity, condition)
+
+
+HS10_REGEX = "[0-9]{10}"
+# En los hechos hs10 es entero (se pierden los ceros a la izquierda); en dim_hs es texto.
+HS10_AS_TEXT = "printf('%010d', hs10)"
+HS2_OF_HS10 = "hs10 // 100000000"
+SECTOR_HS2 = "TRY_CAST(hs2 AS INTEGER)"
+
+DEFAULT_RULES = (
+    unique("dim_hs", "hs10"),
+    pattern("dim_hs", "hs10", HS10_REGEX),
+    distinct_count("dim_sector", "hs2", 98),
+    pattern("fact_exports", "hs10", HS10_REGEX, expr=HS10_AS_TEXT),
+    non_negative("fact_exports", "fob"),
+    non_negative("fact_exports", "tm_peso_neto"),
+    coverage("fact_exports", "hs10", HS2_OF_HS10, "dim_sector", SECTOR_HS2, 0.8),
+    presence("fact_exports", "country_name", "upper(country_name) LIKE '%CHINA%'", "socio_china"),
+    pattern("fact_imports", "hs10", HS10_REGEX, expr=HS10_AS_TEXT),
+    non_negative("fact_imports", "fob"),
+    non_negative("fact_imports", "cif"),
+    non_negative("fact_imports", "tm_peso_neto"),
+    coverage("fact_imports", "hs10", HS2_OF_HS10, "dim_sector", SECTOR_HS2, 0.8),
+)
+
+
+def evaluate_rules(conn: duckdb.DuckDBPyConnection, rules: tuple[Rule, ...] = DEFAULT_RULES) -> list[RuleResult]:
+    tables = {row[0] for row in conn.execute("SELECT table_name FROM duckdb_tables()").fetchall()}
+    by_table: dict[str, list[Rule]] = {}
+    for rule in rules:
+        by_table.setdefault(rule.table, []).append(rule)
+
+    results = []
+    for table, table_rules in by_table.items():
+        if table not in tables:
+            logger.warning("Reglas de calidad omitidas: no existe la tabla %s", table)
+            continue
+        metrics = ", ".join(rule.metric for rule in table_rules)
+        rows, *observed = conn.execute(f"SELECT count(*), {metrics} FROM {table}").fetchone()
+        for rule, value in zip(table_rules, observed):
+            value = float(value) if value is not None else None
+            results.append(
+                RuleResult(
+                    table_name=table,
+                    rule=rule.name,
+                    column_name=rule.column,
+                    severity=rule.severity,
+                    description=rule.description,
+                    comparison=rule.comparison,
+                    threshold=rule.threshold,
+                    observed=value,
+                    rows_checked=rows,
+                    passed=rule.passes(value),
+                )
+            )
+    return results
+
+
+def write_quality_results(conn: duckdb.DuckDBPyConnection, run_id: str, results: list[RuleResult]) -> None:
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE {QUALITY_TABLE} (
+            run_id VARCHAR,
+            table_name VARCHAR,
+            rule VARCHAR,
+            column_name VARCHAR,
+            severity VARCHAR,
+            description VARCHAR,
+            comparison VARCHAR,
+            threshold DOUBLE,
+            observed DOUBLE,
+            rows_checked BIGINT,
+            passed BOOLEAN
+        )
+        """
+    )
+    if results:
+        conn.executemany(
+            f"INSERT INTO {QUALITY_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [[run_id, *asdict(result).values()] for result in results],
+        )
+
+
+def read_quality_results(conn: duckdb.DuckDBPyConnection) -> list[dict]:
+    exists = conn.execute(
+        "SELECT 1 FROM information_schema.tables WHERE table_name = ?", [QUALITY_TABLE]
+    ).fetchone()
+    if exists is None:
+        return []
+    cursor = conn.execute(f"SELECT * FROM {QUALITY_TABLE} ORDER BY table_name, rule, column_name")
+    names = [column[0] for column in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+
+import duckdb
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_LEVELS = (6, 4, 2)
+ROLLUP_DIMENSIONS = ("year", "month", "period_idx", "flow", "country_code", "country_name")
+SECTOR_LOOKUP = "hs2_sector"
+
+
+def rollup_table(level: int) -> str:
+    return f"cube_hs{level}"
+
+
+def materialize_rollups(conn: duckdb.DuckDBPyConnection) -> dict[str, int]:
+    dims = ", ".join(ROLLUP_DIMENSIONS)
+    finest = ROLLUP_LEVELS[0]
+    divisor = 10 ** (10 - finest)
+    # Mismos filtros de negativos que aplica el motor de KPIs sobre las tablas de hechos.
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE {rollup_table(finest)} AS
+        SELECT {dims}, hs{finest}, SUM(fob) AS fob, SUM(cif) AS cif, SUM(tm_peso_neto) AS tm_peso_neto,
+               SUM(row_count) AS row_count
+        FROM (
+            SELECT year, month, period_idx, 'exports' AS flow, country_code, country_name,
+                   CAST(hs10 // {divisor} AS INTEGER) AS hs{finest},
+                   fob, CAST(NULL AS DOUBLE) AS cif, tm_peso_neto, 1 AS row_count
+            FROM fact_exports
+            WHERE fob >= 0
+            UNION ALL
+            SELECT year, month, period_idx, 'imports' AS flow, country_code, country_name,
+                   CAST(hs10 // {divisor} AS INTEGER) AS hs{finest},
+                   fob, cif, tm_peso_neto, 1 AS row_count
+            FROM fact_imports
+            WHERE fob >= 0 AND cif >= 0
+        )
+        GROUP BY ALL
+        ORDER BY year, flow, hs{finest}, country_code
+        """
+    )
+
+    for finer, level in zip(ROLLUP_LEVELS, ROLLUP_LEVELS[1:]):
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE {rollup_table(level)} AS
+            SELECT {dims}, CAST(hs{finer} // {10 ** (finer - level)} AS INTEGER) AS hs{level},
+                   SUM(fob) AS fob, SUM(cif) AS cif, SUM(tm_peso_neto) AS tm_peso_neto,
+                   SUM(row_count) AS row_count
+            FROM {rollup_table(finer)}
+            GROUP BY ALL
+            ORDER BY year, flow, hs{level}, country_code
+            """
+        )
+
+    sizes = {
+        rollup_table(level): conn.execute(f"SELECT COUNT(*) FROM {rollup_table(level)}").fetchone()[0]
+        for level in ROLLUP_LEVELS
+    }
+    for table, rows in sizes.items():
+        logger.info("Cubo %s materializado: %s filas", table, rows)
+    return sizes
+
+
+def materialize_sector_lookup(conn: duckdb.DuckDBPyConnection) -> int:
+    # Tabla densa de 100 capítulos con clave entera: los KPIs por sector la cruzan con cube_hs2 sin tocar texto.
+    # Si un capítulo aparece en varias secciones se queda con la primera fila de dim_sector (orden del Excel, vía
+    # rowid), no con la menor alfabéticamente ("IX" < "V"); los capítulos sin sección quedan NULL.
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE {SECTOR_LOOKUP} AS
+        SELECT CAST(c.hs2 AS INTEGER) AS hs2, s.seccion, s.sector_industria
+        FROM range(100) c(hs2)
+        LEFT JOIN (
+            SELECT TRY_CAST(hs2 AS INTEGER) AS hs2, arg_min(seccion, rowid) AS seccion,
+                   arg_min(sector_industria, rowid) AS sector_industria
+            FROM dim_sector
+            WHERE TRY_CAST(hs2 AS INTEGER) IS NOT NULL
+            GROUP BY 1
+        ) s ON s.hs2 = c.hs2
+        ORDER BY c.hs2
+        """
+    )
+    rows, mapped = conn.execute(f"SELECT count(*), count(seccion) FROM {SECTOR_LOOKUP}").fetchone()
+    logger.info("Tabla %s materializada: %s de %s capítulos con sección", SECTOR_LOOKUP, mapped, rows)
+    return rows
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+import logging
+import math
+import os
+from pathlib import Path
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .utils import normalize_column_name
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DIR = "_search"
+DOCS_FILE = "hs_docs.parquet"
+POSTINGS_FILE = "hs_postings.parquet"
+STOPWORDS = frozenset(
+    {"a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los", "o", "para", "por", "sin", "u", "un", "y"}
+)
+# Peso de un token que solo coincide por prefijo ("camar" -> "camarones") frente a uno exacto.
+PREFIX_WEIGHT = 0.7
+MAX_PREFIX_EXPANSIONS = 256
+
+
+def search_index_dir(processed_dir: Path) -> Path:
+    return Path(processed_dir) / SEARCH_DIR
+
+
+def search_tokens(text: object) -> list[str]:
+    return [t for t in normalize_column_name(text).split("_") if t and t not in STOPWORDS]
+
+
+def write_search_index(dim_hs: pd.DataFrame, dest: Path) -> int:
+    docs = (
+        pd.DataFrame(
+            {
+                "hs10": dim_hs.get("hs10", pd.Series(dtype=object)).astype(str),
+                "descripcion_final": dim_hs.get("descripcion_final", pd.Series(dtype=object)).fillna("").astype(str),
+            }
+        )
+        .drop_duplicates("hs10")
+        .sort_values("hs10", kind="stable")
+        .reset_index(drop=True)
+    )
+
+    postings: dict[str, list[int]] = {}
+    for doc_id, text in enumerate(docs["descripcion_final"]):
+        for token in dict.fromkeys(search_tokens(text)):
+            postings.setdefault(token, []).append(doc_id)
+    tokens = sorted(postings)
+
+    tmp = dest.with_name(dest.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    pq.write_table(pa.Table.from_pandas(docs, preserve_index=False), tmp / DOCS_FILE)
+    pq.write_table(
+        pa.table(
+            {
+                "token": pa.array(tokens, pa.string()),
+                "doc_ids": pa.array([postings[t] for t in tokens], pa.list_(pa.int32())),
+            }
+        ),
+        tmp / POSTINGS_FILE,
+    )
+    shutil.rmtree(dest, ignore_errors=True)
+    os.replace(tmp, dest)
+    logger.info("Índice de búsqueda HS: %s documentos, %s tokens", len(docs), len(tokens))
+    return len(tokens)
+
+
+class HSSearchIndex:
+    def __init__(self, codes: list[str], descriptions: list[str], tokens: list[str], postings: list[np.ndarray]):
+        self.codes = codes
+        self.descriptions = descriptions
+        self.tokens = tokens
+        self.postings = postings
+        n_docs = max(len(codes), 1)
+        self.idf = np.array([math.log(1 + n_docs / len(p)) for p in postings])
+        lengths = np.array([len(search_tokens(d)) for d in descriptions], dtype=np.float64)
+        # Desempate: a igual puntaje, descripciones más cortas (más específicas) primero.
+        self._tiebreak = 1e-3 / (1 + lengths)
+
+    @classmethod
+    def load(cls, directory: Path) -> HSSearchIndex:
+        docs = pq.read_table(Path(directory) / DOCS_FILE)
+        postings = pq.read_table(Path(directory) / POSTINGS_FILE)
+        doc_ids = postings.column("doc_ids").combine_chunks()
+        offsets = doc_ids.offsets.to_numpy()
+        values = doc_ids.values.to_numpy()
+        return cls(
+            docs.column("hs10").to_pylist(),
+            docs.column("descripcion_final").to_pylist(),
+            postings.column("token").to_pylist(),
+            [values[offsets[i] : offsets[i + 1]] for i in range(len(offsets) - 1)],
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def _code_hits(self, prefix: str) -> np.ndarray:
+        lo = bisect_left(self.codes, prefix)
+        hi = bisect_left(self.codes, prefix + "\uffff")
+        hits = np.zeros(len(self.codes))
+        hits[lo:hi] = 1.0
+        return hits
+
+    def _token_hits(self, token: str) -> np.ndarray:
+        hits = np.zeros(len(self.codes))
+        lo = bisect_left(self.tokens, token)
+        hi = min(bisect_left(self.tokens, token + "\uffff"), lo + MAX_PREFIX_EXPANSIONS)
+        for idx in range(lo, hi):
+            weight = self.idf[idx] * (1.0 if self.tokens[idx] == token else PREFIX_WEIGHT)
+            docs = self.postings[idx]
+            hits[docs] = np.maximum(hits[docs], weight)
+        return hits
+
+    def _digit_hits(self, group: list[str]) -> list[np.ndarray]:
+        # "0803.90" llega como ["0803", "90"]: juntos son un prefijo de código. Si no lo son, cada número se busca
+        # como código o, si no prefija ninguno, como palabra de la descripción ("2 kg", "1500 cm3").
+        code = "".join(group)
+        if len(group) > 1 and len(code) <= 10:
+            hits = self._code_hits(code)
+            if hits.any():
+                return [hits]
+        out = []
+        for token in group:
+            hits = self._code_hits(token) if len(token) <= 10 else np.zeros(len(self.codes))
+            out.append(hits if hits.any() else self._token_hits(token))
+        return out
+
+    def _term_hits(self, tokens: list[str]) -> list[np.ndarray]:
+        terms, digits = [], []
+        for token in [*tokens, ""]:
+            if token.isdigit():
+                digits.append(token)
+                continue
+            if digits:
+                terms.extend(self._digit_hits(digits))
+                digits = []
+            if token:
+                terms.append(self._token_hits(token))
+        return terms
+
+    def search(self, query: str, limit: int = 20) -> list[dict]:
+        tokens = search_tokens(query)
+        if not tokens or not self.codes:
+            return []
+        scores = np.zeros(len(self.codes))
+        matched = np.ones(len(self.codes), dtype=bool)
+        for hits in self._term_hits(tokens):
+            matched &= hits > 0
+            if not matched.any():
+                return []
+            scores += hits
+
+        candidates = np.flatnonzero(matched)
+        ranked = scores[candidates] + self._tiebreak[candidates]
+        top = candidates[np.lexsort((candidates, -ranked))][:limit]
+        return [
+            {"hs10": self.codes[i], "description": self.descriptions[i], "score": round(float(scores[i]), 4)}
+            for i in top
+        ]
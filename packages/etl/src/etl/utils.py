@@ -3,11 +3,19 @@ from __future__ import annotations
 import logging
 import re
 import unicodedata
-from typing import Iterable
+from typing import TYPE_CHECKING, Callable, Iterable
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
 DASH_TRANSLATION = str.maketrans({"–": "-", "—": "-", "−": "-", "‒": "-"})
+PERIODO_PATTERNS = (
+    r"(19\d{2}|20\d{2})\s*/\s*(1[0-2]|0?[1-9])",
+    r"(19\d{2}|20\d{2})[-_\s]+(1[0-2]|0?[1-9])",
+)
 
 
 def clean_text(value: object) -> str:
@@ -41,15 +49,84 @@ def as_hs(value: object, length: int = 10) -> str:
 
 def parse_periodo(periodo: str) -> tuple[int, int]:
     text = normalize_text_value(periodo)
-    match = re.search(r"(19\d{2}|20\d{2})\s*/\s*(1[0-2]|0?[1-9])", text)
+    match = re.search(PERIODO_PATTERNS[0], text)
     if not match:
-        match = re.search(r"(19\d{2}|20\d{2})[-_\s]+(1[0-2]|0?[1-9])", text)
+        match = re.search(PERIODO_PATTERNS[1], text)
     if not match:
         logger.warning("Periodo no parseable: %s", periodo)
         return 0, 0
     return int(match.group(1)), int(match.group(2))
 
 
+def period_index(year, month):
+    # Índice entero de periodo (year*12 + month); 0 cuando el periodo no se pudo parsear.
+    return year * 12 + month
+
+
+def _factorize_text(values: pd.Series) -> tuple[np.ndarray, pd.Series]:
+    import pandas as pd
+
+    if values.dtype == object:
+        # En columnas mixtas 1 y 1.0 colisionan al factorizar; se agrupa por su forma textual como clean_text.
+        raw = values.to_numpy(dtype=object, copy=True)
+        raw[raw == None] = ""  # noqa: E711
+        values = pd.Series(raw, index=values.index).astype(str)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return codes, pd.Series([clean_text(v) for v in uniques], dtype=object)
+
+
+def _map_unique(values: pd.Series, transform: Callable[[pd.Series], pd.Series]) -> pd.Series:
+    import pandas as pd
+
+    codes, texts = _factorize_text(values)
+    mapped = transform(texts).to_numpy()
+    return pd.Series(mapped[codes], index=values.index)
+
+
+def _normalize_text_kernel(texts: pd.Series) -> pd.Series:
+    texts = texts.str.replace("\u200b", "", regex=False).str.replace("\ufeff", "", regex=False)
+    texts = texts.str.translate(DASH_TRANSLATION)
+    texts = texts.str.replace(r"^[-\s]+", "", regex=True)
+    texts = texts.str.replace(r"[\.;:,\s]+$", "", regex=True)
+    texts = texts.str.replace(r"\s+", " ", regex=True)
+    return texts.str.strip()
+
+
+def normalize_text_series(values: pd.Series) -> pd.Series:
+    return _map_unique(values, _normalize_text_kernel)
+
+
+def as_hs_series(values: pd.Series, length: int = 10) -> pd.Series:
+    return _map_unique(values, lambda texts: texts.str.replace(r"\D", "", regex=True).str.zfill(length).str[:length])
+
+
+def parse_periodo_series(values: pd.Series, column: str = "Periodo") -> tuple[pd.Series, pd.Series]:
+    import pandas as pd
+
+    codes, raw_texts = _factorize_text(values)
+    texts = _normalize_text_kernel(raw_texts)
+    parsed = texts.str.extract(PERIODO_PATTERNS[0])
+    pending = parsed[0].isna()
+    if pending.any():
+        parsed.loc[pending] = texts[pending].str.extract(PERIODO_PATTERNS[1]).to_numpy()
+    years = pd.to_numeric(parsed[0]).fillna(0).astype(int).to_numpy()
+    months = pd.to_numeric(parsed[1]).fillna(0).astype(int).to_numpy()
+
+    failed = parsed[0].isna().to_numpy()
+    if failed.any():
+        failed_rows = int(failed[codes].sum())
+        examples = [raw_texts[i] for i in failed.nonzero()[0][:3]]
+        logger.warning(
+            "%s: %s filas con periodo no parseable (%s valores distintos, p.ej. %s)",
+            column,
+            failed_rows,
+            int(failed.sum()),
+            examples,
+        )
+
+    return pd.Series(years[codes], index=values.index), pd.Series(months[codes], index=values.index)
+
+
 def detect_header_row(path: str, sheet_name: str, key_columns: list[str], search_rows: int = 40) -> int:
     import pandas as pd
 
@@ -63,18 +140,10 @@ def detect_header_row(path: str, sheet_name: str, key_columns: list[str], search
 
 
 def first_sheet_with_headers(path: str, key_columns: list[str]) -> tuple[str, int]:
-    import pandas as pd
+    from .workbook import workbook_layout
 
-    xls = pd.ExcelFile(path)
-    for sheet in xls.sheet_names:
-        idx = detect_header_row(path, sheet, key_columns)
-        probe = pd.read_excel(path, sheet_name=sheet, header=idx, nrows=1)
-        normalized = {normalize_column_name(c) for c in probe.columns}
-        if {normalize_column_name(k) for k in key_columns}.issubset(normalized):
-            return sheet, idx
-    if xls.sheet_names:
-        return xls.sheet_names[0], 0
-    raise ValueError(f"No sheets found in workbook: {path}")
+    layout = workbook_layout(path, key_columns)
+    return layout.sheet, layout.header_idx
 
 
 def resolve_column(df_columns: Iterable[object], aliases: list[str]) -> str | None:
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import itertools
+import os
+from pathlib import Path
+import threading
+from typing import Iterator
+
+import pandas as pd
+
+from .utils import normalize_column_name
+
+EXCEL_ERROR_CODES = frozenset({"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"})
+
+
+@dataclass(frozen=True)
+class WorkbookLayout:
+    sheet: str
+    header_idx: int
+
+
+@dataclass
+class WorkbookScan:
+    sheet: str
+    header_idx: int
+    frame: pd.DataFrame
+
+
+_layout_cache: dict[tuple, WorkbookLayout] = {}
+_layout_lock = threading.Lock()
+
+
+def _layout_key(path: str | Path, key_columns: list[str]) -> tuple:
+    stat = os.stat(path)
+    return (str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size, tuple(key_columns))
+
+
+def cached_layout(path: str | Path, key_columns: list[str]) -> WorkbookLayout | None:
+    with _layout_lock:
+        return _layout_cache.get(_layout_key(path, key_columns))
+
+
+def clear_layout_cache() -> None:
+    with _layout_lock:
+        _layout_cache.clear()
+
+
+def _convert_value(value: object) -> object:
+    # Mismas conversiones que el lector openpyxl de pandas.read_excel.
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value in EXCEL_ERROR_CODES:
+        return float("nan")
+    return value
+
+
+def _convert_row(row: tuple) -> list[object]:
+    converted = [_convert_value(v) for v in row]
+    while converted and converted[-1] == "":
+        converted.pop()
+    return converted
+
+
+def _is_header(row: list[object], keys: set[str]) -> bool:
+    return keys.issubset({normalize_column_name(v) for v in row})
+
+
+def _locate_header(
+    rows: Iterator[tuple], keys: set[str], search_rows: int, header_idx: int | None = None
+) -> tuple[int, list[object]] | None:
+    for idx, row in enumerate(itertools.islice(rows, search_rows if header_idx is None else header_idx + 1)):
+        converted = _convert_row(row)
+        if header_idx is None and _is_header(converted, keys):
+            return idx, converted
+        if header_idx == idx:
+            return idx, converted
+    return None
+
+
+def _rows_to_frame(header: list[object], rows: Iterator[tuple]) -> pd.DataFrame:
+    from pandas.io.parsers import TextParser
+
+    data: list[list[object]] = [header]
+    last_with_data = 0
+    for row in rows:
+        converted = _convert_row(row)
+        data.append(converted)
+        if converted:
+            last_with_data = len(data) - 1
+    data = data[: last_with_data + 1]
+
+    width = max(len(r) for r in data)
+    if width == 0:
+        return pd.DataFrame()
+    data = [r + [""] * (width - len(r)) for r in data]
+    return TextParser(data, header=0, skip_blank_lines=False).read()
+
+
+def _open_workbook(path: str | Path):
+    from openpyxl import load_workbook
+
+    return load_workbook(path, read_only=True, data_only=True, keep_links=False)
+
+
+def _sheet_rows(workbook, sheet: str) -> Iterator[tuple]:
+    worksheet = workbook[sheet]
+    worksheet.reset_dimensions()
+    return worksheet.iter_rows(values_only=True)
+
+
+def detect_layout(workbook, key_columns: list[str], search_rows: int = 40) -> WorkbookLayout:
+    keys = {normalize_column_name(k) for k in key_columns}
+    for sheet in workbook.sheetnames:
+        found = _locate_header(_sheet_rows(workbook, sheet), keys, search_rows)
+        if found is not None:
+            return WorkbookLayout(sheet, found[0])
+    if workbook.sheetnames:
+        return WorkbookLayout(workbook.sheetnames[0], 0)
+    raise ValueError("No sheets found in workbook")
+
+
+def workbook_layout(path: str | Path, key_columns: list[str], search_rows: int = 40) -> WorkbookLayout:
+    layout = cached_layout(path, key_columns)
+    if layout is not None:
+        return layout
+
+    workbook = _open_workbook(path)
+    try:
+        layout = detect_layout(workbook, key_columns, search_rows)
+    except ValueError as exc:
+        raise ValueError(f"No sheets found in workbook: {path}") from exc
+    finally:
+        workbook.close()
+    with _layout_lock:
+        _layout_cache[_layout_key(path, key_columns)] = layout
+    return layout
+
+
+def _open_data_rows(
+    workbook, path: str | Path, key_columns: list[str], search_rows: int
+) -> tuple[str, int, list[object], Iterator[tuple]]:
+    keys = {normalize_column_name(k) for k in key_columns}
+    layout = cached_layout(path, key_columns)
+    candidates = [layout.sheet] if layout else workbook.sheetnames
+    for sheet in candidates:
+        rows = _sheet_rows(workbook, sheet)
+        found = _locate_header(rows, keys, search_rows, layout.header_idx if layout else None)
+        if found is None:
+            continue
+        header_idx, header = found
+        with _layout_lock:
+            _layout_cache[_layout_key(path, key_columns)] = WorkbookLayout(sheet, header_idx)
+        return sheet, header_idx, header, rows
+
+    if not workbook.sheetnames:
+        raise ValueError(f"No sheets found in workbook: {path}")
+    sheet = workbook.sheetnames[0]
+    rows = _sheet_rows(workbook, sheet)
+    first = next(rows, None)
+    return sheet, 0, _convert_row(first) if first is not None else [], rows
+
+
+def read_workbook(path: str | Path, key_columns: list[str], search_rows: int = 40) -> WorkbookScan:
+    workbook = _open_workbook(path)
+    try:
+        sheet, header_idx, header, rows = _open_data_rows(workbook, path, key_columns, search_rows)
+        return WorkbookScan(sheet, header_idx, _rows_to_frame(header, rows))
+    finally:
+        workbook.close()
+
+
+def _batch_frame(header: list[object], batch: list[list[object]]) -> pd.DataFrame:
+    from pandas.io.parsers import TextParser
+
+    width = max(len(header), max(len(r) for r in batch))
+    data = [r + [""] * (width - len(r)) for r in [header, *batch]]
+    return TextParser(data, header=0, skip_blank_lines=False).read()
+
+
+def iter_workbook_batches(
+    path: str | Path, key_columns: list[str], batch_size: int, search_rows: int = 40
+) -> Iterator[pd.DataFrame]:
+    workbook = _open_workbook(path)
+    try:
+        _, _, header, rows = _open_data_rows(workbook, path, key_columns, search_rows)
+        if not header:
+            return
+        batch: list[list[object]] = []
+        for row in rows:
+            converted = _convert_row(row)
+            if not converted:
+                continue
+            batch.append(converted)
+            if len(batch) >= batch_size:
+                yield _batch_frame(header, batch)
+                batch = []
+        if batch:
+            yield _batch_frame(header, batch)
+    finally:
+        workbook.close()
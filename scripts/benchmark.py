@@ -0,0 +1,218 @@
+import argparse
+from datetime import datetime, timezone
+import json
+from pathlib import Path
+import resource
+import statistics
+import time
+
+from packages.etl.src.etl.build import resolve_outputs
+from packages.etl.src.etl.pipeline import FACT_TABLES, ETLConfig, ObservatorioETL
+from packages.etl.src.etl.profiling import PeakRSS, StageMetrics
+from packages.etl.src.etl.search_index import search_index_dir
+from apps.api.app.repositories.connection_pool import DuckDBConnectionPool
+from apps.api.app.repositories.duckdb_repository import DuckDBRepository
+from apps.api.app.services.analytics_service import AnalyticsService
+from apps.api.app.services.export_service import ARROW_STREAM, DataExportService
+from apps.api.app.services.hs_index import HSIndex
+from apps.api.app.services.search import HSSearch
+from scripts.synthetic_data import generate_synthetic_data
+
+# Etapas cuyo trabajo escala con las filas de hechos; para ellas se reporta throughput.
+ROW_STAGES = ("build_fact_tables", "save_parquet", "materialize_duckdb", "materialize_rollups")
+
+
+def stage_summary(stages: list[StageMetrics], fact_rows: int) -> dict[str, dict]:
+    summary: dict[str, dict] = {}
+    for metrics in stages:
+        name = f"build_{metrics.target}" if metrics.stage == "build" else metrics.stage
+        stage = summary.setdefault(name, {"seconds": 0.0, "calls": 0, "rows_in": 0, "peak_rss_mb": 0.0})
+        stage["seconds"] += metrics.wall_seconds
+        stage["calls"] += 1
+        stage["rows_in"] += metrics.rows_in or 0
+        stage["peak_rss_mb"] = max(stage["peak_rss_mb"], metrics.peak_rss_bytes / 2**20)
+
+    for name, stage in summary.items():
+        stage["seconds"] = round(stage["seconds"], 4)
+        stage["peak_rss_mb"] = round(stage["peak_rss_mb"], 1)
+        rows = fact_rows if name in ROW_STAGES else stage["rows_in"] if name.startswith("ingest_") else 0
+        if rows and stage["seconds"] > 0:
+            stage["rows_per_s"] = round(rows / stage["seconds"])
+    return summary
+
+
+def bench_etl(raw_dir: Path, work_dir: Path, workers: int, streaming: bool) -> dict:
+    processed = work_dir / "processed"
+    etl = ObservatorioETL(
+        ETLConfig(
+            raw_dir=raw_dir,
+            processed_dir=processed,
+            duckdb_path=processed / "observatorio.duckdb",
+            workers=workers,
+            full_refresh=True,
+            streaming=streaming,
+        )
+    )
+    source_bytes = sum(p.stat().st_size for p in raw_dir.rglob("*.xlsx"))
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        etl.run()
+        total = time.perf_counter() - start
+
+    fact_rows = sum(
+        m.rows_out or 0 for m in etl.profiler.stages if m.stage == "build" and m.target in FACT_TABLES
+    )
+    stages = stage_summary(etl.profiler.stages, fact_rows)
+    ingest = stages.get("build_fact_tables", {}).get("seconds") or 0
+    return {
+        "seconds": round(total, 4),
+        "fact_rows": fact_rows,
+        "source_mb": round(source_bytes / 2**20, 1),
+        "ingest_mb_per_s": round(source_bytes / 2**20 / ingest, 2) if ingest else None,
+        "peak_rss_mb": round(rss.peak / 2**20, 1),
+        # Con workers > 1 la lectura de Excel ocurre en procesos hijos.
+        "children_max_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+        "stages": stages,
+    }
+
+
+def _export_bytes(exporter: DataExportService, year: int | None) -> int:
+    sql, params = exporter.query("fact_exports", year_from=year, year_to=year)
+    return sum(len(chunk) for chunk in exporter.stream(sql, params, ARROW_STREAM))
+
+
+def api_cases(db_path: Path, search_dir: Path) -> tuple[dict, DuckDBConnectionPool]:
+    pool = DuckDBConnectionPool(str(db_path), size=4)
+    repo = DuckDBRepository(str(db_path), pool=pool)
+    # Sin caché de resultados: se mide el cómputo de cada endpoint, no el acierto de caché.
+    service = AnalyticsService(repo)
+    exporter = DataExportService(repo)
+    with repo.connection() as conn:
+        last_year = conn.execute("SELECT max(year) FROM fact_exports").fetchone()[0]
+    cases = {
+        "kpis_overview": lambda: service.overview(),
+        "kpis_overview_year": lambda: service.overview(last_year),
+        "kpis_dependency_hs10": lambda: service.dependency(hs_level=10, limit=100),
+        "kpis_dependency_hs4": lambda: service.dependency(hs_level=4, limit=100),
+        "kpis_dependency_ndjson": lambda: sum(1 for _ in service.stream_dependency(hs_level=6)),
+        "kpis_timeseries_year": lambda: service.timeseries("year"),
+        "kpis_timeseries_month": lambda: service.timeseries("month", hs_prefix="03"),
+        # HSIndex/HSSearch nuevos en cada llamada: se mide la construcción, como tras un rebuild.
+        "hs_tree_build": lambda: HSIndex(repo).current(),
+        "hs_search_load": lambda: HSSearch(search_dir).current(),
+        "data_export_arrow_year": lambda: _export_bytes(exporter, last_year),
+    }
+    tree = HSIndex(repo).current()
+    search = HSSearch(search_dir)
+    cases["hs_children_root"] = lambda: tree.children(None, last_year)
+    cases["hs_search"] = lambda: search.search("camarones congelados")
+    return cases, pool
+
+
+def bench_api(db_path: Path, search_dir: Path, iterations: int) -> dict:
+    cases, pool = api_cases(db_path, search_dir)
+    results = {}
+    try:
+        for name, call in cases.items():
+            call()
+            timings = []
+            with PeakRSS() as rss:
+                for _ in range(iterations):
+                    start = time.perf_counter()
+                    call()
+                    timings.append(time.perf_counter() - start)
+            timings.sort()
+            median = statistics.median(timings)
+            results[name] = {
+                "median_ms": round(median * 1000, 3),
+                "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))] * 1000, 3),
+                "requests_per_s": round(1 / median, 1) if median else None,
+                "peak_rss_mb": round(rss.peak / 2**20, 1),
+            }
+    finally:
+        pool.close()
+    return results
+
+
+def comparable_metrics(result: dict) -> dict[str, float]:
+    metrics = {"etl.seconds": result["etl"]["seconds"], "etl.peak_rss_mb": result["etl"]["peak_rss_mb"]}
+    for name, stage in result["etl"]["stages"].items():
+        metrics[f"etl.{name}.seconds"] = stage["seconds"]
+    for name, case in result["api"].items():
+        metrics[f"api.{name}.median_ms"] = case["median_ms"]
+    return metrics
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[dict]:
+    now, before = comparable_metrics(current), comparable_metrics(baseline)
+    rows = []
+    for metric in sorted(now.keys() & before.keys()):
+        old, new = before[metric], now[metric]
+        change = (new - old) / old if old else 0.0
+        rows.append(
+            {
+                "metric": metric,
+                "baseline": old,
+                "current": new,
+                "change": round(change, 4),
+                "regression": change > tolerance,
+            }
+        )
+    return rows
+
+
+def print_comparison(rows: list[dict]) -> None:
+    print(f"{'métrica':<45} {'baseline':>12} {'actual':>12} {'cambio':>9}")
+    for row in rows:
+        flag = "  REGRESIÓN" if row["regression"] else ""
+        print(f"{row['metric']:<45} {row['baseline']:>12.3f} {row['current']:>12.3f} {row['change']:>+9.1%}{flag}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de etapas del ETL y endpoints de la API")
+    parser.add_argument("--raw", type=Path, default=Path("./data/synthetic/raw"))
+    parser.add_argument("--work-dir", type=Path, default=Path("./data/synthetic/bench"))
+    parser.add_argument("--generate", type=int, default=None, help="Genera N filas sintéticas por flujo antes de medir")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--results-dir", type=Path, default=Path("./benchmarks/results"))
+    parser.add_argument("--baseline", type=Path, default=Path("./benchmarks/baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Guarda el resultado como nuevo baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Aumento relativo tolerado antes de marcar regresión")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_synthetic_data(args.raw, rows=args.generate, workers=args.workers)
+    if not args.raw.exists():
+        parser.error(f"No existe {args.raw}; use --generate N o scripts/synthetic_data.py")
+
+    etl = bench_etl(args.raw, args.work_dir, args.workers, args.streaming)
+    db_path = args.work_dir / "processed" / "observatorio.duckdb"
+    api = bench_api(db_path, search_index_dir(resolve_outputs(db_path)), args.iterations)
+    result = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {"workers": args.workers, "streaming": args.streaming, "iterations": args.iterations},
+        "etl": etl,
+        "api": api,
+    }
+
+    args.results_dir.mkdir(parents=True, exist_ok=True)
+    out = args.results_dir / f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    out.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultado: {out} ({etl['fact_rows']} filas de hechos, ETL {etl['seconds']}s, pico RSS {etl['peak_rss_mb']} MB)")
+
+    status = 0
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Baseline actualizado: {args.baseline}")
+    elif args.baseline.exists():
+        rows = compare(result, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        print_comparison(rows)
+        status = 1 if any(row["regression"] for row in rows) else 0
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
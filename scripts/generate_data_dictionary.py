@@ -1,13 +1,19 @@
 from pathlib import Path
-import pandas as pd
+import pyarrow.dataset as ds
 
 
-def generate_data_dictionary(processed_dir: Path) -> None:
+def _tables(outputs_dir: Path) -> list[Path]:
+    files = outputs_dir.glob("*.parquet")
+    datasets = [p for p in outputs_dir.iterdir() if p.is_dir() and not p.name.startswith("_")]
+    return sorted([*files, *datasets], key=lambda p: p.stem)
+
+
+def generate_data_dictionary(outputs_dir: Path) -> None:
     lines = ["# Data Dictionary\n"]
-    for file in sorted(processed_dir.glob("*.parquet")):
-        df = pd.read_parquet(file)
-        lines.append(f"## {file.stem}\n")
-        for col, dtype in df.dtypes.items():
+    for path in _tables(outputs_dir):
+        schema = ds.dataset(path, format="parquet", partitioning="hive").schema
+        lines.append(f"## {path.stem}\n")
+        for col, dtype in schema.empty_table().to_pandas().dtypes.items():
             lines.append(f"- `{col}`: `{dtype}`")
         lines.append("")
     Path("docs/data_dictionary.md").write_text("\n".join(lines), encoding="utf-8")
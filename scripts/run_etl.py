@@ -1,13 +1,23 @@
+import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 import os
 
+from packages.etl.src.etl.build import resolve_outputs
 from packages.etl.src.etl.pipeline import ETLConfig, ObservatorioETL
 from scripts.seed_data import ensure_sample_data
 from scripts.generate_data_dictionary import generate_data_dictionary
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Ejecuta el ETL del Observatorio")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Ignora el manifest de archivos fuente y vuelve a procesar todos los Excel",
+    )
+    args = parser.parse_args()
+
     load_dotenv()
     raw = Path(os.getenv("DATA_RAW_DIR", "./data/raw"))
     processed = Path(os.getenv("DATA_PROCESSED_DIR", "./data/processed"))
@@ -16,9 +26,31 @@ def main() -> None:
     if os.getenv("ETL_SEED_DEMO", "false").lower() == "true":
         ensure_sample_data(raw)
 
-    etl = ObservatorioETL(ETLConfig(raw_dir=raw, processed_dir=processed, duckdb_path=db))
+    workers = int(os.getenv("ETL_WORKERS", "1"))
+    streaming = os.getenv("ETL_STREAMING", "false").lower() == "true"
+    batch_size = int(os.getenv("ETL_BATCH_SIZE", "50000"))
+    profile = os.getenv("ETL_PROFILE", "false").lower() == "true"
+    keep_versions = int(os.getenv("ETL_KEEP_VERSIONS", "2"))
+    duckdb_threads = int(os.getenv("ETL_DUCKDB_THREADS", "0")) or None
+    duckdb_memory_limit = os.getenv("ETL_DUCKDB_MEMORY_LIMIT") or None
+
+    etl = ObservatorioETL(
+        ETLConfig(
+            raw_dir=raw,
+            processed_dir=processed,
+            duckdb_path=db,
+            workers=workers,
+            full_refresh=args.full_refresh,
+            streaming=streaming,
+            batch_size=batch_size,
+            profile=profile,
+            keep_versions=keep_versions,
+            duckdb_threads=duckdb_threads,
+            duckdb_memory_limit=duckdb_memory_limit,
+        )
+    )
     etl.run()
-    generate_data_dictionary(processed)
+    generate_data_dictionary(resolve_outputs(db))
     print("ETL completado")
 
 
@@ -2,11 +2,12 @@ from pathlib import Path
 import pandas as pd
 
 
-def ensure_sample_data(raw_dir: Path) -> None:
+def ensure_sample_data(raw_dir: Path, include_trade: bool = True) -> None:
     raw_dir.mkdir(parents=True, exist_ok=True)
     _seed_dict(raw_dir / "diccionario_ecuador.xlsx")
-    _seed_trade(raw_dir / "exportaciones.xlsx", export=True)
-    _seed_trade(raw_dir / "importaciones.xlsx", export=False)
+    if include_trade:
+        _seed_trade(raw_dir / "exportaciones.xlsx", export=True)
+        _seed_trade(raw_dir / "importaciones.xlsx", export=False)
     _seed_trademap(raw_dir / "panel_trademap.xlsx")
     _seed_sector(raw_dir / "SECTORES.xlsx")
 
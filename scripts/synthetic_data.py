@@ -0,0 +1,296 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import math
+from pathlib import Path
+import shutil
+
+import numpy as np
+from openpyxl import Workbook
+
+from scripts.seed_data import ensure_sample_data
+
+EXPORT_FOLDER = "EXPORTACION_1998-2025"
+IMPORT_FOLDER = "IMPORTACIONES_1998-2025"
+# Límite de filas de una hoja Excel (1.048.576) menos encabezado y filas de metadata.
+MAX_ROWS_PER_FILE = 1_000_000
+CHUNK_ROWS = 50_000
+NEGATIVE_SHARE = 0.0005
+
+MONTHS = (
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre",
+)
+COUNTRIES = (
+    ("840", "Estados Unidos"), ("156", "China"), ("528", "Países Bajos"), ("724", "España"),
+    ("643", "Rusia"), ("604", "Perú"), ("170", "Colombia"), ("152", "Chile"), ("276", "Alemania"),
+    ("380", "Italia"), ("392", "Japón"), ("410", "Corea del Sur"), ("484", "México"), ("76", "Brasil"),
+    ("32", "Argentina"), ("250", "Francia"), ("826", "Reino Unido"), ("124", "Canadá"), ("591", "Panamá"),
+    ("356", "India"),
+)
+PRODUCTS = (
+    "Bananas", "Camarones", "Langostinos", "Atunes", "Cacao en grano", "Café sin tostar", "Rosas",
+    "Flores cortadas", "Aceite de palma", "Brócoli", "Mangos", "Piñas", "Madera de balsa", "Harina de pescado",
+    "Sardinas", "Conservas de atún", "Aceites crudos de petróleo", "Gasolinas", "Medicamentos", "Vehículos",
+    "Neumáticos", "Teléfonos", "Máquinas de procesamiento de datos", "Tubos de acero", "Abonos minerales",
+    "Trigo", "Maíz amarillo", "Tortas de soja", "Papel kraft", "Hilados de algodón",
+)
+QUALIFIERS = (
+    "frescos", "congelados", "secos", "en conserva", "los demás", "refinados", "en bruto", "para siembra",
+    "orgánicos", "de uso industrial", "en envases inferiores a 2 kg", "sin elaborar", "preparados",
+    "con cáscara", "sin cáscara", "usados", "nuevos", "de cilindrada superior a 1500 cm3",
+)
+EXPORT_HEADERS = (
+    ("Periodo", "Codigo_Subpartida_10", "Codigo_Pais_Destino", "Pais_Destino", "TM_Peso_Neto", "FOB"),
+    ("PERÍODO", "Código Subpartida 10", "Código País Destino", "País Destino", "TM Peso Neto", "Valor FOB"),
+    ("Período", "CODIGO SUBPARTIDA 10", "Codigo Pais Destino", "PAIS DESTINO", "Peso Neto", "FOB"),
+)
+IMPORT_HEADERS = (
+    ("Periodo", "Codigo_Subpartida_10", "Codigo_Pais_Origen", "Pais_Origen", "TM_Peso_Neto", "FOB", "CIF"),
+    ("PERÍODO", "Código Subpartida 10", "Código País Origen", "País Origen", "TM Peso Neto", "Valor FOB", "Valor CIF"),
+    ("Período", "CODIGO SUBPARTIDA 10", "Codigo Pais Origen", "PAIS ORIGEN", "Peso Neto", "FOB", "CIF"),
+)
+TRANSPORT = ("Marítimo", "Aéreo", "Terrestre")
+SECTIONS = (
+    ("I", "01-05", "Agropecuario"), ("II", "06-14", "Agropecuario"), ("III", "15", "Agroindustria"),
+    ("IV", "16-24", "Agroindustria"), ("V", "25-27", "Minería y petróleo"), ("VI", "28-38", "Químico"),
+    ("VII", "39-40", "Plásticos y caucho"), ("VIII", "41-43", "Cueros"), ("IX", "44-46", "Madera"),
+    ("X", "47-49", "Papel"), ("XI", "50-63", "Textil"), ("XII", "64-67", "Calzado"),
+    ("XIII", "68-70", "Minerales no metálicos"), ("XIV", "71", "Joyería"), ("XV", "72-83", "Metalmecánica"),
+    ("XVI", "84-85", "Maquinaria"), ("XVII", "86-89", "Transporte"), ("XVIII", "90-92", "Instrumentos"),
+    ("XIX", "93", "Armas"), ("XX", "94-96", "Manufacturas diversas"), ("XXI", "97", "Arte"),
+)
+
+
+def zipf_weights(n: int, exponent: float = 1.1) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def synthetic_hs_codes(n_hs: int, rng: np.random.Generator) -> np.ndarray:
+    chapters = np.array([c for c in range(1, 98) if c != 77])
+    codes = np.array([], dtype=np.int64)
+    while len(codes) < n_hs:
+        size = n_hs * 2
+        draw = (
+            rng.choice(chapters, size) * 10**8
+            + rng.integers(1, 100, size) * 10**6
+            + rng.integers(0, 100, size) * 10**4
+            + rng.integers(0, 100, size) * 100
+            + rng.integers(0, 100, size)
+        )
+        codes = np.unique(np.concatenate([codes, draw]))
+    return np.sort(rng.choice(codes, n_hs, replace=False))
+
+
+def synthetic_countries(n_countries: int) -> list[tuple[str, str]]:
+    countries = list(COUNTRIES[:n_countries])
+    used = {code for code, _ in countries}
+    code = 4
+    while len(countries) < n_countries:
+        if str(code) not in used:
+            countries.append((str(code), f"País {code:03d}"))
+        code += 1
+    return countries
+
+
+def _description(hs10: int, rng: np.random.Generator) -> str:
+    product = PRODUCTS[(hs10 // 10**6) % len(PRODUCTS)]
+    return f"{product} {QUALIFIERS[rng.integers(len(QUALIFIERS))]}"
+
+
+def _write_dictionary(path: Path, hs_codes: np.ndarray, rng: np.random.Generator) -> None:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("diccionario")
+    ws.append(["Diccionario de subpartidas arancelarias"])
+    ws.append([])
+    ws.append(["HS10", "Descripción Final", "Tipo Elemento"])
+    for code in hs_codes:
+        ws.append([str(code).zfill(10), _description(int(code), rng), "subpartida"])
+    wb.save(path)
+
+
+def _write_sectors(path: Path) -> None:
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("sectores")
+    ws.append(["sección", "capítulos", "sector"])
+    for row in SECTIONS:
+        ws.append(list(row))
+    wb.save(path)
+
+
+def _trade_rows(
+    rng: np.random.Generator,
+    n_rows: int,
+    year: int,
+    is_import: bool,
+    hs_codes: np.ndarray,
+    hs_weights: np.ndarray,
+    countries: list[tuple[str, str]],
+    country_weights: np.ndarray,
+    numeric_hs: bool,
+    slash_period: bool,
+):
+    periods = [f"{year} / {m:02d} - {MONTHS[m - 1]}" if slash_period else f"{year}-{m:02d}" for m in range(1, 13)]
+    for start in range(0, n_rows, CHUNK_ROWS):
+        size = min(CHUNK_ROWS, n_rows - start)
+        months = rng.integers(0, 12, size)
+        hs = hs_codes[rng.choice(len(hs_codes), size, p=hs_weights)]
+        country_idx = rng.choice(len(countries), size, p=country_weights)
+        tm = np.round(rng.lognormal(2.0, 1.5, size), 3)
+        fob = np.round(tm * rng.lognormal(7.0, 0.8, size), 2)
+        fob[rng.random(size) < NEGATIVE_SHARE] *= -1
+        cif = np.round(np.abs(fob) * rng.uniform(1.02, 1.15, size), 2)
+        transport = rng.integers(0, len(TRANSPORT), size)
+        pad = rng.random(size) < 0.05
+
+        names = [f" {countries[c][1]}  " if p else countries[c][1] for c, p in zip(country_idx.tolist(), pad.tolist())]
+        columns = [
+            [periods[m] for m in months.tolist()],
+            hs.tolist() if numeric_hs else [str(v).zfill(10) for v in hs.tolist()],
+            [countries[c][0] for c in country_idx.tolist()],
+            names,
+            tm.tolist(),
+            fob.tolist(),
+            *([cif.tolist()] if is_import else []),
+            [TRANSPORT[t] for t in transport.tolist()],
+        ]
+        yield from zip(*columns)
+
+
+def _write_trade_file(
+    path: Path,
+    is_import: bool,
+    year: int,
+    n_rows: int,
+    seed: int,
+    hs_codes: np.ndarray,
+    hs_weights: np.ndarray,
+    countries: list[tuple[str, str]],
+    country_weights: np.ndarray,
+) -> tuple[int, int]:
+    rng = np.random.default_rng(seed)
+    headers = IMPORT_HEADERS if is_import else EXPORT_HEADERS
+    header = list(headers[rng.integers(len(headers))]) + ["Vía Transporte"]
+    flow = "Importaciones" if is_import else "Exportaciones"
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Columnas")
+    metadata = ["Banco Central del Ecuador", f"{flow} por subpartida - {year}", "Fuente: SENAE"]
+    for line in metadata[: rng.integers(1, len(metadata) + 1)]:
+        ws.append([line])
+    ws.append([])
+    ws.append(header)
+
+    valid = 0
+    for row in _trade_rows(
+        rng,
+        n_rows,
+        year,
+        is_import,
+        hs_codes,
+        hs_weights,
+        countries,
+        country_weights,
+        numeric_hs=bool(rng.random() < 0.3),
+        slash_period=bool(rng.random() < 0.8),
+    ):
+        ws.append(row)
+        valid += row[5] >= 0
+    wb.save(path)
+    return n_rows, valid
+
+
+def _write_trade_task(task: tuple) -> tuple[int, int]:
+    return _write_trade_file(*task)
+
+
+def _year_files(rows: int, years: list[int], rows_per_file: int) -> list[tuple[int, int, int]]:
+    jobs = []
+    per_year, extra = divmod(rows, len(years))
+    for i, year in enumerate(years):
+        year_rows = per_year + (1 if i < extra else 0)
+        parts = max(1, math.ceil(year_rows / rows_per_file))
+        base, rest = divmod(year_rows, parts)
+        for part in range(parts):
+            jobs.append((year, part + 1, base + (1 if part < rest else 0)))
+    return jobs
+
+
+def generate_synthetic_data(
+    raw_dir: Path,
+    rows: int = 1_000_000,
+    years: list[int] | None = None,
+    n_hs: int = 8_000,
+    n_countries: int = 200,
+    rows_per_file: int = 250_000,
+    seed: int = 7,
+    workers: int = 1,
+) -> dict:
+    if rows_per_file > MAX_ROWS_PER_FILE:
+        raise ValueError(f"rows_per_file no puede superar {MAX_ROWS_PER_FILE}")
+    years = years or list(range(2015, 2025))
+    raw_dir = Path(raw_dir)
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    hs_codes = synthetic_hs_codes(n_hs, rng)
+    hs_weights = zipf_weights(n_hs)[rng.permutation(n_hs)]
+    countries = synthetic_countries(n_countries)
+    country_weights = zipf_weights(n_countries)
+    _write_dictionary(raw_dir / "diccionario_ecuador.xlsx", hs_codes, rng)
+    _write_sectors(raw_dir / "SECTORES.xlsx")
+    ensure_sample_data(raw_dir, include_trade=False)
+
+    jobs = []
+    for is_import, folder, prefix in [(False, EXPORT_FOLDER, "EXPORTACION"), (True, IMPORT_FOLDER, "IMPORTACIONES")]:
+        shutil.rmtree(raw_dir / folder, ignore_errors=True)
+        (raw_dir / folder).mkdir()
+        for year, part, n in _year_files(rows, years, rows_per_file):
+            path = raw_dir / folder / f"{prefix}_{year}_{part:02d}.xlsx"
+            jobs.append((path, is_import, year, n, int(rng.integers(2**31))))
+
+    tasks = [(*job, hs_codes, hs_weights, countries, country_weights) for job in jobs]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_write_trade_task, tasks))
+    else:
+        results = [_write_trade_task(task) for task in tasks]
+
+    summary = {flow: {"files": 0, "rows": 0, "valid_rows": 0} for flow in ("exports", "imports")}
+    for (_, is_import, *_), (n, valid) in zip(jobs, results):
+        stats = summary["imports" if is_import else "exports"]
+        stats["files"] += 1
+        stats["rows"] += n
+        stats["valid_rows"] += valid
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Genera libros Excel sintéticos de comercio exterior")
+    parser.add_argument("--out", type=Path, default=Path("./data/synthetic/raw"))
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Filas por flujo (exportaciones e importaciones)")
+    parser.add_argument("--year-from", type=int, default=2015)
+    parser.add_argument("--year-to", type=int, default=2024)
+    parser.add_argument("--hs", type=int, default=8_000, help="Cantidad de subpartidas HS10 distintas")
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--rows-per-file", type=int, default=250_000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    summary = generate_synthetic_data(
+        args.out,
+        rows=args.rows,
+        years=list(range(args.year_from, args.year_to + 1)),
+        n_hs=args.hs,
+        n_countries=args.countries,
+        rows_per_file=args.rows_per_file,
+        seed=args.seed,
+        workers=args.workers,
+    )
+    for flow, stats in summary.items():
+        print(f"{flow}: {stats['files']} archivos, {stats['rows']} filas ({stats['valid_rows']} válidas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import threading
+
+import duckdb
+import pytest
+
+from apps.api.app.repositories.connection_pool import DuckDBConnectionPool, PoolTimeoutError
+from apps.api.app.repositories.duckdb_repository import DuckDBRepository
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "test.duckdb"
+    conn = duckdb.connect(str(path))
+    conn.execute("CREATE TABLE fact_exports AS SELECT 2024 AS year, 10.0 AS fob, 'China' AS country_name")
+    conn.close()
+    return str(path)
+
+
+def test_pool_reuses_connections(db_path):
+    pool = DuckDBConnectionPool(db_path, size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool.health()["open"] == 1
+    pool.close()
+
+
+def test_pool_is_bounded(db_path):
+    pool = DuckDBConnectionPool(db_path, size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeoutError):
+            with pool.connection():
+                pass
+    pool.close()
+
+
+def test_pool_discards_unhealthy_connections(db_path):
+    pool = DuckDBConnectionPool(db_path, size=1, health_check_interval=0)
+    with pool.connection() as conn:
+        pass
+    conn.close()
+    with pool.connection() as fresh:
+        assert fresh is not conn
+        assert fresh.execute("SELECT 1").fetchone() == (1,)
+    pool.close()
+
+
+def test_repository_read_is_thread_safe_and_validates_table(db_path):
+    repo = DuckDBRepository(db_path, pool=DuckDBConnectionPool(db_path, size=2))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(len(repo.read("fact_exports")))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [1] * 8
+    with pytest.raises(ValueError):
+        repo.read("fact_exports; DROP TABLE fact_exports")
+    repo.pool.close()
+
+
+def test_pool_switches_to_new_database_version_without_breaking_readers(tmp_path):
+    paths = []
+    for version in (1, 2):
+        path = str(tmp_path / f"o.v{version}.duckdb")
+        conn = duckdb.connect(path)
+        conn.execute(f"CREATE TABLE t AS SELECT {version} AS version")
+        conn.close()
+        paths.append(path)
+
+    current = [paths[0]]
+    pool = DuckDBConnectionPool(paths[0], size=2, resolve_path=lambda: current[0])
+    with pool.connection() as old:
+        assert old.execute("SELECT version FROM t").fetchone() == (1,)
+        current[0] = paths[1]
+        with pool.connection() as new:
+            assert new.execute("SELECT version FROM t").fetchone() == (2,)
+        assert old.execute("SELECT version FROM t").fetchone() == (1,)
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT version FROM t").fetchone() == (2,)
+    health = pool.health()
+    assert health["database"] == paths[1]
+    assert health["open"] == 1
+    assert pool._retired == {}
+    pool.close()
+
+
+def test_pool_releases_file_when_build_changes_in_place(tmp_path):
+    path = str(tmp_path / "o.duckdb")
+    conn = duckdb.connect(path)
+    conn.execute("CREATE TABLE t AS SELECT 1 AS version")
+    conn.close()
+
+    build = ["b1"]
+    pool = DuckDBConnectionPool(path, size=2, resolve_path=lambda: path, resolve_version=lambda: build[0])
+    with pool.connection() as old:
+        old.execute("SELECT 1").fetchone()
+        build[0] = "b2"
+        with pool.connection() as new:
+            assert new.execute("SELECT version FROM t").fetchone() == (1,)
+        assert list(pool._retired) == [0]
+
+    # Al devolverse el último cursor la raíz anterior se cierra: ningún cursor queda en la generación vieja.
+    assert pool._retired == {}
+    assert pool.health()["open"] == 1
+    pool.close()
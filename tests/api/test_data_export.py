@@ -0,0 +1,101 @@
+import io
+
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from apps.api.app.repositories.connection_pool import DuckDBConnectionPool, PoolTimeoutError
+from apps.api.app.repositories.duckdb_repository import DuckDBRepository
+from apps.api.app.services.export_service import (
+    ARROW_STREAM,
+    PARQUET,
+    DataExportService,
+    UnsupportedMediaType,
+    negotiate_format,
+)
+from apps.api.app.services.streaming import primed
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    path = str(tmp_path / "facts.duckdb")
+    conn = duckdb.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE fact_exports AS
+        SELECT (2020 + i % 3)::SMALLINT AS year, (803901100 + (i % 5) * 100000000)::BIGINT AS hs10,
+               CASE WHEN i % 2 = 0 THEN '156' ELSE '840' END AS country_code, i::DOUBLE AS fob
+        FROM range(100) t(i)
+        """
+    )
+    conn.close()
+    pool = DuckDBConnectionPool(path, size=1)
+    yield DataExportService(DuckDBRepository(path, pool=pool), batch_rows=7)
+    pool.close()
+
+
+def test_arrow_stream_applies_projection_and_filters(exporter):
+    sql, params = exporter.query(
+        "fact_exports", columns=["hs10", "fob"], year_from=2021, hs_prefix="0803", countries=["0156"]
+    )
+    chunks = list(exporter.stream(sql, params, ARROW_STREAM))
+    table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+
+    assert table.column_names == ["hs10", "fob"]
+    assert set(table["hs10"].to_pylist()) == {803901100}
+    expected = [float(i) for i in range(100) if i % 5 == 0 and i % 2 == 0 and 2020 + i % 3 >= 2021]
+    assert sorted(table["fob"].to_pylist()) == expected
+
+    sql, params = exporter.query("fact_exports")
+    assert len(list(exporter.stream(sql, params, ARROW_STREAM))) > 100 // 7
+
+
+def test_parquet_export_round_trips_even_when_empty(exporter):
+    sql, params = exporter.query("fact_exports", year_to=2020, limit=4)
+    assert pq.read_table(io.BytesIO(b"".join(exporter.stream(sql, params, PARQUET)))).num_rows == 4
+
+    sql, params = exporter.query("fact_exports", year_from=1990, year_to=1991)
+    empty = pq.read_table(io.BytesIO(b"".join(exporter.stream(sql, params, PARQUET))))
+    assert empty.num_rows == 0
+    assert empty.column_names == ["year", "hs10", "country_code", "fob"]
+
+
+def test_primed_stream_fails_before_the_response_starts(exporter):
+    sql, params = exporter.query("fact_exports", columns=["fob"])
+    chunks = primed(exporter.stream(sql, params, ARROW_STREAM))
+    assert exporter.repository.pool._idle.qsize() == 0
+    assert pa.ipc.open_stream(b"".join(chunks)).read_all().num_rows == 100
+
+    with pytest.raises(duckdb.Error):
+        primed(exporter.stream("SELECT * FROM nada", [], ARROW_STREAM))
+
+    exporter.repository.pool.timeout = 0.05
+    with exporter.repository.connection():
+        with pytest.raises(PoolTimeoutError):
+            primed(exporter.stream(sql, params, PARQUET))
+
+
+def test_export_rejects_unknown_tables_and_columns(exporter):
+    with pytest.raises(ValueError):
+        exporter.query("dim_hs")
+    with pytest.raises(ValueError):
+        exporter.query("fact_exports", columns=["fob", "secret"])
+
+
+@pytest.mark.parametrize(
+    "accept, fmt, expected",
+    [
+        (None, None, ARROW_STREAM),
+        ("application/json;q=0.9, application/x-parquet", None, PARQUET),
+        ("application/vnd.apache.parquet;q=0.2, application/vnd.apache.arrow.stream", None, ARROW_STREAM),
+        ("application/json", "parquet", PARQUET),
+    ],
+)
+def test_format_negotiation(accept, fmt, expected):
+    assert negotiate_format(accept, fmt) == expected
+
+
+def test_format_negotiation_rejects_json_only():
+    with pytest.raises(UnsupportedMediaType):
+        negotiate_format("application/json")
@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+import threading
+import time
+
+import duckdb
+import pytest
+
+from apps.api.app.services.cache import BuildVersion
+from apps.api.app.services.hs_index import HSIndex
+from packages.analytics.src.analytics import overview_kpis_sql
+from packages.etl.src.etl.build import write_build_marker
+from packages.etl.src.etl.rollups import materialize_rollups
+
+
+def test_hs_index_serves_old_tree_while_new_build_warms(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "observatorio.duckdb")
+    write_build_marker(db_path, "build-1")
+    build_version = BuildVersion(db_path)
+    index = HSIndex(repository=None, build_version=build_version)
+    release = threading.Event()
+    loads = []
+
+    def load():
+        if loads:
+            release.wait(5)
+        loads.append(object())
+        return loads[-1]
+
+    monkeypatch.setattr(index, "_load", load)
+
+    first = index.current()
+    assert index.current() is first
+    write_build_marker(db_path, "build-2-with-longer-id")
+    # El cambio lo detecta el watcher (o cualquier request); la carga no bloquea a quien consulta el árbol.
+    build_version.watch(0.01)
+    try:
+        deadline = time.monotonic() + 5
+        while index._loading is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert index.current() is first
+        release.set()
+        while index.current() is first and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        build_version.stop()
+    assert index.current() is loads[1]
+    assert len(loads) == 2
+
+
+class _Repository:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextmanager
+    def connection(self, operation="connection"):
+        yield self.conn
+
+
+def test_tree_totals_match_overview_kpis():
+    conn = duckdb.connect()
+    conn.execute(
+        """
+        CREATE TABLE fact_exports AS SELECT * FROM (VALUES
+            (2024::SMALLINT, 1, 803901100::BIGINT, '156', 'China', 10.0),
+            (2024, 2, 306171000, '840', 'Estados Unidos', -3.0),
+            (0, 0, 306171000, '152', 'Chile', 7.5)
+        ) t(year, month, hs10, country_code, country_name, fob)
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE fact_imports AS SELECT * FROM (VALUES
+            (2024::SMALLINT, 5, 8471300000::BIGINT, '156', 'China', 80.0, 90.0),
+            (2024, 6, 8703230000, '840', 'Estados Unidos', 10.0, -2.0)
+        ) t(year, month, hs10, country_code, country_name, fob, cif)
+        """
+    )
+    for table in ("fact_exports", "fact_imports"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN period_idx INTEGER DEFAULT 0")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN tm_peso_neto DOUBLE DEFAULT 0")
+    materialize_rollups(conn)
+
+    chapters = HSIndex(_Repository(conn)).current().children(None)
+    overview = overview_kpis_sql(conn)
+    assert sum(c["exports_fob"] for c in chapters) == pytest.approx(overview["total_exports_fob"]) == 17.5
+    assert sum(c["imports_fob"] for c in chapters) == pytest.approx(overview["total_imports_fob"]) == 80.0
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from apps.api.app.services.cache import BuildVersion
+from apps.api.app.services.search import HSSearch
+from packages.etl.src.etl.build import build_outputs_dir, write_build_marker
+from packages.etl.src.etl.search_index import search_index_dir, write_search_index
+
+
+def _build(processed, build_id, descripcion):
+    outputs = build_outputs_dir(processed, build_id)
+    dim_hs = pd.DataFrame({"hs10": ["0306170000"], "descripcion_final": [descripcion]})
+    write_search_index(dim_hs, search_index_dir(outputs))
+    return outputs
+
+
+def test_search_follows_the_outputs_of_the_published_build(tmp_path):
+    db_path = tmp_path / "observatorio.duckdb"
+    search = HSSearch(tmp_path / "_search", build_version=BuildVersion(str(db_path)))
+
+    write_build_marker(db_path, "build-1", outputs=_build(tmp_path, "build-1", "camarones congelados"))
+    assert [hit["hs10"] for hit in search.search("camarones")] == ["0306170000"]
+
+    # Un build en curso escribe su índice sin que la API lo lea hasta que el marker lo publica.
+    outputs = _build(tmp_path, "build-2-with-longer-id", "langostinos congelados")
+    assert search.search("langostinos") == []
+    write_build_marker(db_path, "build-2-with-longer-id", outputs=outputs)
+    assert [hit["hs10"] for hit in search.search("langostinos")] == ["0306170000"]
+    assert search.search("camarones") == []
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+
+import duckdb
+from fastapi import FastAPI
+
+from apps.api.app.core.metrics import ApiMetrics, Histogram, MetricsMiddleware
+from apps.api.app.repositories.connection_pool import DuckDBConnectionPool
+from apps.api.app.repositories.duckdb_repository import DuckDBRepository
+
+
+def _get(app, path: str) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return next(m["status"] for m in sent if m["type"] == "http.response.start")
+
+
+def test_middleware_labels_requests_by_route_template():
+    metrics = ApiMetrics()
+    app = FastAPI()
+
+    @app.get("/api/hs/{code}/children")
+    async def children(code: str) -> dict:
+        return {"code": code}
+
+    app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    assert _get(app, "/api/hs/08/children") == 200
+    assert _get(app, "/api/hs/0803/children") == 200
+    assert _get(app, "/nada") == 404
+
+    assert metrics.requests.value(method="GET", route="/api/hs/{code}/children", status=200) == 2
+    assert metrics.requests.value(method="GET", route="unmatched", status=404) == 1
+    assert metrics.in_flight.value() == 0
+    text = metrics.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/hs/{code}/children",status="200"} 2' in text
+    assert "process_resident_memory_bytes " in text
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram("latency_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        hist.observe(value, op="a")
+
+    assert hist.render()[2:] == [
+        'latency_seconds_bucket{op="a",le="0.1"} 1',
+        'latency_seconds_bucket{op="a",le="1"} 3',
+        'latency_seconds_bucket{op="a",le="+Inf"} 4',
+        'latency_seconds_sum{op="a"} 4.25',
+        'latency_seconds_count{op="a"} 4',
+    ]
+
+
+def test_repository_records_query_time_rows_scanned_and_slow_log(tmp_path, caplog):
+    path = str(tmp_path / "m.duckdb")
+    conn = duckdb.connect(path)
+    conn.execute("CREATE TABLE t AS SELECT range AS a FROM range(1000)")
+    conn.close()
+
+    metrics = ApiMetrics()
+    pool = DuckDBConnectionPool(path, size=1)
+    repo = DuckDBRepository(path, pool=pool, metrics=metrics, slow_query_seconds=0.0, count_rows_scanned=True)
+    with caplog.at_level(logging.WARNING):
+        assert repo.query("SELECT count(*) AS n FROM t WHERE a > 10")["n"].tolist() == [989]
+        with repo.connection("overview", "year=2024") as cursor:
+            cursor.execute("SELECT sum(a) FROM t").fetchone()
+            cursor.execute("SELECT max(a) FROM t").fetchone()
+        assert len(repo.read("t")) == 1000
+        with repo.connection("relations") as cursor:
+            assert len(cursor.table("t").df()) == len(cursor.sql("SELECT a FROM t WHERE a < 10").df()) * 100
+        with repo.arrow_reader("SELECT a FROM t", batch_size=100, operation="data_export") as reader:
+            assert reader.read_all().num_rows == 1000
+
+    plain = DuckDBRepository(path, pool=pool, metrics=metrics)
+    plain.query("SELECT 1")
+    pool.close()
+
+    assert metrics.query_latency.count(operation="query") == 2
+    assert metrics.rows_scanned.value(operation="query") == 1000
+    assert metrics.rows_scanned.value(operation="overview") == 2000
+    assert metrics.rows_scanned.value(operation="read") == 1000
+    assert metrics.rows_scanned.value(operation="relations") == 2000
+    assert metrics.rows_scanned.value(operation="data_export") == 1000
+    assert metrics.slow_queries.value(operation="overview") == 1
+    assert any("overview" in r.message and "year=2024" in r.message for r in caplog.records)
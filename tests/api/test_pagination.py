@@ -0,0 +1,29 @@
+import pytest
+
+from apps.api.app.services.analytics_service import AnalyticsService
+from apps.api.app.services.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+
+def test_cursor_round_trips_within_the_same_filters():
+    filters = (10, None, 2024, "156", 0.5, "exports")
+    cursor = encode_cursor((0.75, 1200.0, 803901100), filters)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, filters) == (0.75, 1200.0, 803901100)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor((1.0, 2.0, 3), (6, None, None, "156", 0.5, "exports"))])
+def test_cursor_rejects_garbage_and_other_filters(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, (10, None, None, "156", 0.5, "exports"))
+
+
+@pytest.mark.parametrize(
+    "key", [(0.5, "1200.0000"), (0.5, 1200.0, 803901100), (0.5, "1200", [803901100]), (True, "1", 1), (0.5, "abc", 1)]
+)
+def test_dependency_rejects_tampered_cursor_keys(key):
+    service = AnalyticsService(repository=None)
+    filters = (10, None, None, "156", 0.5, "exports")
+    with pytest.raises(InvalidCursorError):
+        service.dependency(cursor=encode_cursor(key, filters))
+    with pytest.raises(InvalidCursorError):
+        service.stream_dependency(cursor=encode_cursor(key, filters))
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+
+import duckdb
+import pytest
+
+from apps.api.app.repositories.connection_pool import DuckDBConnectionPool
+from apps.api.app.services.executor import QueryExecutor, QueryRejectedError, QueryTimeoutError
+
+
+@pytest.fixture
+def pool(tmp_path):
+    path = tmp_path / "test.duckdb"
+    duckdb.connect(str(path)).close()
+    pool = DuckDBConnectionPool(str(path), size=2)
+    yield pool
+    pool.close()
+
+
+def _slow_query(pool):
+    with pool.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM range(1000000000000) t(a) WHERE a % 7 = 3").fetchone()
+
+
+def test_timeout_interrupts_running_duckdb_query(pool):
+    executor = QueryExecutor(max_workers=1, max_queue=0, timeout=0.2)
+
+    async def scenario():
+        started = time.monotonic()
+        with pytest.raises(QueryTimeoutError):
+            await executor.run(_slow_query, pool)
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 5
+    deadline = time.monotonic() + 5
+    while executor.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert executor.stats()["pending"] == 0
+    assert executor.stats()["timed_out"] == 1
+    assert pool.health()["in_use"] == 0
+    executor.shutdown()
+
+
+def test_full_queue_is_rejected_while_loop_stays_responsive():
+    executor = QueryExecutor(max_workers=1, max_queue=1, timeout=5)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.create_task(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(QueryRejectedError):
+            await executor.run(lambda: None)
+        assert executor.stats()["pending"] == 2
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(scenario()) == [True, True]
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def _rows(pool, n):
+    with pool.connection() as conn:
+        result = conn.execute("SELECT range FROM range(?)", [n])
+        while rows := result.fetchmany(2):
+            yield rows
+
+
+def _broken(pool):
+    with pool.connection() as conn:
+        yield conn.execute("SELECT * FROM nada").fetchall()
+
+
+def test_stream_holds_a_slot_and_cuts_slow_clients(pool):
+    executor = QueryExecutor(max_workers=1, max_queue=0, timeout=0.5)
+    # La primera lectura carga módulos de DuckDB; se hace antes para no consumir el límite.
+    list(_rows(pool, 1))
+
+    async def scenario():
+        stream = await executor.stream(_rows, pool, 5)
+        with pytest.raises(QueryRejectedError):
+            await executor.run(lambda: None)
+        assert [row async for chunk in stream for row in chunk] == [(0,), (1,), (2,), (3,), (4,)]
+        assert executor.stats()["pending"] == 0
+
+        with pytest.raises(duckdb.Error):
+            await executor.stream(_broken, pool)
+
+        slow = await executor.stream(_rows, pool, 10)
+        await slow.__anext__()
+        await asyncio.sleep(0.6)
+        with pytest.raises(QueryTimeoutError):
+            await slow.__anext__()
+
+        abandoned = await executor.stream(_rows, pool, 10)
+        assert executor.stats()["pending"] == 1
+        del abandoned
+
+    asyncio.run(scenario())
+    assert executor.stats()["pending"] == 0
+    assert executor.stats()["timed_out"] == 1
+    assert pool.health()["in_use"] == 0
+    executor.shutdown()
@@ -0,0 +1,40 @@
+from apps.api.app.services.analytics_service import AnalyticsService
+from apps.api.app.services.cache import BuildVersion, ResultCache
+from packages.etl.src.etl.build import write_build_marker
+
+
+def test_cache_counts_hits_and_misses():
+    cache = ResultCache(maxsize=4, ttl=60)
+    calls = []
+    for _ in range(3):
+        cache.get_or_compute(("overview", (2024,), "b1"), lambda: calls.append(1) or len(calls))
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_lru_and_expires():
+    cache = ResultCache(maxsize=2, ttl=60)
+    for key in ["a", "b", "c"]:
+        cache.get_or_compute(key, lambda: key)
+    assert cache.stats()["size"] == 2
+    cache.get_or_compute("a", lambda: "recomputed")
+    assert cache.stats()["misses"] == 4
+
+    expiring = ResultCache(maxsize=2, ttl=0)
+    expiring.get_or_compute("a", lambda: 1)
+    assert expiring.get_or_compute("a", lambda: 2) == 2
+
+
+def test_new_etl_build_invalidates_entries(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "observatorio.duckdb")
+    write_build_marker(db_path, "build-1")
+    service = AnalyticsService(repository=None, cache=ResultCache(), build_version=BuildVersion(db_path))
+    results = iter([{"v": 1}, {"v": 2}])
+    monkeypatch.setattr(service, "_overview", lambda year: next(results))
+
+    assert service.overview(2024) == {"v": 1}
+    assert service.overview(2024) == {"v": 1}
+    write_build_marker(db_path, "build-2-with-longer-id")
+    assert service.overview(2024) == {"v": 2}
+
@@ -0,0 +1,308 @@
+import duckdb
+import pandas as pd
+import pytest
+
+from packages.analytics.src.analytics.kpis import dependency_by_product, overview_kpis
+from packages.analytics.src.analytics.sql_kpis import (
+    dependency_sql,
+    iter_dependency_sql,
+    overview_kpis_sql,
+    resolve_cube,
+    sector_sql,
+    timeseries_sql,
+    value_filter,
+)
+from packages.analytics.src.analytics.validators import validate_kpi_inputs
+from packages.etl.src.etl.quality import evaluate_rules, non_negative, write_quality_results
+from packages.etl.src.etl.rollups import materialize_rollups, materialize_sector_lookup
+
+
+@pytest.fixture
+def trade_frames():
+    exports = pd.DataFrame(
+        [
+            {"year": 2023, "fob": 50.0, "country_name": "China"},
+            {"year": 2024, "fob": 100.0, "country_name": "China"},
+            {"year": 2024, "fob": -5.0, "country_name": "China"},
+            {"year": 2024, "fob": 40.0, "country_name": "Estados Unidos"},
+            {"year": 2024, "fob": 25.5, "country_name": "Chile"},
+        ]
+    )
+    imports = pd.DataFrame(
+        [
+            {"year": 2023, "fob": 30.0, "cif": 33.0},
+            {"year": 2024, "fob": 80.0, "cif": 90.0},
+            {"year": 2024, "fob": -1.0, "cif": 4.0},
+            {"year": 2024, "fob": 10.0, "cif": -2.0},
+        ]
+    )
+    return exports, imports
+
+
+@pytest.fixture
+def conn(trade_frames):
+    exports, imports = trade_frames
+    con = duckdb.connect()
+    con.register("fact_exports", exports)
+    con.register("fact_imports", imports)
+    yield con
+    con.close()
+
+
+@pytest.mark.parametrize("year", [None, 2023, 2024, 1999])
+def test_overview_sql_matches_pandas_reference(conn, trade_frames, year):
+    exports, imports = validate_kpi_inputs(*trade_frames)
+    expected = overview_kpis(exports, imports, year)
+    out = overview_kpis_sql(conn, year)
+
+    for key in ["total_exports_fob", "total_imports_fob", "trade_balance", "logistics_cost"]:
+        assert out[key] == pytest.approx(expected[key])
+    assert out["country_ranking"] == [
+        {"country_name": r["country_name"], "fob": pytest.approx(r["fob"])} for r in expected["country_ranking"]
+    ]
+
+
+def test_overview_sql_ranking_is_limited(conn):
+    many = pd.DataFrame([{"year": 2024, "fob": float(i), "country_name": f"P{i:02d}"} for i in range(15)])
+    conn.register("fact_exports", many)
+    out = overview_kpis_sql(conn, 2024)
+    assert len(out["country_ranking"]) == 10
+    assert out["country_ranking"][0] == {"country_name": "P14", "fob": 14.0}
+
+
+def _trade_db() -> duckdb.DuckDBPyConnection:
+    con = duckdb.connect()
+    con.execute(
+        """
+        CREATE TABLE fact_exports AS SELECT * FROM (VALUES
+            (2023::SMALLINT, 1::TINYINT, 803901100::BIGINT, '156', 'China', 10.0, 50.0),
+            (2024, 1, 803901100, '156', 'China', 5.0, 100.0),
+            (2024, 2, 306171000, '840', 'Estados Unidos', 2.0, 40.0),
+            (2024, 3, 306171000, '152', 'Chile', 1.0, 25.5),
+            (2024, 3, 306171000, '152', 'Chile', 1.0, -3.0)
+        ) t(year, month, hs10, country_code, country_name, tm_peso_neto, fob)
+        """
+    )
+    con.execute("ALTER TABLE fact_exports ADD COLUMN period_idx INTEGER DEFAULT 0")
+    con.execute(
+        """
+        CREATE TABLE fact_imports AS SELECT * FROM (VALUES
+            (2023::SMALLINT, 1::TINYINT, 8471300000::BIGINT, '156', 'China', 1.0, 30.0, 33.0),
+            (2024, 5, 8471300000, '156', 'China', 1.0, 80.0, 90.0),
+            (2024, 6, 8703230000, '840', 'Estados Unidos', 1.0, 10.0, -2.0)
+        ) t(year, month, hs10, country_code, country_name, tm_peso_neto, fob, cif)
+        """
+    )
+    con.execute("ALTER TABLE fact_imports ADD COLUMN period_idx INTEGER DEFAULT 0")
+    for table in ("fact_exports", "fact_imports"):
+        con.execute(f"UPDATE {table} SET period_idx = year * 12 + month")
+    return con
+
+
+@pytest.mark.parametrize("year", [None, 2023, 2024])
+def test_overview_from_rollups_matches_fact_tables(year):
+    con = _trade_db()
+    from_facts = overview_kpis_sql(con, year)
+    materialize_rollups(con)
+
+    assert resolve_cube(con) == "cube_hs2"
+    assert resolve_cube(con, hs_level=5) == "cube_hs6"
+    assert resolve_cube(con, hs_level=8) is None
+    assert overview_kpis_sql(con, year) == pytest.approx(from_facts)
+    assert con.execute("SELECT hs2, SUM(row_count) FROM cube_hs2 GROUP BY hs2 ORDER BY hs2").fetchall() == [
+        (3, 2),
+        (8, 2),
+        (84, 2),
+    ]
+    con.close()
+
+
+def test_dependency_sql_matches_pandas_reference():
+    con = _trade_db()
+    exports = con.execute("SELECT * FROM fact_exports WHERE fob >= 0").df()
+    expected = dependency_by_product(exports).sort_values("hs10").reset_index(drop=True)
+
+    out = dependency_sql(con, hs_level=10, threshold=0.0)
+    got = sorted(out["items"], key=lambda r: r["hs_code"])
+    assert out["total"] == len(got) == len(expected)
+    assert [r["hs_code"] for r in got] == [f"{hs:010d}" for hs in expected["hs10"]]
+    assert [r["share_partner"] for r in got] == pytest.approx(expected["share_china"].tolist())
+    con.close()
+
+
+@pytest.mark.parametrize("flow", ["exports", "imports"])
+@pytest.mark.parametrize("hs_level", [2, 4, 6, 8])
+def test_dependency_sql_cube_and_fact_paths_agree(flow, hs_level):
+    con = _trade_db()
+    con.execute("UPDATE fact_exports SET country_code = '0156' WHERE country_code = '156' AND year = 2023")
+    kwargs = dict(hs_level=hs_level, year_from=2023, year_to=2024, partner="156.0", threshold=0.1, flow=flow)
+    from_facts = dependency_sql(con, **kwargs)
+    materialize_rollups(con)
+    assert dependency_sql(con, **kwargs) == from_facts
+    assert all(len(item["hs_code"]) == hs_level for item in from_facts["items"])
+    con.close()
+
+
+def test_dependency_sql_filters_threshold_years_and_limit():
+    con = _trade_db()
+    con.execute("INSERT INTO fact_exports VALUES (2024, 4, 306171000, '156', 'China', 1.0, 80.0, 2024 * 12 + 4)")
+
+    out = dependency_sql(con, hs_level=4, year_from=2024, threshold=0.5, limit=1)
+    assert out["total"] == 2
+    assert out["items"] == [{"hs_code": "0803", "fob_total": 100.0, "fob_partner": 100.0, "share_partner": 1.0}]
+    assert dependency_sql(con, year_to=2022)["items"] == []
+    with pytest.raises(ValueError):
+        dependency_sql(con, hs_level=3)
+    con.close()
+
+
+def test_dependency_keyset_pages_match_stream():
+    con = _trade_db()
+    con.execute(
+        """
+        INSERT INTO fact_exports
+        SELECT 2024, 1, 100000000 + i * 10000, CASE WHEN i % 3 = 0 THEN '156' ELSE '840' END, 'X', 1.0, (i % 4) + 1.0,
+               2024 * 12 + 1
+        FROM range(40) t(i)
+        """
+    )
+    paged, after = [], None
+    while True:
+        page = dependency_sql(con, hs_level=6, threshold=0.0, limit=7, after=after)
+        paged.extend(page["items"])
+        after = page["next"]
+        if after is None:
+            break
+
+    streamed = list(iter_dependency_sql(con, hs_level=6, threshold=0.0, batch_size=5))
+    assert paged == streamed
+    assert len(paged) == page["total"] == len({item["hs_code"] for item in paged})
+    assert list(iter_dependency_sql(con, hs_level=6, threshold=0.0, limit=3)) == streamed[:3]
+    con.close()
+
+
+def _monthly_db() -> duckdb.DuckDBPyConnection:
+    con = _trade_db()
+    con.execute("DELETE FROM fact_exports")
+    con.execute("DELETE FROM fact_imports")
+    # 2022-01 .. 2024-06 con un mes sin datos (2023-03) para ejercitar la serie densa.
+    con.execute(
+        """
+        INSERT INTO fact_exports
+        SELECT (p - 1) // 12, p - ((p - 1) // 12) * 12, CASE WHEN p % 2 = 0 THEN 803901100 ELSE 306171000 END,
+               '156', 'China', 1.0, (p - 24264)::DOUBLE * 10, p
+        FROM range(2022 * 12 + 1, 2024 * 12 + 7) t(p)
+        WHERE p <> 2023 * 12 + 3
+        """
+    )
+    con.execute(
+        """
+        INSERT INTO fact_imports
+        SELECT (p - 1) // 12, p - ((p - 1) // 12) * 12, 8471300000, '840', 'Estados Unidos', 1.0, 5.0, 6.0, p
+        FROM range(2022 * 12 + 1, 2024 * 12 + 7) t(p)
+        """
+    )
+    return con
+
+
+def test_timeseries_windows_match_pandas_reference():
+    con = _monthly_db()
+    out = timeseries_sql(con, "month")
+    points = pd.DataFrame(out["points"])
+
+    monthly = con.execute("SELECT period_idx, SUM(fob) AS fob FROM fact_exports GROUP BY 1").df()
+    monthly = monthly.set_index("period_idx")
+    dense = monthly["fob"].reindex(range(2022 * 12 + 1, 2024 * 12 + 7), fill_value=0.0)
+    assert points["period"].iloc[0] == "2022-01" and points["period"].iloc[-1] == "2024-06"
+    assert points.loc[points["period"] == "2023-03", "exports_fob"].item() == 0.0
+    assert points["exports_fob"].tolist() == dense.tolist()
+    assert points["exports_rolling_12m"].tolist() == dense.rolling(12, min_periods=1).sum().tolist()
+    expected_yoy = (dense / dense.shift(12).replace(0, float("nan")) - 1).tolist()
+    got_yoy = [float("nan") if v is None else v for v in points["exports_yoy"]]
+    assert got_yoy == pytest.approx(expected_yoy, nan_ok=True)
+    assert points["trade_balance"].tolist() == (dense - 5.0).tolist()
+    assert set(points["logistics_cost"]) == {1.0}
+
+    yearly = timeseries_sql(con, "year")
+    totals = dense.groupby((dense.index - 1) // 12).sum()
+    assert [p["exports_fob"] for p in yearly["points"]] == totals.tolist()
+    assert yearly["points"][1]["exports_yoy"] == pytest.approx(totals[2023] / totals[2022] - 1)
+    assert yearly["points"][0]["exports_rolling_12m"] is None
+    # 2024 llega solo hasta junio: el CAGR se mide entre los años completos 2022 y 2023.
+    assert [p["complete"] for p in yearly["points"]] == [True, True, False]
+    assert yearly["cagr_years"] == {"from": 2022, "to": 2023}
+    assert yearly["cagr"]["exports_fob"] == pytest.approx(totals[2023] / totals[2022] - 1)
+    assert out["cagr"] == yearly["cagr"] and out["cagr_years"] == yearly["cagr_years"]
+    assert timeseries_sql(con, "year", year_from=2023)["cagr_years"] is None
+    con.close()
+
+
+@pytest.mark.parametrize("hs_prefix", [None, "08", "0803", "080390", "0803901100"])
+def test_timeseries_filters_agree_between_cubes_and_facts(hs_prefix):
+    con = _monthly_db()
+    kwargs = dict(granularity="month", hs_prefix=hs_prefix, countries=["0156"], year_from=2023)
+    from_facts = timeseries_sql(con, **kwargs)
+    materialize_rollups(con)
+    assert timeseries_sql(con, **kwargs) == from_facts
+    # Los meses impares llevan HS 0306, por lo que el filtro 08* arranca en febrero.
+    assert from_facts["points"][0]["period"] == ("2023-01" if hs_prefix is None else "2023-02")
+    assert all(p["imports_fob"] == 0 for p in from_facts["points"])
+    assert timeseries_sql(con, "year", year_from=1990, year_to=1991) == {
+        "granularity": "year",
+        "cagr": {"exports_fob": None, "imports_fob": None},
+        "cagr_years": None,
+        "points": [],
+    }
+    con.close()
+
+
+def test_value_filter_trusts_only_validated_columns():
+    con = _trade_db()
+    rules = (non_negative("fact_exports", "fob"), non_negative("fact_imports", "fob"), non_negative("fact_imports", "cif"))
+    assert value_filter(con, "fact_imports") == "fob >= 0 AND cif >= 0"
+
+    write_quality_results(con, "b1", evaluate_rules(con, rules))
+    assert value_filter(con, "fact_exports") == "fob >= 0"
+    assert value_filter(con, "fact_imports") == "fob >= 0 AND cif >= 0"
+
+    filtered = dependency_sql(con, hs_level=10, flow="imports", threshold=0.0)
+    con.execute("DELETE FROM fact_imports WHERE cif < 0")
+    write_quality_results(con, "b2", evaluate_rules(con, rules))
+    assert value_filter(con, "fact_imports") == "TRUE"
+    assert dependency_sql(con, hs_level=10, flow="imports", threshold=0.0) == filtered
+    con.close()
+
+
+def test_sector_sql_groups_chapters_through_lookup():
+    con = _trade_db()
+    con.execute(
+        """
+        CREATE TABLE dim_sector AS SELECT * FROM (VALUES
+            ('03', 'I', 'Pesca'), ('08', 'II', 'Agro'), ('84', 'XVI', 'Maquinaria'), ('84', 'IX', 'Otro')
+        ) t(hs2, seccion, sector_industria)
+        """
+    )
+    with pytest.raises(LookupError):
+        sector_sql(con)
+    assert materialize_sector_lookup(con) == 100
+    assert con.execute("SELECT * FROM hs2_sector WHERE hs2 = 84").fetchone() == (84, "XVI", "Maquinaria")
+
+    from_facts = sector_sql(con, group_by="seccion", year_from=2024, partner="156.0")
+    assert [item["name"] for item in from_facts["items"]] == ["II", "I", "XVI"]
+    agro, pesca, maquinaria = from_facts["items"]
+    assert agro == {
+        "name": "II",
+        "exports_fob": 100.0,
+        "imports_fob": 0.0,
+        "trade_balance": 100.0,
+        "fob_partner": 100.0,
+        "share_partner": 1.0,
+    }
+    assert pesca["exports_fob"] == 65.5 and pesca["share_partner"] == 0.0
+    assert maquinaria["share_partner"] is None and maquinaria["trade_balance"] == -80.0
+
+    kwargs = [dict(group_by="sector_industria", year_to=2024, flow=flow) for flow in ("exports", "imports")]
+    expected = [sector_sql(con, **k) for k in kwargs]
+    materialize_rollups(con)
+    assert [sector_sql(con, **k) for k in kwargs] == expected
+    con.close()
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+
+from packages.core.src.core.hs_tree import HS_TREE_LEVELS, HS_TREE_MEASURES, HSTree
+
+
+@pytest.fixture
+def tree_inputs():
+    dim_hs = pd.DataFrame(
+        {
+            "hs10": ["0803901100", "0803901200", "0306171000", "8471300000"],
+            "descripcion_final": ["Banano", "Plátano", "Camarón", "Laptops"],
+            "tipo_elemento": ["subpartida"] * 4,
+        }
+    )
+    totals = pd.DataFrame(
+        {
+            "hs10": [803901100, 803901100, 803901200, 306171000, 8471300000, 101210000],
+            "year": [2023, 2024, 2024, 2024, 2024, 2024],
+            "exports_fob": [50.0, 100.0, 10.0, 40.0, 0.0, 7.0],
+            "imports_fob": [0.0, 0.0, 0.0, 5.0, 80.0, 0.0],
+            "imports_cif": [0.0, 0.0, 0.0, 6.0, 90.0, 0.0],
+        }
+    )
+    return dim_hs, totals
+
+
+def test_subtree_totals_match_prefix_groupby(tree_inputs):
+    dim_hs, totals = tree_inputs
+    tree = HSTree.build(dim_hs, totals)
+    for level in HS_TREE_LEVELS:
+        for year in (None, 2023, 2024):
+            rows = totals if year is None else totals[totals["year"] == year]
+            expected = rows.groupby(rows["hs10"] // 10 ** (10 - level))[list(HS_TREE_MEASURES)].sum()
+            for code, values in expected.iterrows():
+                node = tree.node(str(code).zfill(level), year)
+                assert [node[m] for m in HS_TREE_MEASURES] == values.tolist()
+
+
+def test_children_walk_the_hierarchy(tree_inputs):
+    tree = HSTree.build(*tree_inputs)
+
+    assert [c["code"] for c in tree.children()] == ["01", "03", "08", "84"]
+    assert [c["code"] for c in tree.children("080390")] == ["08039011", "08039012"]
+    assert [c["code"] for c in tree.children("08039011")] == ["0803901100"]
+    leaf = tree.children("08039011", year=2024)[0]
+    assert leaf == {
+        "code": "0803901100",
+        "level": 10,
+        "description": "Banano",
+        "has_children": False,
+        "exports_fob": 100.0,
+        "imports_fob": 0.0,
+        "imports_cif": 0.0,
+    }
+    assert tree.children("0803901100") == []
+    assert tree.node("01", 1999)["exports_fob"] == 0.0
+    assert tree.node("0101210000")["description"] is None
+    assert tree.hs_node("0306171000").descripcion_final == "Camarón"
+    for code in ("09", "080", "abcd"):
+        with pytest.raises(KeyError):
+            tree.children(code)
+
+
+def test_empty_inputs_build_an_empty_tree():
+    tree = HSTree.build(pd.DataFrame(columns=["hs10"]), pd.DataFrame(columns=["hs10", "year", *HS_TREE_MEASURES]))
+    assert len(tree) == 0
+    assert tree.children() == []
@@ -0,0 +1,248 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+import shutil
+import threading
+import time
+
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from packages.etl.src.etl.build import read_build_marker, resolve_database, resolve_outputs
+from packages.etl.src.etl.pipeline import ETLConfig, ObservatorioETL
+from packages.etl.src.etl.profiling import measure
+from scripts.seed_data import ensure_sample_data
+
+
+@pytest.fixture
+def raw_dir(tmp_path):
+    raw = tmp_path / "raw"
+    ensure_sample_data(raw)
+    for flow, folder in [("exportaciones", "EXPORTACION_1998-2025"), ("importaciones", "IMPORTACIONES_1998-2025")]:
+        (raw / folder).mkdir()
+        for year in [2022, 2023]:
+            shutil.copy(raw / f"{flow}.xlsx", raw / folder / f"{flow}_{year}.xlsx")
+    (raw / "EXPORTACION_1998-2025" / "exportaciones_rota.xlsx").write_bytes(b"no es un excel")
+    return raw
+
+
+def _etl(tmp_path, raw_dir, **kwargs) -> ObservatorioETL:
+    processed = tmp_path / f"processed_{len(kwargs)}"
+    return ObservatorioETL(ETLConfig(raw_dir=raw_dir, processed_dir=processed, duckdb_path=processed / "o.duckdb", **kwargs))
+
+
+def test_parallel_ingestion_matches_sequential(tmp_path, raw_dir):
+    sequential = _etl(tmp_path, raw_dir)
+    parallel = _etl(tmp_path, raw_dir, workers=2)
+    seq_exports, seq_imports = sequential._build_fact_tables()
+    par_exports, par_imports = parallel._build_fact_tables()
+
+    assert len(seq_exports) == 6
+    pd.testing.assert_frame_equal(seq_exports, par_exports)
+    pd.testing.assert_frame_equal(seq_imports, par_imports)
+    assert seq_exports["hs10"].tolist()[:2] == [803901100, 306171000]
+
+
+def test_parallel_ingestion_keeps_a_part_per_duplicate_source(tmp_path, raw_dir):
+    etl = _etl(tmp_path, raw_dir, workers=2)
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        out = etl._build_fact_trade(is_import=False, executor=executor)
+    parts = etl.config.processed_dir / "_cache" / "exports" / "parts"
+
+    # exportaciones_2022/2023 son copias idénticas: cada una tiene su part, con el mismo hash de contenido.
+    names = sorted(p.name for p in parts.iterdir())
+    assert len(names) == 3 and len({name.split("-", 1)[1] for name in names}) == 1
+    sources = sorted(out["source_file"].unique())
+    assert sources == ["exportaciones.xlsx", "exportaciones_2022.xlsx", "exportaciones_2023.xlsx"]
+
+    (raw_dir / "EXPORTACION_1998-2025" / "exportaciones_2022.xlsx").unlink()
+    out = etl._build_fact_trade(is_import=False)
+    assert len(list(parts.iterdir())) == 2
+    assert sorted(out["source_file"].unique()) == ["exportaciones.xlsx", "exportaciones_2023.xlsx"]
+
+
+def test_incremental_run_reparses_only_changed_files(tmp_path, raw_dir, monkeypatch):
+    etl = _etl(tmp_path, raw_dir)
+    first = etl._build_fact_trade(is_import=False)
+
+    read = []
+    original = ObservatorioETL._read_trade_file
+    monkeypatch.setattr(
+        ObservatorioETL, "_read_trade_file", lambda self, path, is_import: read.append(path.name) or original(self, path, is_import)
+    )
+
+    pd.testing.assert_frame_equal(etl._build_fact_trade(is_import=False), first)
+    assert read == ["exportaciones_rota.xlsx"]
+
+    read.clear()
+    (raw_dir / "EXPORTACION_1998-2025" / "exportaciones_2022.xlsx").unlink()
+    shutil.copy(raw_dir / "importaciones.xlsx", raw_dir / "EXPORTACION_1998-2025" / "exportaciones_2023.xlsx")
+    out = etl._build_fact_trade(is_import=False)
+    assert read == ["exportaciones_2023.xlsx", "exportaciones_rota.xlsx"]
+    assert sorted(out["source_file"].unique()) == ["exportaciones.xlsx"]
+
+    read.clear()
+    etl.config.full_refresh = True
+    etl._build_fact_trade(is_import=False)
+    assert len(read) == 3
+
+
+def test_streaming_ingestion_matches_in_memory(tmp_path, raw_dir):
+    in_memory = _etl(tmp_path, raw_dir)
+    streaming = _etl(tmp_path, raw_dir, streaming=True, batch_size=1)
+    expected = in_memory._build_fact_trade(is_import=True)
+    staged = streaming._build_fact_trade(is_import=True)
+
+    assert len(staged) == len(expected) == 6
+    assert pq.ParquetFile(staged.path).metadata.num_row_groups == 6
+    out = pd.read_parquet(staged.path)
+    pd.testing.assert_frame_equal(out, expected)
+
+
+def test_run_writes_year_partitioned_sorted_facts(tmp_path, raw_dir):
+    etl = _etl(tmp_path, raw_dir, row_group_size=2, streaming=True)
+    etl.run()
+    etl.run()
+
+    outputs = resolve_outputs(etl.config.duckdb_path)
+    assert outputs.name == etl.profiler.run_id
+    assert (outputs.parent / "current").resolve() == outputs.resolve()
+    dataset_dir = outputs / "fact_exports"
+    assert sorted(p.name for p in dataset_dir.iterdir()) == ["year=2024"]
+    assert not (etl.config.processed_dir / "_staging").exists()
+    part = pq.ParquetFile(next(dataset_dir.rglob("*.parquet")))
+    assert part.metadata.row_group(0).column(2).compression == "ZSTD"
+    assert part.metadata.row_group(0).column(2).statistics.has_min_max
+
+    conn = duckdb.connect(str(etl.config.duckdb_path), read_only=True)
+    rows = conn.execute("SELECT year, hs10, country_code FROM fact_exports").fetchall()
+    year_type = conn.execute("SELECT typeof(year) FROM fact_exports LIMIT 1").fetchone()[0]
+    cube_rows = conn.execute("SELECT SUM(row_count) FROM cube_hs2 WHERE flow = 'exports'").fetchone()[0]
+    bad_periods = conn.execute("SELECT COUNT(*) FROM fact_exports WHERE period_idx <> year * 12 + month").fetchone()[0]
+    conn.close()
+    assert rows == sorted(rows)
+    assert len(rows) == 6
+    assert year_type == "SMALLINT"
+    assert cube_rows == 6
+    assert bad_periods == 0
+
+
+def test_streaming_run_handles_quotes_in_processed_dir(tmp_path, raw_dir):
+    processed = tmp_path / "d'Alembert"
+    config = ETLConfig(raw_dir=raw_dir, processed_dir=processed, duckdb_path=processed / "o.duckdb", streaming=True)
+    etl = ObservatorioETL(config)
+    etl.run()
+    etl.run()
+
+    conn = duckdb.connect(str(resolve_database(config.duckdb_path)), read_only=True)
+    assert conn.execute("SELECT count(*) FROM fact_exports").fetchone() == (6,)
+    assert conn.execute("SELECT count(*) FROM etl_runs").fetchone() == (2,)
+    conn.close()
+    assert (resolve_outputs(config.duckdb_path) / "fact_exports").is_dir()
+
+
+def test_run_appends_stage_metrics_and_report(tmp_path, raw_dir):
+    etl = _etl(tmp_path, raw_dir, profile=True)
+    etl.run()
+    etl.run()
+
+    conn = duckdb.connect(str(etl.config.duckdb_path), read_only=True)
+    runs = conn.execute("SELECT run_id, status FROM etl_runs ORDER BY started_at").fetchall()
+    files = {
+        run_id: conn.execute(
+            """
+            SELECT target, status, rows_in, rows_out, bytes_written > 0, json_extract(timings, '$.excel_read') IS NOT NULL
+            FROM etl_stage_metrics
+            WHERE run_id = ? AND stage = 'ingest_exports'
+            ORDER BY target
+            """,
+            [run_id],
+        ).fetchall()
+        for run_id, _ in runs
+    }
+    fact = conn.execute(
+        "SELECT rows_out FROM etl_stage_metrics WHERE run_id = ? AND stage = 'build' AND target = 'fact_exports'",
+        [runs[-1][0]],
+    ).fetchone()
+    conn.close()
+
+    assert [status for _, status in runs] == ["ok", "ok"]
+    first, second = files[runs[0][0]], files[runs[1][0]]
+    assert first[0] == ("exportaciones.xlsx", "ok", 2, 2, True, True)
+    assert [row[:2] for row in first[-1:] + second] == [("exportaciones_rota.xlsx", "error")] * 2
+    assert fact == (6,)
+
+    runs_dir = etl.config.processed_dir / "_runs"
+    report = json.loads((runs_dir / f"etl_run_{runs[-1][0]}.json").read_text(encoding="utf-8"))
+    assert {s["stage"] for s in report["stages"]} >= {"build", "build_fact_tables", "save_parquet", "materialize_duckdb"}
+    assert len(list(runs_dir.glob("*.prof"))) == 2
+
+
+def test_failed_quality_check_leaves_exports_untouched(tmp_path, raw_dir, monkeypatch):
+    etl = _etl(tmp_path, raw_dir)
+
+    def broken_quality():
+        raise RuntimeError("calidad incumplida")
+
+    monkeypatch.setattr(etl, "_check_data_quality", broken_quality)
+    with pytest.raises(RuntimeError):
+        etl.run()
+    assert sorted(p.name for p in etl.config.processed_dir.iterdir()) == ["_cache", "_runs"]
+
+
+def test_worker_thread_stage_measures_only_its_own_cpu():
+    results = []
+
+    def idle_stage():
+        with measure("idle") as metrics:
+            time.sleep(0.3)
+        results.append(metrics)
+
+    worker = threading.Thread(target=idle_stage)
+    worker.start()
+    deadline = time.perf_counter() + 0.3
+    while time.perf_counter() < deadline:
+        pass
+    worker.join()
+
+    assert results[0].wall_seconds >= 0.3
+    assert results[0].cpu_seconds < 0.1
+
+
+def test_run_publishes_versioned_database_and_keeps_history(tmp_path, raw_dir, monkeypatch):
+    etl = _etl(tmp_path, raw_dir, keep_versions=2)
+    db_path = etl.config.duckdb_path
+    build_id = etl.profiler.run_id
+    etl.run()
+    first = read_build_marker(db_path)
+    assert first["build_id"] == build_id
+
+    def broken_rollups():
+        raise RuntimeError("rollups rotos")
+
+    monkeypatch.setattr(etl, "_materialize_rollups", broken_rollups)
+    with pytest.raises(RuntimeError):
+        etl.run()
+    assert read_build_marker(db_path) == first
+    assert len(list(db_path.parent.glob("o.*.duckdb"))) == 1
+    assert [p.name for p in (db_path.parent / "_builds").iterdir() if not p.is_symlink()] == [first["build_id"]]
+
+    monkeypatch.undo()
+    etl.run()
+    etl.run()
+
+    marker = read_build_marker(db_path)
+    versions = sorted(p.name for p in db_path.parent.glob("o.*.duckdb"))
+    assert marker["database"] == f"o.{marker['build_id']}.duckdb"
+    assert len(versions) == 2 and marker["database"] in versions
+    assert first["database"] not in versions
+    assert db_path.is_symlink() and db_path.resolve().name == marker["database"]
+    builds = sorted(p.name for p in (db_path.parent / "_builds").iterdir() if not p.is_symlink())
+    assert builds == sorted(v.removeprefix("o.").removesuffix(".duckdb") for v in versions)
+    assert (resolve_outputs(db_path) / "_search").is_dir()
+
+    conn = duckdb.connect(str(resolve_database(db_path)), read_only=True)
+    statuses = conn.execute("SELECT status FROM etl_runs ORDER BY started_at").fetchall()
+    conn.close()
+    assert statuses == [("ok",), ("error",), ("ok",), ("ok",)]
@@ -0,0 +1,38 @@
+import duckdb
+
+from packages.etl.src.etl.quality import DEFAULT_RULES, evaluate_rules, read_quality_results, write_quality_results
+
+
+def test_default_rules_report_each_check_per_table():
+    conn = duckdb.connect()
+    conn.execute(
+        """
+        CREATE TABLE dim_hs AS SELECT * FROM (VALUES ('0803901100'), ('0803901100'), ('30617100')) t(hs10);
+        CREATE TABLE dim_sector AS SELECT * FROM (VALUES ('08', 'II'), ('03', 'I')) t(hs2, seccion);
+        CREATE TABLE fact_exports AS SELECT * FROM (VALUES
+            (803901100::BIGINT, 'CHINA', 10.0, 1.0),
+            (306171000, 'CHILE', -2.0, 1.0),
+            (8471300000, 'PERU', 5.0, 1.0),
+            (12345678901, 'PERU', 5.0, 1.0)
+        ) t(hs10, country_name, fob, tm_peso_neto)
+        """
+    )
+    results = evaluate_rules(conn, DEFAULT_RULES)
+    write_quality_results(conn, "build-1", results)
+
+    by_key = {(r.table_name, r.column_name, r.rule): r for r in results}
+    assert by_key[("dim_hs", "hs10", "unico")].observed == 1
+    assert by_key[("dim_hs", "hs10", "patron")].observed == 1
+    assert not by_key[("dim_sector", "hs2", "cantidad_distinta")].passed
+    assert by_key[("fact_exports", "hs10", "patron")].observed == 1
+    assert by_key[("fact_exports", "fob", "no_negativo")].observed == 1
+    assert by_key[("fact_exports", "tm_peso_neto", "no_negativo")].passed
+    assert by_key[("fact_exports", "hs10", "cobertura")].observed == 0.5
+    assert by_key[("fact_exports", "country_name", "socio_china")].passed
+    assert all(r.rows_checked == 4 for r in results if r.table_name == "fact_exports")
+    assert not any(r.table_name == "fact_imports" for r in results)
+
+    stored = read_quality_results(conn)
+    assert len(stored) == len(results)
+    assert {row["run_id"] for row in stored} == {"build-1"}
+    conn.close()
@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+from packages.etl.src.etl.search_index import HSSearchIndex, search_tokens, write_search_index
+
+
+@pytest.fixture
+def index(tmp_path):
+    dim_hs = pd.DataFrame(
+        {
+            "hs10": ["0306171000", "0306179900", "0803901100", "0803901200", "1801001000"],
+            "descripcion_final": [
+                "Camarones y langostinos congelados",
+                "Los demás camarones, sin congelar",
+                "Bananas tipo Cavendish Valery",
+                "Banano orito",
+                "Cacao en grano, crudo, sacos de 2 kg",
+            ],
+        }
+    )
+    write_search_index(dim_hs, tmp_path / "_search")
+    return HSSearchIndex.load(tmp_path / "_search")
+
+
+def test_tokens_fold_accents_case_and_stopwords():
+    assert search_tokens("Camarón CONGELADO, de río") == ["camaron", "congelado", "rio"]
+
+
+def test_search_is_accent_insensitive_and_prefix_aware(index):
+    assert [r["hs10"] for r in index.search("CAMARÓN congel")] == ["0306171000", "0306179900"]
+    assert [r["hs10"] for r in index.search("banano")] == ["0803901200"]
+    prefix = index.search("banan")
+    assert [r["hs10"] for r in prefix] == ["0803901200", "0803901100"]
+    assert prefix[0]["score"] == prefix[1]["score"] < index.search("banano")[0]["score"]
+    assert index.search("cacao chocolate") == []
+    assert index.search("  ") == []
+
+
+def test_search_matches_hs_code_prefixes(index):
+    # A igual puntaje gana la descripción más corta.
+    assert [r["hs10"] for r in index.search("0803")] == ["0803901200", "0803901100"]
+    assert [r["hs10"] for r in index.search("0306 congelados")] == ["0306171000"]
+    assert [r["hs10"] for r in index.search("18", limit=1)] == ["1801001000"]
+
+
+def test_search_joins_dotted_codes_and_falls_back_to_words(index):
+    assert [r["hs10"] for r in index.search("0803.90")] == ["0803901200", "0803901100"]
+    assert [r["hs10"] for r in index.search("0306 17 10")] == ["0306171000"]
+    assert [r["hs10"] for r in index.search("cacao 2 kg")] == ["1801001000"]
+    assert index.search("0803.91") == []
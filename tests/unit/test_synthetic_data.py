@@ -0,0 +1,38 @@
+from packages.etl.src.etl.pipeline import ETLConfig, ObservatorioETL
+from scripts.benchmark import compare
+from scripts.synthetic_data import generate_synthetic_data
+
+
+def test_synthetic_workbooks_roundtrip_through_etl(tmp_path):
+    raw = tmp_path / "raw"
+    summary = generate_synthetic_data(raw, rows=900, years=[2022, 2023, 2024], n_hs=50, n_countries=30, rows_per_file=200)
+
+    assert summary["exports"]["files"] == 6
+    assert summary["imports"]["rows"] == 900
+
+    processed = tmp_path / "processed"
+    etl = ObservatorioETL(ETLConfig(raw_dir=raw, processed_dir=processed, duckdb_path=processed / "o.duckdb"))
+    dim_hs = etl._build_dim_hs()
+    exports, imports = etl._build_fact_tables()
+
+    assert len(dim_hs) == 50
+    assert len(exports) == summary["exports"]["valid_rows"]
+    assert len(imports) == summary["imports"]["valid_rows"]
+    assert sorted(exports["year"].unique()) == [2022, 2023, 2024]
+    assert set(exports["hs10"].astype(str).str.zfill(10)) <= set(dim_hs["hs10"])
+    assert exports["country_code"].nunique() <= 30
+    assert (imports["cif"] >= imports["fob"]).all()
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    def result(etl_seconds, overview_ms):
+        return {
+            "etl": {"seconds": etl_seconds, "peak_rss_mb": 100.0, "stages": {}},
+            "api": {"kpis_overview": {"median_ms": overview_ms}},
+        }
+
+    rows = {row["metric"]: row for row in compare(result(12.0, 10.5), result(10.0, 10.0), tolerance=0.1)}
+
+    assert rows["etl.seconds"]["regression"]
+    assert not rows["api.kpis_overview.median_ms"]["regression"]
+    assert not rows["etl.peak_rss_mb"]["regression"]
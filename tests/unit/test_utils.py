@@ -1,9 +1,23 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
 from packages.etl.src.etl.utils import (
     as_hs,
+    as_hs_series,
+    clean_text,
     expand_chapter_token,
     normalize_column_name,
+    normalize_text_series,
     normalize_text_value,
     parse_periodo,
+    parse_periodo_series,
+)
+
+MESSY = pd.Series(
+    ["2024 / 03 - Marzo", "2024-7", "xx", None, np.nan, "1999_12", 2024, 803901100, 803901100.0, "\ufeff – China;  ", "a  b"],
+    dtype=object,
 )
 
 
@@ -33,3 +47,19 @@ def test_expand_chapter_token_unicode_dash():
 
 def test_normalize_text_value_cleanup():
     assert normalize_text_value('\ufeff - China;  ') == 'China'
+
+
+def test_series_normalizers_match_scalar_versions():
+    assert normalize_text_series(MESSY).tolist() == [normalize_text_value(v) for v in MESSY]
+    assert as_hs_series(MESSY, 10).tolist() == [as_hs(v, 10) for v in MESSY]
+    years, months = parse_periodo_series(MESSY)
+    assert list(zip(years, months)) == [parse_periodo(clean_text(v)) for v in MESSY]
+
+
+def test_parse_periodo_series_logs_one_aggregated_warning(caplog):
+    values = pd.Series(["sin periodo"] * 500 + ["2024 / 01 - Enero"] * 500)
+    with caplog.at_level(logging.WARNING):
+        years, _ = parse_periodo_series(values, column="Periodo")
+    assert len(caplog.records) == 1
+    assert "500 filas" in caplog.records[0].getMessage()
+    assert years.tolist() == [0] * 500 + [2024] * 500
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from packages.etl.src.etl.utils import first_sheet_with_headers
+from packages.etl.src.etl.workbook import cached_layout, clear_layout_cache, read_workbook
+from scripts.seed_data import ensure_sample_data
+
+TRADE_KEYS = ["Periodo", "Codigo_Subpartida_10"]
+
+
+def test_read_workbook_matches_read_excel(tmp_path):
+    ensure_sample_data(tmp_path)
+    path = tmp_path / "importaciones.xlsx"
+    clear_layout_cache()
+
+    scan = read_workbook(path, TRADE_KEYS)
+
+    assert (scan.sheet, scan.header_idx) == ("Columnas", 2)
+    expected = pd.read_excel(path, sheet_name=scan.sheet, header=scan.header_idx)
+    pd.testing.assert_frame_equal(scan.frame, expected)
+
+
+def test_read_workbook_skips_sheets_without_headers_and_caches_layout(tmp_path):
+    path = tmp_path / "multi.xlsx"
+    with pd.ExcelWriter(path) as w:
+        pd.DataFrame([["notas"], ["sin datos"]]).to_excel(w, sheet_name="Notas", index=False, header=False)
+        pd.DataFrame([{"Periodo": "2024 / 05", "Codigo_Subpartida_10": 803901100, "FOB": 1.5}]).to_excel(
+            w, sheet_name="Datos", index=False, startrow=3
+        )
+    clear_layout_cache()
+
+    scan = read_workbook(path, TRADE_KEYS)
+
+    assert (scan.sheet, scan.header_idx) == ("Datos", 3)
+    assert scan.frame.to_dict(orient="records") == [{"Periodo": "2024 / 05", "Codigo_Subpartida_10": 803901100, "FOB": 1.5}]
+    assert cached_layout(path, TRADE_KEYS).sheet == "Datos"
+    assert first_sheet_with_headers(str(path), TRADE_KEYS) == ("Datos", 3)
+    assert read_workbook(path, TRADE_KEYS).frame.equals(scan.frame)